@@ -0,0 +1,87 @@
+"""
+Memory benchmark: plain dicts vs slotted records
+Run from the repository root: python -m scripts.benchmark_records [count]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from src.models.records import Account, Proxy
+
+
+def _sample_account(i: int) -> dict:
+    return {
+        'id': f"{i:08x}-5b1e-4c2a-9a47-3f0c2d1e{i:04x}",
+        'type': 'google' if i % 2 else 'outlook',
+        'email': f"user{i}@example.com",
+        'name': f"User {i}",
+        'status': 'logged_in' if i % 3 else 'not_logged_in',
+        'created_at': '2024-01-01 12:00:00',
+        'last_opened': None,
+        'profile_path': f"data/profiles/user{i}_at_example_com",
+        'browser': 'chrome',
+        'use_proxy': bool(i % 2),
+        'proxy_mode': 'random' if i % 2 else None,
+        'proxy_id': None,
+        'notes': '' if i % 5 else f"note for account {i}"
+    }
+
+
+def _sample_proxy(i: int) -> dict:
+    return {
+        'protocol': 'socks5' if i % 2 else 'http',
+        'host': f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        'port': 1080 + i % 1000,
+        'username': f"user{i}",
+        'password': f"pass{i}",
+        'status': 'alive' if i % 3 else 'dead',
+        'last_check': '2024-01-01 12:00:00',
+        'response_time': 123.45,
+        'fail_count': 0,
+        'quarantine_until': 0,
+        'advanced_check': {
+            'fraud_score': i % 100,
+            'is_proxy': True,
+            'country': 'United States',
+            'isp': 'Example ISP',
+            'proxy_type': 'DCH',
+            'last_advanced_check': '2024-01-01 12:00:00'
+        } if i % 4 == 0 else None
+    }
+
+
+def _measure(build) -> int:
+    """Bytes retained by the objects build() returns, decoded from JSON like a real load"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return after - before
+
+
+def run(count: int = 50000):
+    accounts_json = json.dumps([_sample_account(i) for i in range(count)])
+    proxies_json = json.dumps([_sample_proxy(i) for i in range(count)])
+
+    rows = [
+        ('account dict', _measure(lambda: json.loads(accounts_json))),
+        ('Account', _measure(lambda: [Account(a) for a in json.loads(accounts_json)])),
+        ('proxy dict', _measure(lambda: json.loads(proxies_json))),
+        ('Proxy', _measure(lambda: [Proxy(p) for p in json.loads(proxies_json)])),
+    ]
+
+    print(f"{count} records each")
+    for label, size in rows:
+        print(f"  {label:<14} {size / count:8.1f} bytes/record  {size / 1048576:8.1f} MiB")
+    for plain, record in ((rows[0], rows[1]), (rows[2], rows[3])):
+        saved = 1 - record[1] / plain[1]
+        print(f"  {record[0]}: {saved:.0%} smaller than {plain[0]}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -10,8 +10,130 @@ os.makedirs(PROFILES_DIR, exist_ok=True)
 os.makedirs(PROXY_DIR, exist_ok=True)
 
 ACCOUNTS_FILE = os.path.join(DATA_DIR, "accounts.json")
+ACCOUNTS_JOURNAL_FILE = os.path.join(DATA_DIR, "accounts.journal")
+ACCOUNTS_DB_FILE = os.path.join(DATA_DIR, "accounts.db")
 PROXIES_FILE = os.path.join(DATA_DIR, "proxies.json")
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
+PROFILES_TRASH_DIR = os.path.join(DATA_DIR, ".trash")
+PROFILE_OPS_FILE = os.path.join(DATA_DIR, "profile_ops.journal")
+PROXY_HISTORY_FILE = os.path.join(DATA_DIR, "proxy_history.bin")
+IP_LOOKUP_CACHE_FILE = os.path.join(DATA_DIR, "ip2location_cache.json")
+PROXY_SOURCES_FILE = os.path.join(DATA_DIR, "proxy_sources.json")
+# Compiled offline GeoIP / ASN range tables (*.geoip, see src/core/geoip.py); every table here is loaded
+GEOIP_DIR = os.path.join(DATA_DIR, "geoip")
+
+# Account storage backend: "json" (snapshot + journal) or "sqlite"
+ACCOUNTS_BACKEND = os.environ.get("ACCOUNTS_BACKEND", "json")
+
+# Number of journal records before accounts.json is compacted
+ACCOUNTS_JOURNAL_THRESHOLD = 500
+
+# Threads used to delete profile folders in the background
+PROFILE_WORKER_THREADS = 4
+
+# Proxy health checks in flight at once on the asyncio checker
+PROXY_CHECK_CONCURRENCY = 500
+
+# Per-phase proxy check timeouts in seconds
+PROXY_CHECK_TIMEOUTS = {
+    'precheck': 1.5,
+    'connect': 5,
+    'handshake': 5,
+    'response': 10
+}
+
+# Test endpoints for proxy health checks (plain http); override with 'proxy_check_endpoints' in config.json,
+# e.g. a local echo server URL
+PROXY_CHECK_ENDPOINTS = [
+    'http://httpbin.org/ip',
+    'http://api.ipify.org/?format=json',
+    'http://ip-api.com/json'
+]
+
+# Seconds to wait on a slow endpoint before a hedged probe to the next one starts
+PROXY_CHECK_HEDGE_DELAY = 0.75
+
+# Adaptive (AIMD) limits for in-flight proxy checks: start at 'initial', add 'increase' while timeouts stay
+# under 'timeout_threshold' and the event loop keeps up, halve on trouble; 'max' is a hard cap on top of
+# PROXY_CHECK_CONCURRENCY / PROXY_PIPELINE_CONCURRENCY. Override with 'proxy_check_concurrency' in config.json
+PROXY_CHECK_CONCURRENCY_LIMITS = {
+    'initial': 50,
+    'min': 5,
+    'max': 1000,
+    'increase': 10,
+    'timeout_threshold': 0.2
+}
+
+# Background re-check of due proxies (seconds unless noted); see RecheckScheduler.next_due
+PROXY_RECHECK_POLICY = {
+    'alive': 900,
+    'dead': 600,
+    'max_backoff': 4,
+    'in_use': 120,
+    'recent': 300,
+    'recent_window': 3600,
+    'min_gap': 30
+}
+
+# Check outcomes kept per proxy for uptime / latency percentiles
+PROXY_HISTORY_SIZE = 32
+
+# Pick policy per account proxy_mode ('specific' is handled separately); 'weighted' favours alive proxies with
+# a low EWMA latency and a high recent success rate, 'lru' the one picked longest ago
+PROXY_SELECTION_MODES = {
+    'random': 'weighted',
+    'uniform': 'uniform',
+    'lru': 'lru',
+    'lowest_latency': 'lowest_latency'
+}
+
+# Accounts that may hold the same proxy at once (0 = no limit, 1 = exclusive), and whether an account gets its
+# last proxy back when it is still usable. Sharing is unlimited by default so opening more accounts than there
+# are alive proxies keeps working; opt in to a limit with 'proxy_lease_max_share' in config.json
+PROXY_LEASE_MAX_SHARE = 0
+PROXY_LEASE_STICKY = True
+
+# Opt-in ('proxy_shared_exit_as_one' in config.json): proxies whose checks saw the same exit IP count as one
+# resource when picking and leasing, so max_share applies to the whole exit (with max_share 1 a whole exit group
+# is one exclusive lease). Exit IPs are recorded and shown either way. A proxy whose exit IP keeps changing is
+# rotating: its exit_ip_churn (+1 per change, -1 per repeat) reaches PROXY_ROTATING_CHURN and it is no longer
+# grouped. Advanced checks reuse an exit IP seen by a check within PROXY_EXIT_IP_REUSE seconds instead of asking
+# exit_ip_url again
+PROXY_SHARED_EXIT_AS_ONE = False
+PROXY_ROTATING_CHURN = 2
+PROXY_EXIT_IP_REUSE = 300
+
+# Scheduled re-checks started per second, and threads running them
+PROXY_RECHECK_RATE = 5.0
+PROXY_RECHECK_WORKERS = 4
+
+# Advanced check services; override with 'ip2location_api_url' / 'exit_ip_url' in config.json (e.g. a local
+# EchoServer's ip2location_url / url)
+IP2LOCATION_API_URL = 'https://api.ip2location.io/'
+EXIT_IP_URL = 'http://api.ipify.org?format=json'
+
+# IP2Location answers are reused per exit IP for IP_LOOKUP_TTL seconds; misses start at most
+# IP_LOOKUP_RATE requests per second on IP_LOOKUP_WORKERS threads
+IP_LOOKUP_TTL = 86400
+IP_LOOKUP_RATE = 2.0
+IP_LOOKUP_WORKERS = 4
+
+# Proxy list imports: files from PROXY_IMPORT_PARALLEL_BYTES up are parsed in PROXY_IMPORT_CHUNK_LINES-line
+# chunks on PROXY_IMPORT_WORKERS processes
+PROXY_IMPORT_PARALLEL_BYTES = 64 * 1024 * 1024
+PROXY_IMPORT_CHUNK_LINES = 50000
+PROXY_IMPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Seconds between checks of proxy source files / drop directories for changes; a change is merged once it
+# has been stable for one interval. Override with 'proxy_source_poll_interval' in config.json
+PROXY_SOURCE_POLL_INTERVAL = 60
+
+# Workers per stage of the staged check (TCP precheck -> probe -> advanced lookup)
+PROXY_PIPELINE_CONCURRENCY = {
+    'tcp': 1000,
+    'probe': 500,
+    'advanced': 10
+}
 
 CHROME_OPTIONS = [
     "--disable-dev-shm-usage",
@@ -0,0 +1,228 @@
+"""Encrypted account export container (v2: chunked AES-GCM frames, v1: single Fernet token)"""
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from src.models import json_default
+
+MAGIC = b'AMX2'
+VERSION = 2
+ITERATIONS = 200000
+CHUNK_SIZE = 500
+
+# magic, version, iterations, salt length
+_HEADER = struct.Struct('>4sBIB')
+# ciphertext length, final flag
+_FRAME = struct.Struct('>IB')
+_NONCE_PREFIX_LEN = 8
+
+
+class PasswordKeyCache:
+    """
+    Derives PBKDF2 keys and, only when enabled, keeps them in memory for the session
+    so repeated exports/imports with the same password skip the 200k-iteration KDF
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._keys: Dict[tuple, bytes] = {}
+        self._session_salt = None
+        self._lock = threading.Lock()
+
+    def export_salt(self) -> bytes:
+        """Fresh salt per export, or one salt per session when caching is enabled"""
+        if not self.enabled:
+            return os.urandom(16)
+        with self._lock:
+            if self._session_salt is None:
+                self._session_salt = os.urandom(16)
+            return self._session_salt
+
+    def derive(self, password: str, salt: bytes, iterations: int) -> bytes:
+        cache_key = (hashlib.sha256(salt + password.encode('utf-8')).digest(), iterations)
+        if self.enabled:
+            with self._lock:
+                key = self._keys.get(cache_key)
+            if key is not None:
+                return key
+
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        from cryptography.hazmat.primitives import hashes
+
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=iterations,
+        )
+        key = kdf.derive(password.encode('utf-8'))
+        if self.enabled:
+            with self._lock:
+                self._keys[cache_key] = key
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._session_salt = None
+
+
+def _frame_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + struct.pack('>I', index)
+
+
+def _frame_aad(header: bytes, index: int, final: bool) -> bytes:
+    # Binding index and final flag to the header stops frame reordering and truncation
+    return header + struct.pack('>IB', index, 1 if final else 0)
+
+
+def _chunks(accounts: Iterable[Dict], size: int) -> Iterator[list]:
+    chunk = []
+    for account in accounts:
+        chunk.append(account)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_v2(
+    file_path: str,
+    accounts: Iterable[Dict],
+    total: int,
+    password: str,
+    key_cache: PasswordKeyCache,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Stream accounts into a v2 container; returns the number of accounts written"""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    salt = key_cache.export_salt()
+    aead = AESGCM(key_cache.derive(password, salt, ITERATIONS))
+    nonce_prefix = os.urandom(_NONCE_PREFIX_LEN)
+    header = _HEADER.pack(MAGIC, VERSION, ITERATIONS, len(salt)) + salt + nonce_prefix
+
+    written = 0
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+
+            def write_frame(index: int, chunk: list, final: bool):
+                plaintext = '\n'.join(json.dumps(a, ensure_ascii=False, default=json_default) for a in chunk).encode('utf-8')
+                ciphertext = aead.encrypt(
+                    _frame_nonce(nonce_prefix, index), plaintext, _frame_aad(header, index, final)
+                )
+                f.write(_FRAME.pack(len(ciphertext), 1 if final else 0))
+                f.write(ciphertext)
+
+            # One chunk of lookahead so the last frame can be flagged final
+            index = 0
+            pending = None
+            for chunk in _chunks(accounts, chunk_size):
+                if pending is not None:
+                    write_frame(index, pending, False)
+                    index += 1
+                    written += len(pending)
+                    if progress_callback:
+                        progress_callback(written, total)
+                pending = chunk
+            write_frame(index, pending or [], True)
+            written += len(pending or [])
+            if progress_callback:
+                progress_callback(written, total)
+    except BaseException:
+        # Never leave a half-written export behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    os.replace(tmp_path, file_path)
+    return written
+
+
+def read_accounts(
+    file_path: str,
+    password: str,
+    key_cache: PasswordKeyCache,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> Iterator[Dict]:
+    """Yield accounts from a v2 container, or from a legacy v1 JSON export"""
+    with open(file_path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        yield from _read_v1(file_path, password, key_cache)
+        return
+
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.exceptions import InvalidTag
+
+    total_bytes = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        fixed = f.read(_HEADER.size)
+        if len(fixed) != _HEADER.size:
+            raise Exception("Invalid file")
+        _, version, iterations, salt_len = _HEADER.unpack(fixed)
+        if version != VERSION:
+            raise Exception(f"Unsupported export version: {version}")
+        salt = f.read(salt_len)
+        nonce_prefix = f.read(_NONCE_PREFIX_LEN)
+        header = fixed + salt + nonce_prefix
+
+        aead = AESGCM(key_cache.derive(password, salt, iterations))
+        index = 0
+        while True:
+            frame = f.read(_FRAME.size)
+            if len(frame) != _FRAME.size:
+                raise Exception("Invalid file: export is truncated")
+            length, final = _FRAME.unpack(frame)
+            ciphertext = f.read(length)
+            if len(ciphertext) != length:
+                raise Exception("Invalid file: export is truncated")
+            try:
+                plaintext = aead.decrypt(
+                    _frame_nonce(nonce_prefix, index), ciphertext, _frame_aad(header, index, bool(final))
+                )
+            except InvalidTag:
+                raise Exception("Invalid password or file")
+
+            if plaintext:
+                for line in plaintext.decode('utf-8').split('\n'):
+                    yield json.loads(line)
+            if progress_callback:
+                progress_callback(f.tell(), total_bytes)
+            if final:
+                break
+            index += 1
+
+
+def _read_v1(file_path: str, password: str, key_cache: PasswordKeyCache) -> Iterator[Dict]:
+    from cryptography.fernet import Fernet, InvalidToken
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        try:
+            payload = json.load(f)
+        except ValueError:
+            raise Exception("Invalid file")
+
+    salt = base64.b64decode(payload.get('salt') or '')
+    iterations = int(payload.get('iter') or ITERATIONS)
+    token = (payload.get('data') or '').encode('utf-8')
+
+    key = base64.urlsafe_b64encode(key_cache.derive(password, salt, iterations))
+    try:
+        plaintext = Fernet(key).decrypt(token)
+    except InvalidToken:
+        raise Exception("Invalid password or file")
+
+    imported = json.loads(plaintext.decode('utf-8'))
+    if not isinstance(imported, list):
+        raise Exception("Invalid file")
+    yield from imported
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from src.models import json_default
+
+
+class AccountJournal:
+    """Append-only mutation log with a compacted JSON snapshot"""
+
+    def __init__(self, snapshot_file: str, journal_file: str, threshold: int = 500):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.rotated_file = journal_file + '.old'
+        self.threshold = threshold
+        self.snapshot_provider: Optional[Callable[[], List[Dict]]] = None
+
+        self._lock = threading.Lock()
+        self._handle = None
+        self._records = 0
+        self._compactor = None
+
+    def load(self) -> List[Dict]:
+        """Load snapshot and replay any journal records written after it"""
+        accounts = []
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                accounts = json.load(f)
+
+        index = {a.get('id'): i for i, a in enumerate(accounts)}
+        removed = False
+        self._records = 0
+        for path in (self.rotated_file, self.journal_file):
+            for record in self._read_records(path):
+                if path == self.journal_file:
+                    self._records += 1
+                removed = self._apply(accounts, index, record) or removed
+
+        if removed:
+            accounts = [a for a in accounts if a is not None]
+        return accounts
+
+    def _read_records(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn write from an interrupted append
+                    continue
+
+    def _apply(self, accounts: List, index: Dict, record: Dict) -> bool:
+        op = record.get('op')
+        if op == 'add':
+            account = record.get('account') or {}
+            pos = index.get(account.get('id'))
+            if pos is not None and accounts[pos] is not None:
+                accounts[pos] = account
+            else:
+                index[account.get('id')] = len(accounts)
+                accounts.append(account)
+        elif op == 'update':
+            pos = index.get(record.get('id'))
+            if pos is not None and accounts[pos] is not None:
+                accounts[pos].update(record.get('fields') or {})
+        elif op == 'remove':
+            pos = index.pop(record.get('id'), None)
+            if pos is not None:
+                accounts[pos] = None
+                return True
+        return False
+
+    def append(self, op: str, **payload):
+        """Append a single mutation record to the journal"""
+        self.append_many([dict(payload, op=op)])
+
+    def append_many(self, records: List[Dict]):
+        if not records:
+            return
+        data = ''.join(
+            json.dumps(r, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+            for r in records
+        )
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self.journal_file, 'a', encoding='utf-8')
+            self._handle.write(data)
+            self._handle.flush()
+            self._records += len(records)
+            should_compact = self._records >= self.threshold
+        if should_compact:
+            self.compact_async()
+
+    def compact_async(self):
+        """Write a snapshot in the background and drop the replayed journal"""
+        if self.snapshot_provider is None:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            snapshot = self._rotate()
+            self._compactor = threading.Thread(
+                target=self._write_snapshot, args=(snapshot,), daemon=True
+            )
+            self._compactor.start()
+
+    def compact(self, accounts: List[Dict]):
+        """Synchronously write a full snapshot and truncate the journal"""
+        self._wait_compactor()
+        with self._lock:
+            snapshot = [a.copy() for a in accounts]
+            self._close_handle()
+            self._write_snapshot(snapshot)
+            try:
+                if os.path.exists(self.journal_file):
+                    os.remove(self.journal_file)
+            except OSError:
+                pass
+            self._records = 0
+
+    def _rotate(self) -> List[Dict]:
+        # Caller holds self._lock; records appended after this point go to a fresh journal
+        self._close_handle()
+        if os.path.exists(self.journal_file):
+            if os.path.exists(self.rotated_file):
+                # A previous compaction failed; keep its records ahead of ours
+                with open(self.journal_file, 'r', encoding='utf-8') as src, \
+                        open(self.rotated_file, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_file)
+            else:
+                os.replace(self.journal_file, self.rotated_file)
+        self._records = 0
+        return [a.copy() for a in self.snapshot_provider()]
+
+    def _write_snapshot(self, accounts: List[Dict]):
+        try:
+            _atomic_write_json(self.snapshot_file, accounts)
+            if os.path.exists(self.rotated_file):
+                os.remove(self.rotated_file)
+        except Exception as e:
+            print(f"Error compacting accounts journal: {e}")
+
+    def _wait_compactor(self):
+        compactor = self._compactor
+        if compactor is not None and compactor is not threading.current_thread():
+            compactor.join()
+
+    def _close_handle(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+            self._handle = None
+
+    def close(self):
+        self._wait_compactor()
+        with self._lock:
+            self._close_handle()
+
+
+def _atomic_write_json(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
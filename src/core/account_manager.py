@@ -1,37 +1,75 @@
-import json
 import os
-import base64
 import re
-import shutil
 import uuid
-from typing import List, Dict, Optional
-from src.config import ACCOUNTS_FILE, PROFILES_DIR
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Optional
+from src.config import (
+    ACCOUNTS_FILE,
+    ACCOUNTS_JOURNAL_FILE,
+    ACCOUNTS_JOURNAL_THRESHOLD,
+    ACCOUNTS_DB_FILE,
+    ACCOUNTS_BACKEND,
+    PROFILES_DIR,
+    PROFILES_TRASH_DIR,
+    PROFILE_OPS_FILE,
+    PROFILE_WORKER_THREADS
+)
+from src.core import account_crypto
+from src.core.account_journal import AccountJournal
+from src.core.account_store import AccountStore
+from src.core.profile_cache import ProfileCache
+from src.core.profile_worker import ProfileWorker
+from src.core.search_index import TrigramIndex
+from src.core.stats_aggregator import StatsAggregator
+from src.models import Account
 
 
 class AccountManager:
-    def __init__(self):
+    def __init__(self, backend: str = None):
+        """
+        backend: json (snapshot + journal) or sqlite
+        """
+        self.backend = (backend or ACCOUNTS_BACKEND or 'json').lower()
+        self.profile_cache = ProfileCache(PROFILES_DIR)
+        self.journal = AccountJournal(ACCOUNTS_FILE, ACCOUNTS_JOURNAL_FILE, ACCOUNTS_JOURNAL_THRESHOLD)
+        self.store = AccountStore(ACCOUNTS_DB_FILE) if self.backend == 'sqlite' else None
         self.accounts = self.load_accounts()
+        self._index = {a.get('id'): a for a in self.accounts}
+        self.search_index = TrigramIndex(source=lambda: list(self.accounts))
+        self.stats = StatsAggregator(
+            lambda a: {'type': a.get('type'), 'status': a.get('status')},
+            source=lambda: [(a['id'], a) for a in self.accounts]
+        )
+        self.stats.reset((a['id'], a) for a in self.accounts)
+        # Deletes leave gaps, so new rows go after the highest stored position rather than at len(accounts)
+        self._next_position = self.store.max_position() + 1 if self.store is not None else 0
+        self._batch = None
+        self.journal.snapshot_provider = lambda: self.accounts
+        self.key_cache = account_crypto.PasswordKeyCache()
+        self.profile_worker = ProfileWorker(PROFILES_TRASH_DIR, PROFILE_OPS_FILE, PROFILE_WORKER_THREADS)
+        self.profile_worker.resume()
     
     def load_accounts(self) -> List[Dict]:
-        """Load accounts from JSON file"""
-        if os.path.exists(ACCOUNTS_FILE):
-            try:
-                with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
-                    accounts = json.load(f)
-                    for account in accounts:
-                        if 'browser' not in account:
-                            account['browser'] = 'chrome'
-                        if 'notes' not in account:
-                            account['notes'] = ''
-                        if 'profile_path' in account and account['profile_path']:
-                            try:
-                                os.makedirs(account['profile_path'], exist_ok=True)
-                            except:
-                                pass
-                    return accounts
-            except:
-                return []
-        return []
+        """Load accounts from the configured backend"""
+        try:
+            if self.store is not None:
+                if not self.store.legacy_imported():
+                    # Databases that already hold rows predate the marker and were imported before
+                    legacy = self.journal.load() if self.store.count() == 0 else []
+                    self.store.import_accounts(legacy)
+                accounts = self.store.load_all()
+            else:
+                accounts = self.journal.load()
+        except Exception as e:
+            print(f"Error loading accounts: {e}")
+            return []
+        accounts = [Account.from_dict(a) for a in accounts]
+        for account in accounts:
+            if 'browser' not in account:
+                account['browser'] = 'chrome'
+            if 'notes' not in account:
+                account['notes'] = ''
+        return accounts
 
     def _sanitize_profile_folder(self, email: str) -> str:
         value = (email or '').strip().lower()
@@ -42,11 +80,8 @@ class AccountManager:
         return value or 'unknown'
 
     def _ensure_profile_path(self, account: Dict) -> Dict:
+        """Point profile_path at the email-based folder; folders are created on demand by BrowserManager"""
         base_dir = PROFILES_DIR
-        try:
-            os.makedirs(base_dir, exist_ok=True)
-        except:
-            pass
         email = account.get('email')
         if email:
             folder = self._sanitize_profile_folder(email)
@@ -58,7 +93,6 @@ class AccountManager:
 
         if not current:
             account['profile_path'] = target
-            os.makedirs(account['profile_path'], exist_ok=True)
             return account
 
         try:
@@ -69,44 +103,144 @@ class AccountManager:
             target_abs = target
 
         if current_abs == target_abs:
-            os.makedirs(current, exist_ok=True)
             return account
 
-        if os.path.exists(target):
+        if self.profile_cache.exists(target):
             target = os.path.join(base_dir, f"{folder}_{account.get('id','')[:8]}")
 
         try:
+            # The folder may have been created outside this manager, so check the disk before moving
             if os.path.exists(current):
-                shutil.move(current, target)
-                account['profile_path'] = target
+                if self.profile_worker.relocate(current, target):
+                    account['profile_path'] = target
+                    self.profile_cache.mark_removed(current)
+                    self.profile_cache.mark_created(target)
             else:
                 account['profile_path'] = target
-                os.makedirs(target, exist_ok=True)
-        except:
-            try:
-                os.makedirs(current, exist_ok=True)
-            except:
-                pass
+        except Exception as e:
+            print(f"Error moving profile folder: {e}")
         return account
     
-    def save_accounts(self):
-        """Save accounts to JSON file"""
-        with open(ACCOUNTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.accounts, f, indent=2, ensure_ascii=False)
-    
+    def close(self):
+        """Flush pending journal work before shutdown; unfinished profile work resumes next start"""
+        self.profile_worker.shutdown()
+        self.journal.close()
+        if self.store is not None:
+            self.store.close()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group mutations into one transaction
+        Persistence and profile deletion happen once at exit; an exception restores the previous state
+        """
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = {
+            'accounts': list(self.accounts),
+            'index': dict(self._index),
+            'originals': {},
+            'ops': [],
+            'profiles': []
+        }
+        try:
+            yield self
+        except BaseException:
+            batch, self._batch = self._batch, None
+            for account_id, original in batch['originals'].items():
+                account = batch['index'].get(account_id)
+                if account is not None:
+                    account.clear()
+                    account.update(original)
+            self.accounts[:] = batch['accounts']
+            self._index = batch['index']
+            self.search_index.invalidate()
+            self.stats.reset((a['id'], a) for a in self.accounts)
+            raise
+        else:
+            batch, self._batch = self._batch, None
+            self._flush_ops(batch['ops'])
+            for path in batch['profiles']:
+                self.profile_worker.delete(path)
+                self.profile_cache.mark_removed(path)
+
+    def _remember(self, account: Dict):
+        if self._batch is not None and account['id'] in self._batch['index']:
+            self._batch['originals'].setdefault(account['id'], account.copy())
+
+    def _flush_ops(self, ops: List[tuple]):
+        if not ops:
+            return
+        if self.store is not None:
+            with self.store.transaction():
+                for op in ops:
+                    self._write_op(op)
+        else:
+            records = []
+            for op in ops:
+                if op[0] == 'add':
+                    records.append({'op': 'add', 'account': op[1]})
+                elif op[0] == 'update':
+                    records.append({'op': 'update', 'id': op[1]['id'], 'fields': op[2]})
+                else:
+                    records.append({'op': 'remove', 'id': op[1]})
+            self.journal.append_many(records)
+
+    def _write_op(self, op: tuple):
+        if self.store is not None:
+            if op[0] == 'add':
+                self.store.upsert(op[1], self._next_position)
+                self._next_position += 1
+            elif op[0] == 'update':
+                self.store.update(op[1])
+            else:
+                self.store.delete(op[1])
+        elif op[0] == 'add':
+            self.journal.append('add', account=op[1])
+        elif op[0] == 'update':
+            self.journal.append('update', id=op[1]['id'], fields=op[2])
+        else:
+            self.journal.append('remove', id=op[1])
+
+    def _persist(self, *op):
+        if self._batch is not None:
+            self._batch['ops'].append(op)
+        else:
+            self._write_op(op)
+
+    def _persist_add(self, account: Dict):
+        self._persist('add', account)
+
+    def _persist_update(self, account: Dict, changed: Dict):
+        self._persist('update', account, changed)
+
+    def _persist_remove(self, account_id: str):
+        self._persist('remove', account_id)
+
+    def _delete_profile(self, account: Dict):
+        path = account.get('profile_path')
+        if not path or not os.path.exists(path):
+            return
+        if self._batch is not None:
+            self._batch['profiles'].append(path)
+        else:
+            self.profile_worker.delete(path)
+            self.profile_cache.mark_removed(path)
+
     def create_account(self, account_type: str, use_proxy: bool = False, 
                       proxy_mode: str = None, proxy_id: str = None) -> Dict:
         """
         account_type: g/o
         use_proxy:
-        proxy_mode: random/specific
-        proxy_id: if proxy_mode specific
+        proxy_mode: random/uniform/lru/lowest_latency (see PROXY_SELECTION_MODES) or specific
+        proxy_id: stable proxy id (ProxyManager.get_proxy) if proxy_mode specific
         """
         account_id = str(uuid.uuid4())
         profile_path = os.path.join(PROFILES_DIR, account_id)
-        os.makedirs(profile_path, exist_ok=True)
         
-        account = {
+        account = Account({
             'id': account_id,
             'type': account_type,
             'email': None,
@@ -120,7 +254,7 @@ class AccountManager:
             'proxy_mode': proxy_mode,
             'proxy_id': proxy_id,
             'notes': ''
-        }
+        })
         
         return account
     
@@ -128,10 +262,14 @@ class AccountManager:
         """Add account to the list"""
         try:
             import time
+            account = Account.from_dict(account)
             account['created_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
             account = self._ensure_profile_path(account)
             self.accounts.append(account)
-            self.save_accounts()
+            self._index[account['id']] = account
+            self.search_index.add(account)
+            self.stats.track(account['id'], account)
+            self._persist_add(account)
             return True
         except Exception as e:
             print(f"Error adding account: {e}")
@@ -140,92 +278,75 @@ class AccountManager:
     def update_account(self, account_id: str, **kwargs) -> bool:
         """Update account info"""
         try:
-            for account in self.accounts:
-                if account['id'] == account_id:
-                    email_before = account.get('email')
-                    for key, value in kwargs.items():
-                        if key in account:
-                            account[key] = value
-
-                    if 'email' in kwargs and kwargs.get('email') and kwargs.get('email') != email_before:
-                        account = self._ensure_profile_path(account)
-                    self.save_accounts()
-                    return True
-            return False
+            account = self._index.get(account_id)
+            if account is None:
+                return False
+
+            self._remember(account)
+            email_before = account.get('email')
+            changed = {}
+            for key, value in kwargs.items():
+                if key in account:
+                    account[key] = value
+                    changed[key] = value
+
+            if 'email' in kwargs and kwargs.get('email') and kwargs.get('email') != email_before:
+                account = self._ensure_profile_path(account)
+                changed['profile_path'] = account.get('profile_path')
+            if changed:
+                if 'email' in changed or 'name' in changed or 'notes' in changed:
+                    self.search_index.update(account)
+                if 'type' in changed or 'status' in changed:
+                    self.stats.track(account_id, account)
+                self._persist_update(account, changed)
+            return True
         except Exception as e:
             print(f"Error updating account: {e}")
             return False
 
-    def export_accounts_encrypted(self, file_path: str, password: str) -> None:
+    def migrate_proxy_ids(self, resolve: Callable[[str], Optional[str]]) -> int:
+        """
+        Rewrite proxy_id of accounts with resolve(proxy_id) (legacy list index -> stable proxy id)
+        References resolve() does not know are left as they are; returns the number of accounts changed
+        """
+        changed = 0
+        with self.batch():
+            for account in self.accounts:
+                ref = account.get('proxy_id')
+                if ref is None or ref == '':
+                    continue
+                new_ref = resolve(ref)
+                if new_ref is not None and new_ref != ref:
+                    self.update_account(account['id'], proxy_id=new_ref)
+                    changed += 1
+        return changed
+
+    def export_accounts_encrypted(self, file_path: str, password: str, progress_callback=None) -> int:
+        """Stream accounts into an encrypted v2 export; returns the number exported"""
         if not password:
             raise Exception("Password is required")
 
-        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-        from cryptography.hazmat.primitives import hashes
-        from cryptography.fernet import Fernet
-
-        salt = os.urandom(16)
-        iterations = 200000
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=iterations,
+        accounts = list(self.accounts)
+        return account_crypto.export_v2(
+            file_path,
+            (a.copy() for a in accounts),
+            len(accounts),
+            password,
+            self.key_cache,
+            progress_callback
         )
 
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
-        fernet = Fernet(key)
-        plaintext = json.dumps(self.accounts, ensure_ascii=False).encode('utf-8')
-        token = fernet.encrypt(plaintext)
-
-        payload = {
-            'v': 1,
-            'salt': base64.b64encode(salt).decode('utf-8'),
-            'iter': iterations,
-            'data': token.decode('utf-8')
-        }
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
-
-    def import_accounts_encrypted(self, file_path: str, password: str) -> int:
+    def import_accounts_encrypted(self, file_path: str, password: str, progress_callback=None) -> int:
+        """Import accounts from a v2 (streamed) or v1 encrypted export"""
         if not password:
             raise Exception("Password is required")
 
-        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-        from cryptography.hazmat.primitives import hashes
-        from cryptography.fernet import Fernet, InvalidToken
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            payload = json.load(f)
-
-        salt = base64.b64decode(payload.get('salt') or '')
-        iterations = int(payload.get('iter') or 200000)
-        token = (payload.get('data') or '').encode('utf-8')
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=iterations,
-        )
-
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
-        fernet = Fernet(key)
-
-        try:
-            plaintext = fernet.decrypt(token)
-        except InvalidToken:
-            raise Exception("Invalid password or file")
-
-        imported = json.loads(plaintext.decode('utf-8'))
-        if not isinstance(imported, list):
-            raise Exception("Invalid file")
-
-        existing_ids = {a.get('id') for a in self.accounts}
-        count = 0
+        imported = account_crypto.read_accounts(file_path, password, self.key_cache, progress_callback)
 
+        # Decrypt and normalise the whole file off to the side first: the batch below is instance-wide, so
+        # holding it open while reading would sweep GUI edits into the import and roll them back on a bad frame
+        existing_ids = set(self._index)
+        rows = []
         for acc in imported:
             if not isinstance(acc, dict):
                 continue
@@ -236,6 +357,7 @@ class AccountManager:
                 acc['id'] = str(uuid.uuid4())
 
             existing_ids.add(acc['id'])
+            acc = Account.from_dict(acc)
 
             if 'browser' not in acc:
                 acc['browser'] = 'chrome'
@@ -243,64 +365,81 @@ class AccountManager:
                 acc['notes'] = ''
             if not acc.get('profile_path'):
                 acc['profile_path'] = os.path.join(PROFILES_DIR, acc['id'])
-
-            acc = self._ensure_profile_path(acc)
-            self.accounts.append(acc)
-            count += 1
-
-        if count > 0:
-            self.save_accounts()
-
-        return count
+            rows.append(acc)
+
+        with self.batch():
+            for acc in rows:
+                if acc['id'] in self._index:
+                    acc['id'] = str(uuid.uuid4())
+                acc = self._ensure_profile_path(acc)
+                self.accounts.append(acc)
+                self._index[acc['id']] = acc
+                self.search_index.add(acc)
+                self.stats.track(acc['id'], acc)
+                self._persist_add(acc)
+
+        return len(rows)
     
     def remove_account(self, account_id: str, delete_profile: bool = True) -> bool:
         """Remove account by ID"""
         try:
-            for i, account in enumerate(self.accounts):
-                if account['id'] == account_id:
-                    if delete_profile and os.path.exists(account['profile_path']):
-                        import shutil
-                        shutil.rmtree(account['profile_path'], ignore_errors=True)
-                    
+            account = self._index.get(account_id)
+            if account is None:
+                return False
+
+            if delete_profile:
+                self._delete_profile(account)
+
+            for i, candidate in enumerate(self.accounts):
+                if candidate is account:
                     self.accounts.pop(i)
-                    self.save_accounts()
-                    return True
-            return False
+                    break
+            del self._index[account_id]
+            self.search_index.remove(account_id)
+            self.stats.untrack(account_id)
+            self._persist_remove(account_id)
+            return True
         except Exception as e:
             print(f"Error removing account: {e}")
             return False
     
     def remove_accounts(self, account_ids: List[str], delete_profiles: bool = True) -> int:
         """Remove multiple accounts"""
-        count = 0
-        for account_id in account_ids:
-            if self.remove_account(account_id, delete_profiles):
-                count += 1
-        return count
+        targets = {account_id for account_id in account_ids if account_id in self._index}
+        if not targets:
+            return 0
+
+        with self.batch():
+            for account_id in targets:
+                account = self._index.pop(account_id)
+                self.search_index.remove(account_id)
+                self.stats.untrack(account_id)
+                if delete_profiles:
+                    self._delete_profile(account)
+                self._persist_remove(account_id)
+            self.accounts[:] = [a for a in self.accounts if a['id'] not in targets]
+        return len(targets)
     
     def get_account(self, account_id: str) -> Optional[Dict]:
         """Get account by ID"""
-        for account in self.accounts:
-            if account['id'] == account_id:
-                return account
-        return None
+        return self._index.get(account_id)
     
     def get_all_accounts(self) -> List[Dict]:
         """Get all accounts"""
         return self.accounts
     
-    def search_accounts(self, query: str) -> List[Dict]:
-        """Search accounts by email or name"""
-        query = query.lower()
-        results = []
-        for account in self.accounts:
-            if (account.get('email') and query in account['email'].lower()) or \
-               (account.get('name') and query in account['name'].lower()):
-                results.append(account)
-        return results
+    def _accounts_by_ids(self, account_ids: List[str]) -> List[Dict]:
+        return [self._index[i] for i in account_ids if i in self._index]
+    
+    def search_accounts(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Search accounts by email, name or notes, best match first"""
+        return self._accounts_by_ids(self.search_index.search(query, limit))
     
     def filter_accounts(self, account_type: str = None, status: str = None) -> List[Dict]:
         """Filter accounts by type or status"""
+        if self.store is not None and (account_type or status):
+            return self._accounts_by_ids(self.store.filter_ids(account_type, status))
+
         filtered = self.accounts
         
         if account_type:
@@ -313,15 +452,15 @@ class AccountManager:
     
     def get_account_stats(self) -> Dict:
         """Get statistics about account"""
-        total = len(self.accounts)
-        google = len([a for a in self.accounts if a['type'] == 'google'])
-        outlook = len([a for a in self.accounts if a['type'] == 'outlook'])
-        logged_in = len([a for a in self.accounts if a['status'] == 'logged_in'])
+        snapshot = self.stats.snapshot()
+        types = snapshot.get('type', {})
+        total = snapshot['total']
+        logged_in = snapshot.get('status', {}).get('logged_in', 0)
         
         return {
             'total': total,
-            'google': google,
-            'outlook': outlook,
+            'google': types.get('google', 0),
+            'outlook': types.get('outlook', 0),
             'logged_in': logged_in,
             'not_logged_in': total - logged_in
         }
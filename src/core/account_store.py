@@ -0,0 +1,178 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+from src.models import json_default
+
+# PRAGMA user_version once accounts.json has been imported
+LEGACY_IMPORTED = 1
+
+
+class AccountStore:
+    """SQLite account storage with indexed lookups"""
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._in_transaction = False
+        self._generated = self._create_schema()
+
+    def _create_schema(self) -> bool:
+        columns = """
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            type TEXT,
+            status TEXT,
+            email TEXT,
+            name TEXT,
+            data TEXT NOT NULL
+        """
+        generated = True
+        try:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    {columns},
+                    email_lower TEXT GENERATED ALWAYS AS (lower(email)) VIRTUAL,
+                    name_lower TEXT GENERATED ALWAYS AS (lower(name)) VIRTUAL
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite < 3.31 has no generated columns; maintain them on write instead
+            generated = False
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    {columns},
+                    email_lower TEXT,
+                    name_lower TEXT
+                )
+            """)
+
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_email ON accounts(email_lower)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_type ON accounts(type)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_status ON accounts(status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accounts_position ON accounts(position)")
+        return generated
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one SQLite transaction; nested calls join the outer one"""
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+
+    def _row_values(self, account: Dict, position: int) -> tuple:
+        email = account.get('email')
+        name = account.get('name')
+        values = (
+            account['id'],
+            position,
+            account.get('type'),
+            account.get('status'),
+            email,
+            name,
+            json.dumps(account, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        )
+        if not self._generated:
+            values += (email.lower() if email else None, name.lower() if name else None)
+        return values
+
+    def _upsert_sql(self) -> str:
+        if self._generated:
+            return ("INSERT OR REPLACE INTO accounts (id, position, type, status, email, name, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)")
+        return ("INSERT OR REPLACE INTO accounts "
+                "(id, position, type, status, email, name, data, email_lower, name_lower) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def upsert(self, account: Dict, position: int):
+        with self._lock:
+            self._conn.execute(self._upsert_sql(), self._row_values(account, position))
+
+    def update(self, account: Dict):
+        """Rewrite one row from the current state of the account"""
+        email = account.get('email')
+        name = account.get('name')
+        data = json.dumps(account, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        with self._lock:
+            if self._generated:
+                self._conn.execute(
+                    "UPDATE accounts SET type = ?, status = ?, email = ?, name = ?, data = ? WHERE id = ?",
+                    (account.get('type'), account.get('status'), email, name, data, account['id'])
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE accounts SET type = ?, status = ?, email = ?, name = ?, data = ?, "
+                    "email_lower = ?, name_lower = ? WHERE id = ?",
+                    (account.get('type'), account.get('status'), email, name, data,
+                     email.lower() if email else None, name.lower() if name else None, account['id'])
+                )
+
+    def delete(self, account_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+
+    def load_all(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM accounts ORDER BY position").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def max_position(self) -> int:
+        with self._lock:
+            value = self._conn.execute("SELECT MAX(position) FROM accounts").fetchone()[0]
+        return -1 if value is None else value
+
+    def filter_ids(self, account_type: str = None, status: str = None) -> List[str]:
+        clauses = []
+        params = []
+        if account_type:
+            clauses.append("type = ?")
+            params.append(account_type)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM accounts {where} ORDER BY position", params).fetchall()
+        return [row[0] for row in rows]
+
+    def legacy_imported(self) -> bool:
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_IMPORTED
+
+    def import_accounts(self, accounts: List[Dict]) -> int:
+        """One-shot import of accounts loaded from accounts.json; marks the database so it never reruns"""
+        start = self.max_position() + 1
+        with self.transaction():
+            self._conn.executemany(
+                self._upsert_sql(),
+                (self._row_values(a, start + i) for i, a in enumerate(accounts) if a.get('id'))
+            )
+            self._conn.execute(f"PRAGMA user_version = {LEGACY_IMPORTED}")
+        return len(accounts)
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
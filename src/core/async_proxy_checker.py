@@ -0,0 +1,351 @@
+import asyncio
+import ipaddress
+import json
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from src.core import proxy_handshake
+from src.core.concurrency_controller import AIMDController
+
+DEFAULT_ENDPOINTS = (
+    'http://httpbin.org/ip',
+    'http://api.ipify.org/?format=json',
+    'http://ip-api.com/json',
+)
+
+# Outcomes of a single endpoint probe
+OK = 'ok'
+PROXY_DOWN = 'proxy_down'
+ENDPOINT_FAILED = 'endpoint_failed'
+
+# Bytes of an endpoint response read to find the exit IP
+MAX_BODY = 4096
+
+# JSON keys IP echo services put the caller's address under (httpbin, ipify, ip-api, ...)
+_IP_KEYS = ('origin', 'ip', 'query', 'ip_addr', 'ip_address', 'address')
+_IPV4_RE = re.compile(rb'(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.])')
+
+
+def parse_endpoint(url: str) -> Tuple[str, int, str]:
+    """'http://host[:port]/path?query' -> (host, port, path?query); only plain http is probed"""
+    parts = urlsplit(url if '://' in url else f"http://{url}")
+    if parts.scheme != 'http' or not parts.hostname:
+        raise ValueError(f"Unsupported check endpoint: {url}")
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return parts.hostname, parts.port or 80, path
+
+
+def _valid_ip(text) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(str(text).strip()))
+    except ValueError:
+        return None
+
+
+def extract_ip(body: bytes) -> Optional[str]:
+    """Exit IP from an echo endpoint's response body: a known JSON key, a bare address, or the first IPv4 in it"""
+    text = body.strip()
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        for key in _IP_KEYS:
+            if data.get(key):
+                # httpbin lists the whole forwarding chain in 'origin'; the first hop is the client
+                ip = _valid_ip(str(data[key]).split(',')[0])
+                if ip:
+                    return ip
+    elif isinstance(data, str):
+        ip = _valid_ip(data)
+        if ip:
+            return ip
+    ip = _valid_ip(text.decode('ascii', 'replace'))
+    if ip:
+        return ip
+    match = _IPV4_RE.search(text)
+    return _valid_ip(match.group().decode()) if match else None
+
+
+class EndpointStats:
+    """Success rate and smoothed latency of one test endpoint, used to rank endpoints"""
+
+    ALPHA = 0.2
+
+    def __init__(self, url: str):
+        self.url = url
+        self.attempts = 0
+        self.successes = 0
+        self.latency = None
+
+    def record(self, success: bool, latency: float):
+        self.attempts += 1
+        if success:
+            self.successes += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.ALPHA * (latency - self.latency)
+
+    def success_rate(self) -> float:
+        # Laplace prior so new endpoints are neither trusted nor shunned
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def to_dict(self) -> Dict:
+        return {
+            'attempts': self.attempts,
+            'successes': self.successes,
+            'success_rate': round(self.success_rate(), 3),
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None
+        }
+
+
+class AsyncProxyChecker:
+    """
+    Health checks for many proxies on one asyncio event loop
+    Each probe opens a TCP connection to the proxy, runs the SOCKS5 handshake from proxy_handshake and
+    sends a plain GET through the tunnel (HTTP proxies get the GET with an absolute URI instead, no
+    CONNECT), then reads the status line; the latency
+    stops there, and the start of the body is read to learn the exit IP the endpoint saw.
+    Every phase (connect, handshake, response) has its own timeout.
+    Endpoints are hedged: the best-ranked one starts first, the next one starts after hedge_delay
+    (or as soon as a probe fails), and the first success wins
+    """
+
+    SUPPORTED_PROTOCOLS = ('socks5', 'socks', 'http', 'https')
+
+    def __init__(
+        self,
+        concurrency: int = 500,
+        connect_timeout: float = 5.0,
+        handshake_timeout: float = 5.0,
+        response_timeout: float = 10.0,
+        endpoints: Iterable[str] = DEFAULT_ENDPOINTS,
+        hedge_delay: float = 0.75,
+        adaptive: bool = True
+    ):
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.handshake_timeout = handshake_timeout
+        self.response_timeout = response_timeout
+        self.hedge_delay = hedge_delay
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self.set_endpoints(endpoints)
+
+    def set_endpoints(self, urls: Iterable[str]):
+        """Replace the test endpoints (URLs); invalid entries are skipped and stats start fresh"""
+        endpoints = []
+        for url in urls:
+            try:
+                endpoints.append((url, parse_endpoint(url)))
+            except ValueError as e:
+                print(f"Invalid test endpoint {url}: {e}")
+        if not endpoints:
+            endpoints = [(url, parse_endpoint(url)) for url in DEFAULT_ENDPOINTS]
+        with self._lock:
+            self.endpoints = endpoints
+            self.endpoint_stats = {url: EndpointStats(url) for url, _ in endpoints}
+
+    def ranked_endpoints(self) -> List[Tuple[str, Tuple[str, int, str]]]:
+        """Endpoints best first: higher success rate, then lower latency; configured order if not adaptive"""
+        with self._lock:
+            endpoints = list(self.endpoints)
+            if not self.adaptive:
+                return endpoints
+            stats = self.endpoint_stats
+
+            def score(item):
+                entry = stats[item[0]]
+                latency = entry.latency if entry.latency is not None else self.hedge_delay
+                return (-round(entry.success_rate(), 1), latency)
+
+            return sorted(endpoints, key=score)
+
+    def ranked_urls(self) -> List[str]:
+        return [url for url, _ in self.ranked_endpoints()]
+
+    def _record(self, url: str, success: bool, latency: float):
+        with self._lock:
+            entry = self.endpoint_stats.get(url)
+            if entry is not None:
+                entry.record(success, latency)
+
+    def get_endpoint_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {url: entry.to_dict() for url, entry in self.endpoint_stats.items()}
+
+    def supports(self, proxy: Dict) -> bool:
+        return (proxy.get('protocol') or '').lower() in self.SUPPORTED_PROTOCOLS
+
+    async def _read_body(self, reader: asyncio.StreamReader) -> bytes:
+        """Response body after the status line (at most MAX_BODY bytes); headers are skipped"""
+        while True:
+            line = await reader.readline()
+            if not line or line in (b'\r\n', b'\n'):
+                break
+        body = b''
+        while len(body) < MAX_BODY:
+            chunk = await reader.read(MAX_BODY - len(body))
+            if not chunk:
+                break
+            body += chunk
+        return body
+
+    async def _exit_ip(self, reader: asyncio.StreamReader) -> Optional[str]:
+        try:
+            body = await asyncio.wait_for(self._read_body(reader), self.response_timeout)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return None
+        return extract_ip(body)
+
+    async def _probe_endpoint(
+        self, proxy: Dict, endpoint: Tuple[str, int, str]
+    ) -> Tuple[str, float, Optional[str]]:
+        """Return (outcome, seconds, exit IP) for one endpoint; seconds is this probe's own latency"""
+        host, port, path = endpoint
+        start = time.time()
+        writer = None
+        try:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(proxy['host'], int(proxy['port'])),
+                    self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError, ValueError):
+                return PROXY_DOWN, time.time() - start, None
+
+            host_header = host if port == 80 else f"{host}:{port}"
+            if proxy_handshake.is_http_proxy(proxy):
+                # Forward the GET like a browser does for http:// URLs; many HTTP proxies (Squid's default
+                # SSL_ports) refuse CONNECT to anything but 443
+                target = f"http://{host_header}{path}"
+                auth = proxy_handshake.proxy_authorization(proxy)
+            else:
+                await asyncio.wait_for(
+                    proxy_handshake.run_async(reader, writer, proxy_handshake.tunnel_handshake(proxy, host, port)),
+                    self.handshake_timeout
+                )
+                target = path
+                auth = ""
+
+            writer.write(
+                f"GET {target} HTTP/1.1\r\nHost: {host_header}\r\n{auth}"
+                f"Accept: */*\r\nConnection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), self.response_timeout)
+            parts = status_line.split()
+            if len(parts) < 2 or parts[1] != b'200':
+                return ENDPOINT_FAILED, time.time() - start, None
+            elapsed = time.time() - start
+            return OK, elapsed, await self._exit_ip(reader)
+        except (OSError, asyncio.TimeoutError, proxy_handshake.ProxyHandshakeError, ValueError, IndexError):
+            return ENDPOINT_FAILED, time.time() - start, None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def probe(self, proxy: Dict) -> Tuple[bool, float, Optional[str]]:
+        """
+        Return (alive, seconds, exit IP) for one proxy
+        seconds is the winning probe's own latency, or the total time spent when every probe failed;
+        exit IP is None when the proxy is dead or the endpoint's answer held no address
+        """
+        start = time.time()
+        queue = self.ranked_endpoints()
+        running = {}
+
+        def launch():
+            url, endpoint = queue.pop(0)
+            task = asyncio.ensure_future(self._probe_endpoint(proxy, endpoint))
+            running[task] = url
+
+        launch()
+        try:
+            while running:
+                timeout = self.hedge_delay if queue else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Hedge: the current probes are slow, start the next endpoint alongside them
+                    launch()
+                    continue
+                for task in done:
+                    url = running.pop(task)
+                    outcome, latency, exit_ip = task.result()
+                    if outcome == OK:
+                        self._record(url, True, latency)
+                        return True, latency, exit_ip
+                    if outcome == PROXY_DOWN:
+                        # Nothing is listening; other endpoints would fail the same way
+                        return False, time.time() - start, None
+                    self._record(url, False, latency)
+                    if queue:
+                        # A failed endpoint frees its hedge slot right away
+                        launch()
+            return False, time.time() - start, None
+        finally:
+            for task in running:
+                task.cancel()
+
+    def timed_out(self, alive: bool, elapsed: float) -> bool:
+        """Whether a failed probe most likely ran into a timeout (overload signal for the controller)"""
+        return not alive and elapsed >= self.connect_timeout
+
+    async def check_many(
+        self,
+        items: List[Tuple[int, Dict]],
+        on_result: Callable[[int, Dict, bool, float, Optional[str]], None],
+        controller: Optional[AIMDController] = None
+    ):
+        """
+        Probe (index, proxy) items with at most self.concurrency in flight;
+        on_result(index, proxy, alive, seconds, exit_ip) runs for each
+        With a controller, in-flight probes are limited by its adaptive window instead
+        """
+        pending = iter(items)
+
+        async def worker():
+            for index, proxy in pending:
+                if controller is not None:
+                    await controller.acquire()
+                try:
+                    alive, elapsed, exit_ip = await self.probe(proxy)
+                except Exception as e:
+                    print(f"Proxy check error: {e}")
+                    alive, elapsed, exit_ip = False, 0.0, None
+                if controller is not None:
+                    controller.release(self.timed_out(alive, elapsed))
+                on_result(index, proxy, alive, elapsed, exit_ip)
+
+        limit = controller.maximum if controller is not None else self.concurrency
+        workers = min(limit, len(items))
+        if not workers:
+            return
+        if controller is None:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            return
+        async with controller:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+
+    def run(
+        self,
+        items: List[Tuple[int, Dict]],
+        on_result: Callable[[int, Dict, bool, float, Optional[str]], None],
+        controller: Optional[AIMDController] = None
+    ):
+        """Blocking entry point: run check_many on a fresh event loop in the calling thread"""
+        asyncio.run(self.check_many(items, on_result, controller))
+
+    def check(self, proxy: Dict) -> Optional[Tuple[bool, float, Optional[str]]]:
+        """Blocking single-proxy probe; None if the protocol is not supported"""
+        if not self.supports(proxy):
+            return None
+        return asyncio.run(self.probe(proxy))
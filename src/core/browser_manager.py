@@ -23,13 +23,20 @@ from pathlib import Path
 from typing import Optional, Dict
 from src.config import CHROME_OPTIONS
 from src.core.local_proxy_manager import LocalProxyManager
+from src.core.profile_cache import ProfileCache
 
 
 class BrowserManager:
-    def __init__(self):
+    def __init__(self, profile_cache: Optional[ProfileCache] = None):
+        """
+        profile_cache: shared with AccountManager so folders created here are known to exist
+        """
         self.drivers = {} 
         self.local_proxy_manager = LocalProxyManager()
+        self.profile_cache = profile_cache
         self._cached_driver_path = None
+        # Called with account_id whenever an account's browser goes away (e.g. to release its proxy lease)
+        self.on_browser_closed = None
     
     def _get_chrome_version(self):
         try:
@@ -344,8 +351,12 @@ console.log('[Stealth] Anti-detect applied');
             if browser_type not in ['chrome', 'chrome_mobile', 'edge', 'firefox']:
                 browser_type = 'chrome'
 
+            # Profile folders are only materialised here, the first time a browser needs one
             profile_dir = Path(profile_path).resolve()
-            profile_dir.mkdir(parents=True, exist_ok=True)
+            if self.profile_cache is not None:
+                self.profile_cache.ensure(str(profile_dir))
+            else:
+                profile_dir.mkdir(parents=True, exist_ok=True)
 
             if browser_type == 'chrome':
                 browser_profile_dir = profile_dir
@@ -590,6 +601,7 @@ console.log('[Stealth] Anti-detect applied');
         except Exception as e:
             if proxy:
                 self.local_proxy_manager.stop_local_proxy(account_id)
+            self._notify_closed(account_id)
             print(f"Error creating browser: {e}")
             raise e
     
@@ -622,6 +634,14 @@ console.log('[Stealth] Anti-detect applied');
                 pass
 
         self.local_proxy_manager.stop_local_proxy(account_id)
+        self._notify_closed(account_id)
+
+    def _notify_closed(self, account_id: str):
+        if self.on_browser_closed is not None:
+            try:
+                self.on_browser_closed(account_id)
+            except Exception as e:
+                print(f"Browser close hook error: {e}")
 
     def is_driver_responsive(self, account_id: str, timeout: int = 2) -> bool:
         driver = self.drivers.get(account_id)
@@ -663,6 +683,7 @@ console.log('[Stealth] Anti-detect applied');
                 return True
             except:
                 del self.drivers[account_id]
+                self._notify_closed(account_id)
                 return False
         return False
     
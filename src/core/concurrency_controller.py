@@ -0,0 +1,171 @@
+import asyncio
+import collections
+import os
+import time
+from typing import Dict, Optional
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight checks for one event loop
+    Every interval the controller looks at what finished since the last tick:
+      - timeout rate spiking more than timeout_threshold above its running baseline, event-loop lag above lag_threshold or process CPU above
+        cpu_threshold (share of all cores) -> window *= decrease (never below minimum)
+      - otherwise, if the window was actually in use -> window += increase (never above maximum)
+    Callers wrap each check in acquire() / release(timed_out)
+    """
+
+    def __init__(
+        self,
+        initial: int = 50,
+        minimum: int = 5,
+        maximum: int = 500,
+        increase: int = 10,
+        decrease: float = 0.5,
+        interval: float = 0.5,
+        timeout_threshold: float = 0.2,
+        lag_threshold: float = 0.1,
+        cpu_threshold: float = 0.9,
+        min_samples: int = 10
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.window = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.interval = interval
+        self.timeout_threshold = timeout_threshold
+        self.lag_threshold = lag_threshold
+        self.cpu_threshold = cpu_threshold
+        self.min_samples = min_samples
+
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.peak_in_flight = 0
+        self.checks_per_sec = 0.0
+        self.timeout_rate = 0.0
+        # Slow average of the timeout rate: a list full of dead proxies times out steadily, which is
+        # not congestion; only a rise above this baseline is
+        self.timeout_baseline = 0.0
+        self.loop_lag = 0.0
+        self.cpu = 0.0
+        self.backoffs = 0
+        self._cores = os.cpu_count() or 1
+        self._waiters = collections.deque()
+        self._monitor = None
+
+    async def acquire(self):
+        while self.in_flight >= self.window:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, timed_out: bool = False):
+        self.in_flight -= 1
+        self.completed += 1
+        if timed_out:
+            self.timeouts += 1
+        self._wake()
+
+    def _wake(self):
+        free = self.window - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def start(self):
+        """Start the adjusting task on the running loop"""
+        if self._monitor is None:
+            self._monitor = asyncio.ensure_future(self._adjust_loop())
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def __aenter__(self) -> 'AIMDController':
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _adjust_loop(self):
+        last_wall = time.time()
+        last_cpu = time.process_time()
+        last_completed = self.completed
+        last_timeouts = self.timeouts
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.time()
+            cpu_now = time.process_time()
+            wall = max(now - last_wall, 1e-6)
+            self.loop_lag = max(0.0, wall - self.interval)
+            self.cpu = (cpu_now - last_cpu) / wall / self._cores
+
+            done = self.completed - last_completed
+            timeouts = self.timeouts - last_timeouts
+            self.timeout_rate = timeouts / done if done else 0.0
+            rate = done / wall
+            self.checks_per_sec = rate if not self.checks_per_sec else 0.5 * self.checks_per_sec + 0.5 * rate
+
+            self._tick(done)
+            last_wall, last_cpu = now, cpu_now
+            last_completed, last_timeouts = self.completed, self.timeouts
+
+    def _tick(self, done: int):
+        spike = False
+        if done >= self.min_samples:
+            spike = self.timeout_rate - self.timeout_baseline > self.timeout_threshold
+            self.timeout_baseline += 0.2 * (self.timeout_rate - self.timeout_baseline)
+        overloaded = spike or self.loop_lag > self.lag_threshold or self.cpu > self.cpu_threshold
+        if overloaded:
+            self.window = max(self.minimum, int(self.window * self.decrease))
+            self.backoffs += 1
+        elif self.in_flight + len(self._waiters) >= self.window:
+            # Only grow while there is queued work to use the extra room
+            self.window = min(self.maximum, self.window + self.increase)
+            self._wake()
+
+    def snapshot(self) -> Dict:
+        """Current state for progress reporting"""
+        return {
+            'window': self.window,
+            'in_flight': self.in_flight,
+            'checks_per_sec': round(self.checks_per_sec, 1),
+            'timeout_rate': round(self.timeout_rate, 3),
+            'loop_lag_ms': round(self.loop_lag * 1000, 1),
+            'backoffs': self.backoffs
+        }
+
+
+def from_limits(limits: Optional[Dict] = None, cap: Optional[int] = None) -> AIMDController:
+    """
+    Controller from a {'initial', 'min', 'max', ...} dict like PROXY_CHECK_CONCURRENCY_LIMITS
+    cap (an engine's own worker count) bounds the window on top of limits['max']
+    """
+    limits = dict(limits or {})
+    maximum = limits.get('max', 500)
+    if cap is not None:
+        maximum = min(cap, maximum)
+    return AIMDController(
+        initial=min(limits.get('initial', 50), maximum),
+        minimum=min(limits.get('min', 5), maximum),
+        maximum=maximum,
+        increase=limits.get('increase', 10),
+        timeout_threshold=limits.get('timeout_threshold', 0.2)
+    )
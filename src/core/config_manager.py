@@ -1,6 +1,6 @@
 import json
 import os
-from src.config import CONFIG_FILE
+from src.config import CONFIG_FILE, PROXY_CHECK_CONCURRENCY_LIMITS, PROXY_CHECK_ENDPOINTS
 
 
 class ConfigManager:
@@ -43,3 +43,17 @@ class ConfigManager:
     def set_ip2location_api_key(self, api_key):
         """Set IP2Location API key"""
         return self.set('ip2location_api_key', api_key)
+    
+    def get_proxy_check_endpoints(self):
+        """Get proxy check endpoint URLs"""
+        return self.get('proxy_check_endpoints') or list(PROXY_CHECK_ENDPOINTS)
+    
+    def set_proxy_check_endpoints(self, urls):
+        """Set proxy check endpoint URLs"""
+        return self.set('proxy_check_endpoints', list(urls))
+    
+    def get_proxy_check_concurrency_limits(self):
+        """Get adaptive proxy check limits (settings defaults, overridden per key by config)"""
+        limits = dict(PROXY_CHECK_CONCURRENCY_LIMITS)
+        limits.update(self.get('proxy_check_concurrency') or {})
+        return limits
@@ -0,0 +1,457 @@
+"""
+Local IP echo endpoint and fake upstream proxies for offline proxy checks and benchmarks
+    EchoServer       - answers every GET with the observed client IP as JSON ({"ip": ..., "origin": ...});
+                       /ip2location?ip=... answers like api.ip2location.io, as a stand-in for advanced checks
+    FakeSocks5Proxy  - SOCKS5 upstream (no auth or username/password)
+    FakeHttpProxy    - HTTP upstream: CONNECT tunnels and absolute-URI forwarding (what requests sends);
+                       connect_ports limits CONNECT to some ports, like Squid's SSL_ports (443)
+The fake proxies take a per-handshake latency, a failure rate and optional credentials. upstream=(host, port)
+sends every tunnel there instead of the requested target, so check endpoints with made-up host names
+(e.g. http://echo.test/ip) resolve to a local EchoServer without DNS.
+
+Run standalone: python -m src.core.echo_server [--echo-port 8899] [--socks-port 1080] [--http-port 8080]
+                [--latency 0.05] [--failure-rate 0.1] [--auth user:pass] [--connect-ports 443]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import socket
+import struct
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+MAX_HEADER_BYTES = 65536
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _relay(client_reader, client_writer, remote_reader, remote_writer):
+    await asyncio.gather(_pipe(client_reader, remote_writer), _pipe(remote_reader, client_writer))
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Request line + headers, or None if the client went away"""
+    try:
+        return await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+        return None
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+    lines = head.decode('latin-1').split("\r\n")
+    method, target = (lines[0].split() + ['', ''])[:2]
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+
+class _Server:
+    """Common start/stop for the asyncio servers below"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._server = None
+        self.connections = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        raise NotImplementedError
+
+    async def _accept(self, reader, writer):
+        self.connections += 1
+        try:
+            await self._handle(reader, writer)
+        except (OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> int:
+        """Bind and start serving; returns the bound port (useful with port=0)"""
+        self._server = await asyncio.start_server(self._accept, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class EchoServer(_Server):
+    """Minimal HTTP endpoint returning the caller's IP; usable as a proxy check endpoint"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        super().__init__(host, port)
+        self.latency = latency
+        self.ip2location_lookups = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/ip"
+
+    @property
+    def ip2location_url(self) -> str:
+        return f"http://{self.host}:{self.port}/ip2location"
+
+    @staticmethod
+    def ip2location_answer(ip: str) -> Dict:
+        """Deterministic fake IP2Location record: same IP, same fraud score"""
+        fraud_score = zlib.crc32(ip.encode()) % 100
+        return {
+            'ip': ip,
+            'country_name': 'Localhost',
+            'isp': 'Echo Server',
+            'is_proxy': fraud_score >= 50,
+            'fraud_score': fraud_score,
+            'proxy': {'proxy_type': 'PUB' if fraud_score >= 50 else '-', 'is_vpn': False, 'is_tor': False}
+        }
+
+    async def _handle(self, reader, writer):
+        head = await _read_head(reader)
+        if head is None:
+            return
+        _, target, _ = _parse_head(head)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        ip = writer.get_extra_info('peername')[0]
+        parts = urlsplit(target)
+        if parts.path == '/ip2location':
+            self.ip2location_lookups += 1
+            queried = parse_qs(parts.query).get('ip', [ip])[0]
+            body = json.dumps(self.ip2location_answer(queried)).encode()
+        else:
+            body = json.dumps({'ip': ip, 'origin': ip, 'path': parts.path or '/'}).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+
+
+class _FakeProxy(_Server):
+    protocol = ''
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        upstream: Optional[Tuple[str, int]] = None
+    ):
+        """
+        latency: seconds added before each handshake reply (simulated round trip)
+        failure_rate: share of tunnel requests refused (SOCKS5 reply 0x05 / HTTP 502)
+        upstream: (host, port) every tunnel connects to, regardless of the requested target
+        """
+        super().__init__(host, port)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.username = username
+        self.password = password
+        self.upstream = upstream
+        self.tunnels = 0
+        self.failures = 0
+        self.auth_failures = 0
+
+    def proxy_dict(self) -> Dict:
+        """Proxy entry in ProxyManager's format"""
+        return {
+            'protocol': self.protocol,
+            'host': self.host,
+            'port': self.port,
+            'username': self.username or '',
+            'password': self.password or ''
+        }
+
+    def proxy_string(self) -> str:
+        """Line for ProxyManager.add_proxy / proxy files (protocol://host:port[:user:pass])"""
+        host = f"[{self.host}]" if ':' in self.host else self.host
+        line = f"{self.protocol}://{host}:{self.port}"
+        if self.username and self.password:
+            line += f":{self.username}:{self.password}"
+        return line
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _should_fail(self) -> bool:
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+    async def _open_target(self, host: str, port: int):
+        if self.upstream is not None:
+            host, port = self.upstream
+        return await asyncio.open_connection(host, port)
+
+
+class FakeSocks5Proxy(_FakeProxy):
+    protocol = 'socks5'
+
+    async def _handle(self, reader, writer):
+        version, count = await reader.readexactly(2)
+        methods = await reader.readexactly(count)
+        await self._delay()
+        if version != 0x05:
+            return
+        wants_auth = bool(self.username and self.password)
+        method = 0x02 if wants_auth else 0x00
+        if method not in methods:
+            writer.write(b'\x05\xff')
+            await writer.drain()
+            return
+        writer.write(bytes((0x05, method)))
+        await writer.drain()
+
+        if wants_auth:
+            await reader.readexactly(1)
+            username = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+            password = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+            await self._delay()
+            if (username, password) != (self.username, self.password):
+                self.auth_failures += 1
+                writer.write(b'\x01\x01')
+                await writer.drain()
+                return
+            writer.write(b'\x01\x00')
+            await writer.drain()
+
+        _, command, _, atyp = await reader.readexactly(4)
+        if atyp == 0x01:
+            host = socket.inet_ntoa(await reader.readexactly(4))
+        elif atyp == 0x03:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        elif atyp == 0x04:
+            host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+        else:
+            return
+        port = struct.unpack('>H', await reader.readexactly(2))[0]
+        await self._delay()
+
+        if command != 0x01:
+            writer.write(b'\x05\x07\x00\x01' + b'\x00' * 6)
+            await writer.drain()
+            return
+        if self._should_fail():
+            writer.write(b'\x05\x05\x00\x01' + b'\x00' * 6)
+            await writer.drain()
+            return
+        try:
+            remote_reader, remote_writer = await self._open_target(host, port)
+        except OSError:
+            writer.write(b'\x05\x04\x00\x01' + b'\x00' * 6)
+            await writer.drain()
+            return
+
+        self.tunnels += 1
+        writer.write(b'\x05\x00\x00\x01' + b'\x00' * 6)
+        await writer.drain()
+        await _relay(reader, writer, remote_reader, remote_writer)
+
+
+class FakeHttpProxy(_FakeProxy):
+    protocol = 'http'
+
+    def __init__(self, *args, connect_ports: Optional[Tuple[int, ...]] = None, **kwargs):
+        """connect_ports: ports CONNECT may reach (403 for others); None allows every port"""
+        super().__init__(*args, **kwargs)
+        self.connect_ports = connect_ports
+        self.refused_connects = 0
+
+    def _authorized(self, headers: Dict[str, str]) -> bool:
+        if not (self.username and self.password):
+            return True
+        expected = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+        return headers.get('proxy-authorization') == f"Basic {expected}"
+
+    async def _handle(self, reader, writer):
+        head = await _read_head(reader)
+        if head is None:
+            return
+        method, target, headers = _parse_head(head)
+        await self._delay()
+
+        if not self._authorized(headers):
+            self.auth_failures += 1
+            writer.write(b'HTTP/1.1 407 Proxy Authentication Required\r\n'
+                         b'Proxy-Authenticate: Basic realm="proxy"\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        if self._should_fail():
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+
+        if method == 'CONNECT':
+            host, _, port = target.rpartition(':')
+            if self.connect_ports is not None and port not in {str(p) for p in self.connect_ports}:
+                self.refused_connects += 1
+                writer.write(b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n')
+                await writer.drain()
+                return
+            try:
+                remote_reader, remote_writer = await self._open_target(host, int(port))
+            except (OSError, ValueError):
+                writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n')
+                await writer.drain()
+                return
+            self.tunnels += 1
+            writer.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+            await writer.drain()
+            await _relay(reader, writer, remote_reader, remote_writer)
+            return
+
+        # Absolute-URI request (plain http through the proxy): rewrite to origin-form and forward
+        url = urlsplit(target)
+        if not url.hostname:
+            writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        try:
+            remote_reader, remote_writer = await self._open_target(url.hostname, url.port or 80)
+        except OSError:
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        self.tunnels += 1
+        path = (url.path or '/') + (f"?{url.query}" if url.query else '')
+        lines = head.decode('latin-1').split("\r\n")
+        forwarded = [f"{method} {path} {lines[0].split()[-1]}"]
+        forwarded += [line for line in lines[1:] if line and not line.lower().startswith('proxy-')]
+        remote_writer.write(("\r\n".join(forwarded) + "\r\n\r\n").encode('latin-1'))
+        await remote_writer.drain()
+        await _relay(reader, writer, remote_reader, remote_writer)
+
+
+class ServerThread:
+    """
+    Runs servers on a private event loop in a daemon thread so blocking code (ProxyManager,
+    LocalProxyServer, requests) can talk to them from the calling thread
+    """
+
+    def __init__(self, *servers: _Server):
+        self.servers = list(servers)
+        self._loop = None
+        self._thread = None
+
+    def start(self) -> 'ServerThread':
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                for server in self.servers:
+                    self._loop.run_until_complete(server.start())
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            # Drop open connections first; wait_closed() waits for them on newer Pythons
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            for server in self.servers:
+                self._loop.run_until_complete(server.close())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def __enter__(self) -> 'ServerThread':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def _serve(args):
+    username, password = (args.auth.split(':', 1) if args.auth else (None, None))
+    echo = EchoServer(args.host, args.echo_port)
+    await echo.start()
+    options = dict(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        username=username,
+        password=password,
+        upstream=(args.host, echo.port) if args.redirect else None
+    )
+    connect_ports = tuple(int(p) for p in args.connect_ports.split(',')) if args.connect_ports else None
+    proxies = [
+        FakeSocks5Proxy(args.host, args.socks_port, **options),
+        FakeHttpProxy(args.host, args.http_port, connect_ports=connect_ports, **options)
+    ]
+    for proxy in proxies:
+        await proxy.start()
+
+    print(f"Echo endpoint: {echo.url}")
+    print(f"IP2Location stand-in: {echo.ip2location_url}")
+    for proxy in proxies:
+        print(f"Fake {proxy.protocol} proxy: {proxy.proxy_string()}")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local IP echo endpoint and fake upstream proxies")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--echo-port', type=int, default=8899)
+    parser.add_argument('--socks-port', type=int, default=1080)
+    parser.add_argument('--http-port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to each proxy handshake step")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of tunnels refused (0..1)")
+    parser.add_argument('--auth', default='', help="user:pass required by the fake proxies")
+    parser.add_argument('--connect-ports', default='',
+                        help="comma-separated ports the HTTP proxy allows CONNECT to (default: any)")
+    parser.add_argument('--redirect', action='store_true',
+                        help="send every tunnel to the echo server, whatever host was requested")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
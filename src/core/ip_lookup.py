@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+
+
+class IPLookupCache:
+    """
+    IP2Location answers keyed by exit IP, persisted as JSON and trusted for `ttl` seconds
+    Misses go through a small thread pool that starts at most `rate` requests per second; concurrent
+    lookups of the same IP share one in-flight request. analysis(ip) runs `analyze` once per answer.
+    fetch(ip, api_key) does the network call; point base_url at a local stand-in (EchoServer's
+    ip2location_url) or replace fetch outright in tests
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        base_url: str = 'https://api.ip2location.io/',
+        ttl: float = 86400,
+        rate: float = 2.0,
+        workers: int = 4,
+        timeout: float = 10,
+        analyze: Optional[Callable[[Dict], Dict]] = None
+    ):
+        self.path = path
+        self.base_url = base_url
+        self.ttl = ttl
+        self.rate = rate
+        self.workers = workers
+        self.timeout = timeout
+        self.analyze = analyze
+        self.fetch: Callable[[str, str], Optional[Dict]] = self._fetch_remote
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._analysis: Dict[str, Dict] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._executor = None
+        self._next_start = 0.0
+        self._dirty = False
+        self.requests_made = 0
+        if path:
+            self.load()
+
+    def _fetch_remote(self, ip: str, api_key: str) -> Optional[Dict]:
+        response = requests.get(self.base_url, params={'key': api_key, 'ip': ip}, timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def _fresh(self, entry: Optional[Dict], now: float) -> bool:
+        return entry is not None and now - entry['fetched_at'] < self.ttl
+
+    def get(self, ip: str) -> Optional[Dict]:
+        """Cached answer for ip, or None when missing or older than ttl"""
+        with self._lock:
+            entry = self._entries.get(ip)
+            return entry['data'] if self._fresh(entry, time.time()) else None
+
+    def submit(self, ip: str, api_key: str) -> Future:
+        """Future resolving to the answer for ip (None on failure); cached and in-flight answers are reused"""
+        with self._lock:
+            entry = self._entries.get(ip)
+            if self._fresh(entry, time.time()):
+                future = Future()
+                future.set_result(entry['data'])
+                return future
+            future = self._in_flight.get(ip)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix='ip-lookup')
+                future = self._executor.submit(self._run, ip, api_key)
+                self._in_flight[ip] = future
+            return future
+
+    def lookup(self, ip: str, api_key: str) -> Optional[Dict]:
+        """Blocking submit()"""
+        return self.submit(ip, api_key).result()
+
+    def _wait_for_slot(self):
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next_start)
+            self._next_start = start + (1.0 / self.rate if self.rate > 0 else 0.0)
+            self.requests_made += 1
+        if start > now:
+            time.sleep(start - now)
+
+    def _run(self, ip: str, api_key: str) -> Optional[Dict]:
+        data = None
+        try:
+            self._wait_for_slot()
+            data = self.fetch(ip, api_key)
+        except Exception as e:
+            print(f"IP2Location lookup error for {ip}: {e}")
+        finally:
+            with self._lock:
+                # Failures are not cached, so the next check retries
+                if data is not None:
+                    self._entries[ip] = {'data': data, 'fetched_at': time.time()}
+                    self._analysis.pop(ip, None)
+                    self._dirty = True
+                self._in_flight.pop(ip, None)
+        return data
+
+    def analysis(self, ip: Optional[str]) -> Optional[Dict]:
+        """analyze(answer) for ip, computed once per cached answer"""
+        if not ip or self.analyze is None:
+            return None
+        with self._lock:
+            cached = self._analysis.get(ip)
+            entry = self._entries.get(ip)
+        if cached is not None:
+            return cached
+        if entry is None:
+            return None
+        result = self.analyze(entry['data'])
+        with self._lock:
+            if self._entries.get(ip) is entry:
+                self._analysis[ip] = result
+        return result
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading IP lookup cache: {e}")
+            return
+        with self._lock:
+            self._entries = {
+                ip: entry for ip, entry in entries.items()
+                if isinstance(entry, dict) and 'data' in entry and 'fetched_at' in entry
+            }
+            self._analysis = {}
+            self._dirty = False
+
+    def save(self):
+        """Write the cache if it changed; expired answers are dropped"""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._dirty:
+                return
+            self._entries = {ip: e for ip, e in self._entries.items() if self._fresh(e, now)}
+            data = json.dumps(self._entries, ensure_ascii=False)
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving IP lookup cache: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -3,6 +3,8 @@ import threading
 import requests
 from typing import Dict, Optional
 import time
+from src.core import proxy_handshake
+from src.core.proxy_ingest import proxy_url
 
 
 class LocalProxyServer:
@@ -175,173 +177,34 @@ class LocalProxyServer:
                 
                 def _build_proxy_url(self):
                     """Build proxy URL from remote proxy config"""
-                    p = self.remote_proxy
-                    protocol = p['protocol']
-                    
-                    if p.get('username') and p.get('password'):
-                        return f"{protocol}://{p['username']}:{p['password']}@{p['host']}:{p['port']}"
-                    else:
-                        return f"{protocol}://{p['host']}:{p['port']}"
+                    return proxy_url(self.remote_proxy)
                 
                 def _connect_through_proxy(self, host, port):
                     """Connect remote proxy using proper SOCKS5/HTTP protocol"""
+                    p = self.remote_proxy
+                    sock = None
                     try:
-                        p = self.remote_proxy
-                        
-                        if p['protocol'] in ['socks5', 'socks4']:
-                            import struct
-                            
-                            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                            sock.settimeout(30)
-                            
-                            print(f"Connecting to SOCKS5 proxy {p['host']}:{p['port']}")
-                            sock.connect((p['host'], p['port']))
-                            
-                            if p['protocol'] == 'socks5':
-                                if p.get('username') and p.get('password'):
-                                    sock.sendall(b'\x05\x02\x00\x02')
-                                    print(f"Sent SOCKS5 greeting with auth methods")
-                                else:
-                                    sock.sendall(b'\x05\x01\x00')
-                                    print(f"Sent SOCKS5 greeting without auth")
-                                
-                                response = sock.recv(2)
-                                if len(response) != 2 or response[0] != 0x05:
-                                    print(f"Invalid SOCKS5 response: {response.hex()}")
-                                    sock.close()
-                                    return None
-                                
-                                method = response[1]
-                                print(f"SOCKS5 server selected method: {method}")
-                                
-                                if method == 0x02:  # Username/Password
-                                    if not p.get('username') or not p.get('password'):
-                                        print("Proxy requires auth but no credentials provided")
-                                        sock.close()
-                                        return None
-                                    
-                                    username = p['username'].encode()
-                                    password = p['password'].encode()
-                                    auth_request = struct.pack('B', 1)  # ver
-                                    auth_request += struct.pack('B', len(username)) + username
-                                    auth_request += struct.pack('B', len(password)) + password
-                                    
-                                    sock.sendall(auth_request)
-                                    print(f"Sent auth: user={p['username']}, pass=***")
-                                    
-                                    auth_response = sock.recv(2)
-                                    if len(auth_response) != 2 or auth_response[1] != 0x00:
-                                        print(f"SOCKS5 auth failed: {auth_response.hex()}")
-                                        sock.close()
-                                        return None
-                                    
-                                    print("SOCKS5 authentication successful")
-                                
-                                elif method == 0xFF:  # No acceptable methods
-                                    print("SOCKS5 proxy rejected all auth methods")
-                                    sock.close()
-                                    return None
-                                
-                                connect_request = b'\x05\x01\x00'  # Version, CONNECT, Reserved
-                                
-                                connect_request += b'\x03'
-                                host_bytes = host.encode()
-                                connect_request += struct.pack('B', len(host_bytes)) + host_bytes
-                                connect_request += struct.pack('>H', port)
-                                
-                                sock.sendall(connect_request)
-                                print(f"Sent SOCKS5 CONNECT to {host}:{port}")
-                                
-                                response = sock.recv(4)
-                                if len(response) != 4:
-                                    print(f"Invalid SOCKS5 CONNECT response length")
-                                    sock.close()
-                                    return None
-                                
-                                if response[1] != 0x00:  # Succ
-                                    error_codes = {
-                                        0x01: "General SOCKS server failure",
-                                        0x02: "Connection not allowed by ruleset",
-                                        0x03: "Network unreachable",
-                                        0x04: "Host unreachable",
-                                        0x05: "Connection refused",
-                                        0x06: "TTL expired",
-                                        0x07: "Command not supported",
-                                        0x08: "Address type not supported"
-                                    }
-                                    error = error_codes.get(response[1], f"Unknown error {response[1]}")
-                                    print(f"SOCKS5 CONNECT failed: {error}")
-                                    sock.close()
-                                    return None
-                                
-                                atyp = response[3]
-                                if atyp == 0x01:  # IPv4
-                                    sock.recv(6)  # 4 bytes IP + 2 bytes port
-                                elif atyp == 0x03:  # Domain
-                                    addr_len = struct.unpack('B', sock.recv(1))[0]
-                                    sock.recv(addr_len + 2)  # domain + port
-                                elif atyp == 0x04:  # IPv6
-                                    sock.recv(18)  # 16 bytes IP + 2 bytes port
-                                
-                                print(f"SOCKS5 tunnel established to {host}:{port}")
-                                return sock
-                            
-                            else:  # SOCKS4
-                                print("SOCKS4 not fully implemented, use SOCKS5")
-                                sock.close()
-                                return None
-                        
-                        # HTTP/HTTPS 
-                        elif p['protocol'] in ['http', 'https']:
-                            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                            sock.settimeout(30)
-                            
-                            print(f"Connecting to HTTP proxy {p['host']}:{p['port']}")
-                            sock.connect((p['host'], p['port']))
-                            
-                            connect_request = f"CONNECT {host}:{port} HTTP/1.1\r\n"
-                            connect_request += f"Host: {host}:{port}\r\n"
-                            
-                            if p.get('username') and p.get('password'):
-                                import base64
-                                credentials = f"{p['username']}:{p['password']}"
-                                encoded = base64.b64encode(credentials.encode()).decode()
-                                connect_request += f"Proxy-Authorization: Basic {encoded}\r\n"
-                                print(f"HTTP proxy auth: {p['username']}")
-                            
-                            connect_request += "\r\n"
-                            
-                            sock.sendall(connect_request.encode())
-                            print(f"Sent HTTP CONNECT to {host}:{port}")
-                            
-                            response = b""
-                            while b"\r\n\r\n" not in response:
-                                chunk = sock.recv(1024)
-                                if not chunk:
-                                    break
-                                response += chunk
-                            
-                            response_str = response.decode('utf-8', errors='ignore')
-                            status_line = response_str.split('\r\n')[0]
-                            
-                            print(f"HTTP proxy response: {status_line}")
-                            
-                            if '200' in status_line:
-                                print(f"HTTP tunnel established to {host}:{port}")
-                                return sock
-                            else:
-                                print(f"HTTP CONNECT failed: {status_line}")
-                                sock.close()
-                                return None
-                        
-                        else:
-                            print(f"Unsupported proxy protocol: {p['protocol']}")
-                            return None
-                            
+                        handshake = proxy_handshake.tunnel_handshake(p, host, port)
+
+                        print(f"Connecting to {p['protocol']} proxy {p['host']}:{p['port']}")
+                        # create_connection resolves the family, so IPv6 proxies work too
+                        sock = socket.create_connection((p['host'], int(p['port'])), timeout=30)
+
+                        proxy_handshake.run_blocking(sock, handshake)
+                        print(f"{p['protocol']} tunnel established to {host}:{port}")
+                        return sock
+
+                    except proxy_handshake.ProxyHandshakeError as e:
+                        print(e)
+                        if sock is not None:
+                            sock.close()
+                        return None
                     except Exception as e:
                         print(f"Proxy connection error to {host}:{port}: {e}")
                         import traceback
                         traceback.print_exc()
+                        if sock is not None:
+                            sock.close()
                         return None
                 
                 def _forward_data(self, client_sock, remote_sock):
@@ -0,0 +1,88 @@
+import os
+import threading
+from typing import Dict, Optional, Set
+
+
+class ProfileCache:
+    """
+    Cached existence checks for profile folders
+    Folders directly under the profiles directory are listed with one os.scandir on first use;
+    folders elsewhere are checked once and remembered
+    """
+
+    def __init__(self, profiles_dir: str):
+        self.profiles_dir = self._key(profiles_dir)
+        self._lock = threading.Lock()
+        self._names: Optional[Set[str]] = None
+        self._others: Dict[str, bool] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def _split(self, path: str):
+        """Return (name, None) for a direct child of the profiles directory, else (None, key)"""
+        key = self._key(path)
+        parent, name = os.path.split(key)
+        if parent == self.profiles_dir and name:
+            return name, None
+        return None, key
+
+    def _load(self):
+        # Caller holds self._lock
+        if self._names is None:
+            names = set()
+            try:
+                with os.scandir(self.profiles_dir) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            names.add(os.path.normcase(entry.name))
+            except FileNotFoundError:
+                pass
+            self._names = names
+
+    def exists(self, path: str) -> bool:
+        if not path:
+            return False
+        name, key = self._split(path)
+        with self._lock:
+            if name is not None:
+                self._load()
+                return name in self._names
+            if key not in self._others:
+                self._others[key] = os.path.isdir(key)
+            return self._others[key]
+
+    def ensure(self, path: str):
+        """Create the folder if it is not known to exist"""
+        if self.exists(path):
+            return
+        os.makedirs(path, exist_ok=True)
+        self.mark_created(path)
+
+    def mark_created(self, path: str):
+        self._set(path, True)
+
+    def mark_removed(self, path: str):
+        self._set(path, False)
+
+    def _set(self, path: str, present: bool):
+        if not path:
+            return
+        name, key = self._split(path)
+        with self._lock:
+            if name is not None:
+                if self._names is None:
+                    return
+                if present:
+                    self._names.add(name)
+                else:
+                    self._names.discard(name)
+            else:
+                self._others[key] = present
+
+    def invalidate(self):
+        """Forget everything; the next check rescans the profiles directory"""
+        with self._lock:
+            self._names = None
+            self._others = {}
@@ -0,0 +1,258 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from typing import Callable, Dict, List, Optional
+
+
+class ProfileWorker:
+    """
+    Background filesystem worker for Chrome profile folders
+    Deletion renames the folder into a trash directory (fast) and removes it with a thread pool;
+    relocation renames on the same volume and falls back to copy + delete in the background
+    Pending operations are journaled so interrupted work resumes on the next start
+    """
+
+    def __init__(self, trash_dir: str, ops_file: str, max_workers: int = 4):
+        self.trash_dir = trash_dir
+        self.ops_file = ops_file
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._failed: Dict[str, Dict] = {}
+        self._listeners: List[Callable[[Dict], None]] = []
+        # One thread runs operations in order; the pool fans out the tree removal of each one
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-ops')
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='profile-rm')
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """callback(event) is called from worker threads with kind, state, path, done, total, error"""
+        self._listeners.append(callback)
+
+    def _emit(self, op: Dict, state: str, **extra):
+        event = {
+            'id': op['id'],
+            'kind': op['op'],
+            'state': state,
+            'path': op.get('path') or op.get('src'),
+            'pending': len(self._pending)
+        }
+        event.update(extra)
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in profile worker listener: {e}")
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _journal(self, record: Dict):
+        try:
+            with open(self.ops_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error writing profile ops journal: {e}")
+
+    def _begin(self, op: Dict):
+        with self._lock:
+            self._pending[op['id']] = op
+            self._idle.clear()
+        self._journal(op)
+        self._emit(op, 'queued')
+        self._dispatcher.submit(self._run, op)
+
+    def _finish(self, op: Dict, error: Optional[Exception] = None):
+        with self._lock:
+            self._pending.pop(op['id'], None)
+            if error is not None:
+                self._failed[op['id']] = op
+            idle = not self._pending
+        if error is None:
+            self._journal({'op': 'done', 'id': op['id']})
+        if idle:
+            self._compact_journal()
+            self._idle.set()
+        if error is None:
+            self._emit(op, 'done')
+        else:
+            self._emit(op, 'failed', error=str(error))
+
+    def _compact_journal(self):
+        # Once idle, only failed operations are worth keeping for the next start
+        with self._lock:
+            if self._pending:
+                return
+            try:
+                if self._failed:
+                    tmp_path = f"{self.ops_file}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        for op in self._failed.values():
+                            f.write(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    os.replace(tmp_path, self.ops_file)
+                elif os.path.exists(self.ops_file):
+                    os.remove(self.ops_file)
+            except OSError as e:
+                print(f"Error compacting profile ops journal: {e}")
+
+    def delete(self, path: str) -> Optional[str]:
+        """Queue a profile folder for deletion; the folder is gone from path when this returns"""
+        if not path or not os.path.exists(path):
+            return None
+
+        op_id = uuid.uuid4().hex
+        target = path
+        try:
+            os.makedirs(self.trash_dir, exist_ok=True)
+            trashed = os.path.join(self.trash_dir, f"{os.path.basename(os.path.normpath(path))}-{op_id[:8]}")
+            os.rename(path, trashed)
+            target = trashed
+        except OSError:
+            # Other volume or a locked file (e.g. Chrome still running): delete in place
+            pass
+
+        self._begin({'op': 'delete', 'id': op_id, 'path': target})
+        return op_id
+
+    def relocate(self, src: str, dst: str) -> bool:
+        """
+        Move a profile folder to dst. Same-volume moves are a rename and finish immediately;
+        otherwise the copy runs in the background. Returns False if src could not be moved at all
+        """
+        if not os.path.exists(src):
+            return True
+        try:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.rename(src, dst)
+            return True
+        except OSError:
+            pass
+
+        if os.path.exists(dst):
+            return False
+        self._begin({'op': 'relocate', 'id': uuid.uuid4().hex, 'src': src, 'dst': dst})
+        return True
+
+    def _run(self, op: Dict):
+        try:
+            if op['op'] == 'delete':
+                self._remove_tree(op, op['path'])
+            elif op['op'] == 'relocate':
+                self._copy_then_remove(op)
+        except Exception as e:
+            print(f"Error in profile worker ({op['op']} {op.get('path') or op.get('src')}): {e}")
+            self._finish(op, e)
+        else:
+            self._finish(op)
+
+    def _remove_tree(self, op: Dict, path: str):
+        if not os.path.lexists(path):
+            return
+
+        # Fan out over the first two levels; a profile's bulk sits in Default/Cache and friends
+        jobs = []
+        for entry in self._scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                children = self._scandir(entry.path)
+                if children:
+                    jobs.extend(child.path for child in children)
+                else:
+                    jobs.append(entry.path)
+            else:
+                jobs.append(entry.path)
+
+        total = len(jobs)
+        done = 0
+        futures = [self._pool.submit(self._remove_entry, job) for job in jobs]
+        while futures:
+            finished, futures = wait_futures(futures, timeout=0.5)
+            done += len(finished)
+            futures = list(futures)
+            self._emit(op, 'progress', done=done, total=total)
+
+        shutil.rmtree(path, ignore_errors=True)
+        if os.path.exists(path):
+            raise OSError(f"Could not remove {path}")
+
+    @staticmethod
+    def _scandir(path: str) -> list:
+        try:
+            with os.scandir(path) as it:
+                return list(it)
+        except (NotADirectoryError, FileNotFoundError):
+            return []
+
+    @staticmethod
+    def _remove_entry(path: str):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _copy_then_remove(self, op: Dict):
+        src, dst = op['src'], op['dst']
+        staging = f"{dst}.partial"
+        if os.path.exists(src):
+            if not os.path.exists(dst):
+                if os.path.exists(staging):
+                    shutil.rmtree(staging, ignore_errors=True)
+                self._emit(op, 'progress', done=0, total=2)
+                shutil.copytree(src, staging, symlinks=True)
+                if os.path.isdir(dst) and not os.listdir(dst):
+                    # Opened (and created empty) while the copy was running
+                    os.rmdir(dst)
+                os.replace(staging, dst)
+            self._emit(op, 'progress', done=1, total=2)
+            self._remove_tree(op, src)
+
+    def resume(self):
+        """Re-queue operations left unfinished by a previous run and empty the trash directory"""
+        ops = {}
+        if os.path.exists(self.ops_file):
+            with open(self.ops_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('op') == 'done':
+                        ops.pop(record.get('id'), None)
+                    elif record.get('id'):
+                        ops[record['id']] = record
+            try:
+                os.remove(self.ops_file)
+            except OSError:
+                pass
+
+        known = {os.path.abspath(op['path']) for op in ops.values() if op.get('op') == 'delete'}
+        for entry in self._scandir(self.trash_dir):
+            if os.path.abspath(entry.path) not in known:
+                ops[uuid.uuid4().hex] = {'op': 'delete', 'path': entry.path}
+
+        for op_id, op in ops.items():
+            op['id'] = op_id
+            self._begin(op)
+        return len(ops)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued operation has finished"""
+        return self._idle.wait(timeout)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; unfinished operations stay journaled and resume next start"""
+        self._dispatcher.shutdown(wait=wait, cancel_futures=not wait)
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,191 @@
+"""
+SOCKS5 / HTTP CONNECT tunnel handshakes, shared by the blocking local proxy server and the asyncio checker
+A handshake is a generator that yields (op, arg) steps and is driven by run_blocking or run_async:
+    (SEND, data)        write data
+    (RECV, n)           read exactly n bytes; the bytes are sent back into the generator
+    (RECV_UNTIL, mark)  read until mark (e.g. end of HTTP headers); the bytes are sent back
+"""
+import base64
+import socket
+import struct
+from typing import Dict, Generator, Tuple
+
+SEND = 'send'
+RECV = 'recv'
+RECV_UNTIL = 'recv_until'
+
+MAX_HEADER_BYTES = 65536
+
+SOCKS5_ERRORS = {
+    0x01: "General SOCKS server failure",
+    0x02: "Connection not allowed by ruleset",
+    0x03: "Network unreachable",
+    0x04: "Host unreachable",
+    0x05: "Connection refused",
+    0x06: "TTL expired",
+    0x07: "Command not supported",
+    0x08: "Address type not supported"
+}
+
+Handshake = Generator[Tuple[str, object], bytes, None]
+
+
+class ProxyHandshakeError(Exception):
+    """The proxy answered, but refused or garbled the tunnel handshake"""
+
+
+def _has_auth(proxy: Dict) -> bool:
+    return bool(proxy.get('username') and proxy.get('password'))
+
+
+def socks5_handshake(proxy: Dict, host: str, port: int) -> Handshake:
+    if _has_auth(proxy):
+        yield SEND, b'\x05\x02\x00\x02'
+    else:
+        yield SEND, b'\x05\x01\x00'
+
+    response = yield RECV, 2
+    if response[0] != 0x05:
+        raise ProxyHandshakeError(f"Invalid SOCKS5 response: {response.hex()}")
+
+    method = response[1]
+    if method == 0x02:  # Username/Password
+        if not _has_auth(proxy):
+            raise ProxyHandshakeError("Proxy requires auth but no credentials provided")
+        username = proxy['username'].encode()
+        password = proxy['password'].encode()
+        auth_request = struct.pack('B', 1)  # ver
+        auth_request += struct.pack('B', len(username)) + username
+        auth_request += struct.pack('B', len(password)) + password
+        yield SEND, auth_request
+
+        auth_response = yield RECV, 2
+        if auth_response[1] != 0x00:
+            raise ProxyHandshakeError(f"SOCKS5 auth failed: {auth_response.hex()}")
+    elif method == 0xFF:  # No acceptable methods
+        raise ProxyHandshakeError("SOCKS5 proxy rejected all auth methods")
+
+    host_bytes = host.encode()
+    connect_request = b'\x05\x01\x00'  # Version, CONNECT, Reserved
+    connect_request += b'\x03' + struct.pack('B', len(host_bytes)) + host_bytes
+    connect_request += struct.pack('>H', port)
+    yield SEND, connect_request
+
+    response = yield RECV, 4
+    if response[1] != 0x00:
+        error = SOCKS5_ERRORS.get(response[1], f"Unknown error {response[1]}")
+        raise ProxyHandshakeError(f"SOCKS5 CONNECT failed: {error}")
+
+    atyp = response[3]
+    if atyp == 0x01:  # IPv4
+        yield RECV, 6  # 4 bytes IP + 2 bytes port
+    elif atyp == 0x03:  # Domain
+        addr_len = yield RECV, 1
+        yield RECV, addr_len[0] + 2  # domain + port
+    elif atyp == 0x04:  # IPv6
+        yield RECV, 18  # 16 bytes IP + 2 bytes port
+
+
+def is_http_proxy(proxy: Dict) -> bool:
+    """HTTP proxies also forward plain http:// requests sent with an absolute URI, no tunnel needed"""
+    return (proxy.get('protocol') or '').lower() in ('http', 'https')
+
+
+def proxy_authorization(proxy: Dict) -> str:
+    """Proxy-Authorization header line (with CRLF) for an HTTP proxy, or '' without credentials"""
+    if not _has_auth(proxy):
+        return ""
+    credentials = f"{proxy['username']}:{proxy['password']}"
+    encoded = base64.b64encode(credentials.encode()).decode()
+    return f"Proxy-Authorization: Basic {encoded}\r\n"
+
+
+def http_connect_handshake(proxy: Dict, host: str, port: int) -> Handshake:
+    connect_request = f"CONNECT {host}:{port} HTTP/1.1\r\n"
+    connect_request += f"Host: {host}:{port}\r\n"
+    connect_request += proxy_authorization(proxy)
+    connect_request += "\r\n"
+    yield SEND, connect_request.encode()
+
+    response = yield RECV_UNTIL, b"\r\n\r\n"
+    status_line = response.decode('utf-8', errors='ignore').split('\r\n')[0]
+    parts = status_line.split()
+    if len(parts) < 2 or parts[1] != '200':
+        raise ProxyHandshakeError(f"HTTP CONNECT failed: {status_line}")
+
+
+def tunnel_handshake(proxy: Dict, host: str, port: int) -> Handshake:
+    """Handshake for the proxy's protocol; raises ProxyHandshakeError for unsupported ones"""
+    protocol = (proxy.get('protocol') or '').lower()
+    if protocol in ('socks5', 'socks'):
+        return socks5_handshake(proxy, host, port)
+    if is_http_proxy(proxy):
+        return http_connect_handshake(proxy, host, port)
+    raise ProxyHandshakeError(f"Unsupported proxy protocol: {protocol}")
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ProxyHandshakeError("Proxy closed the connection during handshake")
+        data += chunk
+    return data
+
+
+def _recv_until(sock: socket.socket, mark: bytes) -> bytes:
+    data = b""
+    while mark not in data:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_HEADER_BYTES:
+            raise ProxyHandshakeError("Proxy response headers too large")
+    return data
+
+
+def run_blocking(sock: socket.socket, handshake: Handshake):
+    """Drive a handshake over a connected blocking socket"""
+    reply = None
+    while True:
+        try:
+            op, arg = handshake.send(reply)
+        except StopIteration:
+            return
+        if op == SEND:
+            sock.sendall(arg)
+            reply = None
+        elif op == RECV:
+            reply = _recv_exactly(sock, arg)
+        else:
+            reply = _recv_until(sock, arg)
+
+
+async def run_async(reader, writer, handshake: Handshake):
+    """Drive a handshake over an asyncio stream pair; wrap in asyncio.wait_for for a phase timeout"""
+    import asyncio
+
+    reply = None
+    while True:
+        try:
+            op, arg = handshake.send(reply)
+        except StopIteration:
+            return
+        if op == SEND:
+            writer.write(arg)
+            await writer.drain()
+            reply = None
+        elif op == RECV:
+            try:
+                reply = await reader.readexactly(arg)
+            except asyncio.IncompleteReadError:
+                raise ProxyHandshakeError("Proxy closed the connection during handshake")
+        else:
+            try:
+                reply = await reader.readuntil(arg)
+            except asyncio.IncompleteReadError as e:
+                reply = e.partial
+            except asyncio.LimitOverrunError:
+                raise ProxyHandshakeError("Proxy response headers too large")
@@ -0,0 +1,266 @@
+"""
+Per-proxy check history in fixed-size ring buffers
+Each proxy keeps its last `size` check outcomes in three flat arrays (latency ms as float32, ok flag as a
+byte, unix time as uint32) instead of a list of dicts, plus an EWMA of successful latencies.
+The whole history is persisted in one binary file next to proxies.json:
+    header  '<4sHI'   magic b'PXH1', ring size, entry count
+    entry   '<H'      key length, then the UTF-8 key
+            '<HHd'    head, count, ewma (NaN when unknown)
+            size * float32 latency, size * uint8 ok, size * uint32 time   (little-endian)
+"""
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+MAGIC = b'PXH1'
+_HEADER = struct.Struct('<4sHI')
+_KEY_LEN = struct.Struct('<H')
+_ENTRY = struct.Struct('<HHd')
+
+STAT_KEYS = ('uptime', 'p50', 'p95', 'ewma', 'samples')
+
+
+def proxy_key(proxy: Dict) -> str:
+    """Identity of a proxy across restarts: its stable id (credentials differ per id, see dedup_key)"""
+    return proxy.get('id') or legacy_key(proxy)
+
+
+def legacy_key(proxy: Dict) -> str:
+    """Key of history files written before proxies had ids; only read by ProxyHistory.migrate"""
+    return f"{proxy.get('protocol')}://{proxy.get('host')}:{proxy.get('port')}:{proxy.get('username') or ''}"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    # Linear interpolation, same as ProxyManager.get_latency_percentiles
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+class LatencyRing:
+    """Last `size` outcomes of one proxy; stats are cached until the next push"""
+
+    __slots__ = ('latency', 'ok', 'stamp', 'head', 'count', 'ewma', '_stats')
+
+    ALPHA = 0.3
+
+    def __init__(self, size: int):
+        self.latency = array('f', [math.nan]) * size
+        self.ok = bytearray(size)
+        self.stamp = array('I', [0]) * size
+        self.head = 0
+        self.count = 0
+        self.ewma = None
+        self._stats = None
+
+    @property
+    def size(self) -> int:
+        return len(self.ok)
+
+    def push(self, success: bool, latency_ms: Optional[float], when: Optional[float] = None):
+        i = self.head
+        self.ok[i] = 1 if success else 0
+        self.latency[i] = latency_ms if success and latency_ms is not None else math.nan
+        self.stamp[i] = int(time.time() if when is None else when)
+        self.head = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        if success and latency_ms is not None:
+            self.ewma = latency_ms if self.ewma is None else self.ewma + self.ALPHA * (latency_ms - self.ewma)
+        self._stats = None
+
+    def samples(self):
+        """(ok, latency_ms, time) oldest first"""
+        start = (self.head - self.count) % self.size
+        for n in range(self.count):
+            i = (start + n) % self.size
+            yield bool(self.ok[i]), self.latency[i], self.stamp[i]
+
+    def stats(self) -> Dict:
+        if self._stats is None:
+            if not self.count:
+                self._stats = {'uptime': None, 'p50': None, 'p95': None, 'ewma': None, 'samples': 0}
+            else:
+                latencies = sorted(lat for ok, lat, _ in self.samples() if ok and not math.isnan(lat))
+                ups = sum(1 for ok, _, _ in self.samples() if ok)
+                self._stats = {
+                    'uptime': round(100.0 * ups / self.count, 1),
+                    'p50': round(_percentile(latencies, 50), 2) if latencies else None,
+                    'p95': round(_percentile(latencies, 95), 2) if latencies else None,
+                    'ewma': round(self.ewma, 2) if self.ewma is not None else None,
+                    'samples': self.count
+                }
+        return self._stats
+
+    def resized(self, size: int) -> 'LatencyRing':
+        ring = LatencyRing(size)
+        for ok, lat, stamp in list(self.samples())[-size:]:
+            ring.push(ok, None if math.isnan(lat) else lat, stamp)
+        ring.ewma = self.ewma
+        return ring
+
+
+class ProxyHistory:
+    """Rings for all proxies, keyed by proxy_key (the proxy id)"""
+
+    def __init__(self, path: Optional[str] = None, size: int = 32):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._rings: Dict[str, LatencyRing] = {}
+        self._dirty = False
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def record(self, proxy: Dict, success: bool, latency_ms: Optional[float], when: Optional[float] = None):
+        key = proxy_key(proxy)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = LatencyRing(self.size)
+            ring.push(success, latency_ms, when)
+            self._dirty = True
+
+    def stats(self, proxy: Dict) -> Dict:
+        with self._lock:
+            ring = self._rings.get(proxy_key(proxy))
+            return dict(ring.stats()) if ring is not None else LatencyRing(1).stats()
+
+    def bulk_stats(self, proxies: Iterable[Dict]) -> List[Dict]:
+        """stats() for many proxies under one lock, in order"""
+        empty = LatencyRing(1).stats()
+        with self._lock:
+            result = []
+            for proxy in proxies:
+                ring = self._rings.get(proxy_key(proxy))
+                result.append(dict(ring.stats() if ring is not None else empty))
+            return result
+
+    def samples(self, proxy: Dict) -> List[tuple]:
+        with self._lock:
+            ring = self._rings.get(proxy_key(proxy))
+            return list(ring.samples()) if ring is not None else []
+
+    def remove(self, proxy: Dict):
+        with self._lock:
+            if self._rings.pop(proxy_key(proxy), None) is not None:
+                self._dirty = True
+
+    def migrate(self, proxies: Iterable[Dict]) -> int:
+        """
+        Move rings stored under legacy_key to the proxy id; proxies that only differ by password shared
+        one legacy ring, so each of them starts from a copy of it. Returns the number of proxies migrated
+        """
+        moved = 0
+        with self._lock:
+            legacy = {}
+            for proxy in proxies:
+                if proxy.get('id') and proxy['id'] not in self._rings:
+                    legacy.setdefault(legacy_key(proxy), []).append(proxy['id'])
+            for key, ids in legacy.items():
+                ring = self._rings.pop(key, None)
+                if ring is None:
+                    continue
+                for n, proxy_id in enumerate(ids):
+                    self._rings[proxy_id] = ring if n == 0 else ring.resized(self.size)
+                moved += len(ids)
+            if moved:
+                self._dirty = True
+        return moved
+
+    def retain(self, proxies: Iterable[Dict]):
+        """Drop rings of proxies that are no longer in the list"""
+        keep = {proxy_key(p) for p in proxies}
+        with self._lock:
+            stale = [key for key in self._rings if key not in keep]
+            for key in stale:
+                del self._rings[key]
+            if stale:
+                self._dirty = True
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            rings = self._decode(data)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading proxy history: {e}")
+            return
+        with self._lock:
+            self._rings = rings
+            self._dirty = False
+
+    def _decode(self, data: bytes) -> Dict[str, LatencyRing]:
+        magic, size, count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a proxy history file")
+        offset = _HEADER.size
+        rings = {}
+        for _ in range(count):
+            (key_len,) = _KEY_LEN.unpack_from(data, offset)
+            offset += _KEY_LEN.size
+            key = data[offset:offset + key_len].decode('utf-8')
+            offset += key_len
+            head, filled, ewma = _ENTRY.unpack_from(data, offset)
+            offset += _ENTRY.size
+
+            ring = LatencyRing(size)
+            ring.latency = array('f', data[offset:offset + 4 * size])
+            offset += 4 * size
+            ring.ok = bytearray(data[offset:offset + size])
+            offset += size
+            ring.stamp = array('I', data[offset:offset + 4 * size])
+            offset += 4 * size
+            if sys.byteorder == 'big':
+                ring.latency.byteswap()
+                ring.stamp.byteswap()
+            ring.head, ring.count = head, filled
+            ring.ewma = None if math.isnan(ewma) else ewma
+            rings[key] = ring if size == self.size else ring.resized(self.size)
+        return rings
+
+    def _encode(self) -> bytes:
+        parts = [_HEADER.pack(MAGIC, self.size, len(self._rings))]
+        for key, ring in self._rings.items():
+            encoded = key.encode('utf-8')
+            latency, stamp = ring.latency, ring.stamp
+            if sys.byteorder == 'big':
+                latency, stamp = array('f', latency), array('I', stamp)
+                latency.byteswap()
+                stamp.byteswap()
+            parts.append(_KEY_LEN.pack(len(encoded)))
+            parts.append(encoded)
+            parts.append(_ENTRY.pack(ring.head, ring.count, math.nan if ring.ewma is None else ring.ewma))
+            parts.append(latency.tobytes())
+            parts.append(bytes(ring.ok))
+            parts.append(stamp.tobytes())
+        return b''.join(parts)
+
+    def save(self, force: bool = False):
+        """Write the history file if anything changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not (self._dirty or force):
+                return
+            data = self._encode()
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving proxy history: {e}")
+            with self._lock:
+                self._dirty = True
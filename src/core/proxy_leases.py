@@ -0,0 +1,112 @@
+import threading
+from typing import Callable, Dict, Optional, Set
+
+
+class ProxyLeases:
+    """
+    Which account currently holds which proxy
+    A proxy is handed to at most max_share accounts at once (1 = exclusive, 0 = no limit). An account gets the proxy it
+    held last back on its next acquire while that proxy is still usable and has room (sticky), otherwise
+    a new one is picked by policy. Full proxies never come out of pick() because ProxyManager scores them
+    as unusable, so acquire/release are O(1) bookkeeping plus one selector update.
+    is_leased / is_full / holders read without the lock: they are called from selector and scheduler
+    threads while acquire() may hold it
+    """
+
+    def __init__(
+        self,
+        pick: Callable[[str], Optional[Dict]],
+        is_usable: Callable[[Dict], bool],
+        on_change: Callable[[Dict], None],
+        max_share: int = 1,
+        sticky: bool = True
+    ):
+        """
+        pick(policy): choose a usable proxy that is not full
+        is_usable(proxy): whether a sticky proxy may be handed out again
+        on_change(proxy): re-score proxy after its holder count changed
+        """
+        self.pick = pick
+        self.is_usable = is_usable
+        self.on_change = on_change
+        self.max_share = max(0, int(max_share))
+        self.sticky = sticky
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Dict] = {}
+        self._holders: Dict[int, Set[str]] = {}
+        self._last: Dict[str, Dict] = {}
+
+    def holders(self, proxy: Dict) -> int:
+        return len(self._holders.get(id(proxy), ()))
+
+    def is_leased(self, proxy: Dict) -> bool:
+        return id(proxy) in self._holders
+
+    def at_limit(self, holders: int) -> bool:
+        """Whether holders accounts fill one proxy (or one exit group); never with max_share 0"""
+        return 0 < self.max_share <= holders
+
+    def is_full(self, proxy: Dict) -> bool:
+        return self.at_limit(self.holders(proxy))
+
+    def lease_of(self, account_id: str) -> Optional[Dict]:
+        return self._leases.get(account_id)
+
+    def _add(self, account_id: str, proxy: Dict):
+        self._leases[account_id] = proxy
+        self._holders.setdefault(id(proxy), set()).add(account_id)
+        self._last[account_id] = proxy
+
+    def _drop(self, account_id: str) -> Optional[Dict]:
+        proxy = self._leases.pop(account_id, None)
+        if proxy is None:
+            return None
+        holders = self._holders.get(id(proxy))
+        if holders is not None:
+            holders.discard(account_id)
+            if not holders:
+                del self._holders[id(proxy)]
+        return proxy
+
+    def acquire(self, account_id: str, policy: str) -> Optional[Dict]:
+        """Lease a proxy to account_id (replacing any lease it holds); None when no proxy has room"""
+        with self._lock:
+            previous = self._drop(account_id)
+            if previous is not None:
+                self.on_change(previous)
+
+            proxy = self._last.get(account_id) if self.sticky else None
+            if proxy is None or not self.is_usable(proxy):
+                proxy = self.pick(policy)
+            if proxy is None:
+                return None
+            self._add(account_id, proxy)
+            self.on_change(proxy)
+            return proxy
+
+    def hold(self, account_id: str, proxy: Dict):
+        """Record a proxy the account uses regardless of limits (specific proxy mode)"""
+        with self._lock:
+            previous = self._drop(account_id)
+            if previous is not None and previous is not proxy:
+                self.on_change(previous)
+            self._add(account_id, proxy)
+            self.on_change(proxy)
+
+    def release(self, account_id: str) -> Optional[Dict]:
+        """End the account's lease (its browser closed); the proxy stays its sticky choice"""
+        with self._lock:
+            proxy = self._drop(account_id)
+            if proxy is not None:
+                self.on_change(proxy)
+            return proxy
+
+    def forget(self, proxy: Dict):
+        """Proxy was removed from the list; sticky references to it fail is_usable and are replaced lazily"""
+        with self._lock:
+            for account_id in self._holders.pop(id(proxy), ()):
+                self._leases.pop(account_id, None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self._leases)
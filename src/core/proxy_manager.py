@@ -1,22 +1,193 @@
+import ipaddress
 import json
 import os
 import requests
+import tempfile
 import threading
 import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Optional, Tuple
-from src.config import PROXIES_FILE
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.config import (
+    EXIT_IP_URL,
+    GEOIP_DIR,
+    IP2LOCATION_API_URL,
+    IP_LOOKUP_CACHE_FILE,
+    IP_LOOKUP_RATE,
+    IP_LOOKUP_TTL,
+    IP_LOOKUP_WORKERS,
+    PROXIES_FILE,
+    PROXY_IMPORT_CHUNK_LINES,
+    PROXY_IMPORT_PARALLEL_BYTES,
+    PROXY_IMPORT_WORKERS,
+    PROXY_CHECK_CONCURRENCY,
+    PROXY_CHECK_CONCURRENCY_LIMITS,
+    PROXY_CHECK_ENDPOINTS,
+    PROXY_CHECK_HEDGE_DELAY,
+    PROXY_CHECK_TIMEOUTS,
+    PROXY_EXIT_IP_REUSE,
+    PROXY_HISTORY_FILE,
+    PROXY_HISTORY_SIZE,
+    PROXY_LEASE_MAX_SHARE,
+    PROXY_LEASE_STICKY,
+    PROXY_PIPELINE_CONCURRENCY,
+    PROXY_RECHECK_POLICY,
+    PROXY_RECHECK_RATE,
+    PROXY_RECHECK_WORKERS,
+    PROXY_ROTATING_CHURN,
+    PROXY_SELECTION_MODES,
+    PROXY_SHARED_EXIT_AS_ONE,
+    PROXY_SOURCE_POLL_INTERVAL,
+    PROXY_SOURCES_FILE
+)
+from src.core import proxy_table
+from src.core.async_proxy_checker import AsyncProxyChecker, extract_ip
+from src.core.concurrency_controller import AIMDController, from_limits
+from src.core import geoip
+from src.core.ip_lookup import IPLookupCache
+from src.core import proxy_ingest
+from src.core.proxy_history import STAT_KEYS as HISTORY_KEYS, ProxyHistory
+from src.core.proxy_leases import ProxyLeases
+from src.core.proxy_selector import UNIFORM, WEIGHTED, ProxySelector
+from src.core.proxy_sources import ProxySources, SyncReport, fingerprint, source_files
+from src.core.recheck_scheduler import RecheckScheduler
+from src.core.proxy_pipeline import ProxyCheckPipeline
+from src.core.stats_aggregator import StatsAggregator
+from src.models import Proxy, json_default
+
+
+class ExitGroup:
+    """
+    Proxies whose last check saw one exit IP, with running totals over the grouped (non-rotating) members
+    so scoring a member is O(1): how many are usable and how many accounts hold one of them.
+    contrib keeps what each member last added to the totals, so a change is applied as a difference.
+    Members split their pick weight by `scored`, the usable count when the group was last re-scored as a
+    whole; it is refreshed only once usable drifts from it by more than RESCORE_DRIFT, so a group of g
+    proxies coming alive one by one costs O(g) re-scores in total instead of O(g) per proxy
+    """
+
+    __slots__ = ('members', 'contrib', 'grouped', 'usable', 'holders', 'scored', 'used_at')
+
+    RESCORE_DRIFT = 0.25
+
+    def __init__(self):
+        self.members: Dict[str, Dict] = {}
+        self.contrib: Dict[str, Tuple[bool, bool, int]] = {}
+        self.grouped = 0
+        self.usable = 0
+        self.holders = 0
+        self.scored = 0
+        # Last pick of any member; lru reads it through ProxySelector.used_floor
+        self.used_at = 0.0
+
+    def _apply(self, state: Tuple[bool, bool, int], sign: int):
+        grouped, usable, holders = state
+        if grouped:
+            self.grouped += sign
+            self.usable += sign * usable
+            self.holders += sign * holders
+
+    def set(self, proxy: Dict, state: Tuple[bool, bool, int]):
+        old = self.contrib.get(proxy['id'])
+        if old is not None:
+            self._apply(old, -1)
+        self.members[proxy['id']] = proxy
+        self.contrib[proxy['id']] = state
+        self._apply(state, 1)
+
+    def discard(self, proxy_id: str):
+        old = self.contrib.pop(proxy_id, None)
+        if old is not None:
+            self._apply(old, -1)
+        self.members.pop(proxy_id, None)
 
 
 class ProxyManager:
     def __init__(self):
         self.proxies = self.load_proxies()
+        self._batch = None
+        # The scheduler timer, GUI jobs and check threads all save; one writer at a time
+        self._save_lock = threading.Lock()
+        # Stable id -> proxy; accounts refer to proxies by id, list positions are only a view
+        self._by_id: Dict[str, Dict] = {}
+        # dedup_key -> how many proxies have it; add_proxy and imports reject keys already present
+        self._dedup_keys: Dict[tuple, int] = {}
+        # Exit IP seen by the last successful check -> ExitGroup; proxies behind one exit share it
+        self._by_exit_ip: Dict[str, ExitGroup] = {}
+        self._exit_lock = threading.Lock()
+        self.shared_exit_as_one = PROXY_SHARED_EXIT_AS_ONE
+        self.leases = None
+        ids_assigned = self._index_ids()
+        self.stats = StatsAggregator(
+            lambda p: {'status': p.get('status'), 'quarantined': self._is_quarantined(p)},
+            expiry=self._quarantine_expiry,
+            source=self._stats_items
+        )
+        self.stats.reset(self._stats_items())
+        # Optional columnar mirror for vectorised filters; None when numpy is not installed
+        self.table = proxy_table.ProxyTable(self.proxies) if proxy_table.available() else None
+        # Recent check outcomes per proxy (uptime, latency percentiles), saved next to proxies.json
+        self.history = ProxyHistory(PROXY_HISTORY_FILE, PROXY_HISTORY_SIZE)
+        self.history.migrate(self.proxies)
+        self.history.retain(self.proxies)
+        # Usable proxies indexed for O(log n) picks; re-scored on every status change via _refresh
+        self.selector = ProxySelector(self._selection_score, used_floor=self._exit_used_at)
+        # Proxies held by open accounts; a proxy at max_share holders is not picked again until released
+        self.leases = ProxyLeases(
+            self.selector.pick,
+            is_usable=lambda proxy: self.selector.contains(proxy) and self._selection_score(proxy) is not None,
+            on_change=self._on_lease_change,
+            max_share=PROXY_LEASE_MAX_SHARE,
+            sticky=PROXY_LEASE_STICKY
+        )
+        self.selector.rebuild(self.proxies)
+        self.checker = AsyncProxyChecker(
+            concurrency=PROXY_CHECK_CONCURRENCY,
+            connect_timeout=PROXY_CHECK_TIMEOUTS['connect'],
+            handshake_timeout=PROXY_CHECK_TIMEOUTS['handshake'],
+            response_timeout=PROXY_CHECK_TIMEOUTS['response'],
+            endpoints=PROXY_CHECK_ENDPOINTS,
+            hedge_delay=PROXY_CHECK_HEDGE_DELAY
+        )
+        # IP2Location answers per exit IP, shared by every advanced check
+        self.ip_lookup = IPLookupCache(
+            IP_LOOKUP_CACHE_FILE,
+            base_url=IP2LOCATION_API_URL,
+            ttl=IP_LOOKUP_TTL,
+            rate=IP_LOOKUP_RATE,
+            workers=IP_LOOKUP_WORKERS,
+            analyze=self.analyze_ip2location_result
+        )
+        self.exit_ip_url = EXIT_IP_URL
+        # Offline country / ASN / ISP tables; proxies get 'geo' from these without any network request
+        self.geoip = geoip.GeoIPDatabase(GEOIP_DIR)
+        self.geolocate_proxies()
+        # AIMD limits for check_all_proxies; None disables adaptive concurrency
+        self.concurrency_limits = dict(PROXY_CHECK_CONCURRENCY_LIMITS)
+        # Leased (in-use) proxies are re-checked more often
+        self.scheduler = RecheckScheduler(
+            self.check_proxy,
+            on_expire=self._refresh,
+            on_flush=self.save_proxies,
+            is_leased=self.leases.is_leased,
+            policy=PROXY_RECHECK_POLICY,
+            rate=PROXY_RECHECK_RATE,
+            workers=PROXY_RECHECK_WORKERS
+        )
+        self.scheduler.reset(self.proxies)
+        # Provider exports merged into the list on change; ids of proxies accounts still point at keep
+        # retired source entries alive (set by the GUI from AccountManager)
+        self.sources = ProxySources(PROXY_SOURCES_FILE, interval=PROXY_SOURCE_POLL_INTERVAL)
+        self.referenced_proxy_ids: Callable[[], Set[str]] = set
+        if ids_assigned:
+            self.save_proxies()
     
     def load_proxies(self) -> List[Dict]:
         if os.path.exists(PROXIES_FILE):
             try:
                 with open(PROXIES_FILE, 'r', encoding='utf-8') as f:
-                    proxies = json.load(f)
+                    proxies = [Proxy.from_dict(p) for p in json.load(f)]
                     for p in proxies:
                         if 'fail_count' not in p:
                             p['fail_count'] = 0
@@ -27,15 +198,375 @@ class ProxyManager:
                 return []
         return []
 
+    def _index_ids(self) -> int:
+        """
+        Rebuild the id, dedup key and exit IP maps, giving proxies without a (unique) id a new one; returns
+        how many ids were assigned
+        """
+        self._by_id = {}
+        self._dedup_keys = {}
+        by_exit_ip = {}
+        assigned = 0
+        for proxy in self.proxies:
+            if not proxy.get('id') or proxy['id'] in self._by_id:
+                proxy['id'] = str(uuid.uuid4())
+                assigned += 1
+            self._by_id[proxy['id']] = proxy
+            self._add_dedup_key(proxy)
+            if proxy.get('exit_ip'):
+                by_exit_ip.setdefault(proxy['exit_ip'], ExitGroup()).set(proxy, self._exit_state(proxy))
+        for group in by_exit_ip.values():
+            group.scored = group.usable
+        with self._exit_lock:
+            self._by_exit_ip = by_exit_ip
+        return assigned
+
+    def is_rotating(self, proxy: Dict) -> bool:
+        """Whether the proxy's exit IP keeps changing between checks (backconnect / rotating gateway)"""
+        return int(proxy.get('exit_ip_churn') or 0) >= PROXY_ROTATING_CHURN
+
+    def _exit_state(self, proxy: Dict) -> Tuple[bool, bool, int]:
+        """What a proxy adds to its exit group's totals: (grouped, usable, lease holders)"""
+        holders = self.leases.holders(proxy) if self.leases is not None else 0
+        return not self.is_rotating(proxy), self._is_usable(proxy), holders
+
+    def _exit_group(self, proxy: Dict) -> Optional[ExitGroup]:
+        """The proxy's exit group, or None when it has no exit IP yet or is rotating (it stands alone)"""
+        exit_ip = proxy.get('exit_ip')
+        if not exit_ip or self.is_rotating(proxy):
+            return None
+        return self._by_exit_ip.get(exit_ip)
+
+    def _exit_used_at(self, proxy: Dict) -> float:
+        group = self._exit_group(proxy) if self.shared_exit_as_one else None
+        return group.used_at if group is not None else 0.0
+
+    def _at_limit(self, group: ExitGroup) -> bool:
+        return self.leases is not None and self.leases.at_limit(group.holders)
+
+    def _settle(self, group: ExitGroup, limited_before: bool) -> bool:
+        """Caller holds _exit_lock; True when the group's members must be re-scored after its totals moved"""
+        drift = abs(group.usable - group.scored) > group.scored * ExitGroup.RESCORE_DRIFT
+        if drift or self._at_limit(group) != limited_before:
+            group.scored = group.usable
+            return True
+        return False
+
+    def _account_exit(self, proxy: Dict) -> bool:
+        """
+        Bring the proxy's share of its exit group's totals up to date; True when its peers need re-scoring
+        (the group crossed the lease limit, or its usable count drifted, see ExitGroup)
+        """
+        with self._exit_lock:
+            group = self._by_exit_ip.get(proxy.get('exit_ip'))
+            if group is None:
+                return False
+            state = self._exit_state(proxy)
+            if group.contrib.get(proxy['id']) == state:
+                return False
+            limited = self._at_limit(group)
+            group.set(proxy, state)
+            return self._settle(group, limited)
+
+    def _join_exit(self, proxy: Dict, exit_ip: str) -> bool:
+        """Add the proxy to an exit group; True when the group's members need re-scoring"""
+        with self._exit_lock:
+            group = self._by_exit_ip.setdefault(exit_ip, ExitGroup())
+            limited = self._at_limit(group)
+            group.set(proxy, self._exit_state(proxy))
+            return self._settle(group, limited)
+
+    def _leave_exit(self, proxy: Dict, exit_ip: Optional[str]) -> List[Dict]:
+        """Drop the proxy from an exit group; returns the remaining members when they need re-scoring"""
+        with self._exit_lock:
+            group = self._by_exit_ip.get(exit_ip)
+            if group is None:
+                return []
+            limited = self._at_limit(group)
+            group.discard(proxy.get('id'))
+            if not group.members:
+                del self._by_exit_ip[exit_ip]
+                return []
+            return list(group.members.values()) if self._settle(group, limited) else []
+
+    def get_exit_peers(self, proxy: Dict) -> List[Dict]:
+        """Proxies sharing this proxy's exit IP (itself included); rotating proxies stand alone"""
+        group = self._exit_group(proxy)
+        if group is None:
+            return [proxy]
+        peers = [p for p in list(group.members.values()) if not self.is_rotating(p)]
+        # Identity, not ==: records compare by value, which is a full field-by-field walk per peer
+        return peers if any(p is proxy for p in peers) else peers + [proxy]
+
+    def exit_group_size(self, proxy: Dict) -> int:
+        """len(get_exit_peers(proxy)) in O(1)"""
+        group = self._exit_group(proxy)
+        return max(1, group.grouped) if group is not None else 1
+
+    def get_exit_groups(self, min_size: int = 2) -> List[Tuple[str, List[Dict]]]:
+        """(exit IP, proxies) for exits seen through at least min_size proxies, largest first"""
+        with self._exit_lock:
+            groups = [
+                (ip, list(group.members.values())) for ip, group in self._by_exit_ip.items()
+                if len(group.members) >= min_size
+            ]
+        groups.sort(key=lambda item: (-len(item[1]), item[0]))
+        return groups
+
+    def _observe_exit_ip(self, proxy: Dict, exit_ip: str):
+        """Record the exit IP a check saw; a change moves the proxy to its new exit group and counts as churn"""
+        now = int(time.time())
+        proxy['exit_ip_seen_at'] = now
+        previous = proxy.get('exit_ip')
+        churn = int(proxy.get('exit_ip_churn') or 0)
+        if previous == exit_ip:
+            proxy['exit_ip_churn'] = max(0, churn - 1)
+            # A gateway that stopped rotating rejoins its group
+            if self._account_exit(proxy):
+                self._rescore_peers(proxy)
+            return
+        proxy['exit_ip'] = exit_ip
+        proxy['exit_ip_changed_at'] = now
+        if previous:
+            # Capped so a gateway that stops rotating is grouped again after a couple of steady checks
+            proxy['exit_ip_churn'] = min(churn + 1, 2 * PROXY_ROTATING_CHURN)
+        if self.geoip.available:
+            self._set_geo(proxy, exit_ip, self.geoip.lookup(exit_ip))
+        old_peers = self._leave_exit(proxy, previous)
+        rescore = self._join_exit(proxy, exit_ip)
+        if self.shared_exit_as_one:
+            for peer in old_peers:
+                self.selector.update(peer)
+        if rescore and self.shared_exit_as_one:
+            self._rescore_peers(proxy)
+        else:
+            self.selector.update(proxy)
+
+    @staticmethod
+    def _geo_ip(proxy: Dict) -> Optional[str]:
+        """Exit IP when a check has seen one, else the proxy host if it is an IP address"""
+        if proxy.get('exit_ip'):
+            return proxy['exit_ip']
+        try:
+            return str(ipaddress.ip_address(proxy.get('host') or ''))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _set_geo(proxy: Dict, ip: str, answer: Optional[Dict]):
+        proxy['geo'] = dict(answer, ip=ip) if answer else None
+
+    def geolocate_proxies(self, proxies: Optional[Iterable[Dict]] = None, force: bool = False) -> int:
+        """
+        Fill geo (country, ASN, ISP) from the offline GeoIP tables with one batch lookup; proxies whose geo
+        already matches their current IP are skipped unless force. Returns how many were located
+        """
+        if not self.geoip.available:
+            return 0
+        targets = []
+        for proxy in (self.proxies if proxies is None else proxies):
+            ip = self._geo_ip(proxy)
+            if ip and (force or (proxy.get('geo') or {}).get('ip') != ip):
+                targets.append((proxy, ip))
+        answers = self.geoip.lookup_many([ip for _, ip in targets])
+        for (proxy, ip), answer in zip(targets, answers):
+            self._set_geo(proxy, ip, answer)
+        return sum(1 for answer in answers if answer)
+
+    def import_geoip_csv(self, file_path: str, name: Optional[str] = None, layout: Optional[str] = None) -> Dict:
+        """
+        Compile a CSV range database (IP2Location LITE, DB-IP lite, ...) into GEOIP_DIR, reload the tables
+        and re-locate every proxy; a table with the same name is replaced
+        """
+        name = name or os.path.splitext(os.path.basename(file_path))[0]
+        # Mapped tables cannot be replaced on every platform; lookups find nothing until the reload
+        self.geoip.close()
+        try:
+            counts = geoip.compile_csv(file_path, os.path.join(GEOIP_DIR, name + geoip.EXTENSION), layout)
+        finally:
+            self.geoip.load()
+        located = self.geolocate_proxies(force=True)
+        self.save_proxies()
+        return {'ranges': counts, 'located': located}
+
+    def _rescore_peers(self, proxy: Dict):
+        """Re-score a proxy and, when exits are shared, every proxy behind the same exit IP"""
+        self.selector.update(proxy)
+        if self.shared_exit_as_one:
+            for peer in self.get_exit_peers(proxy):
+                if peer is not proxy:
+                    self.selector.update(peer)
+
+    def _on_lease_change(self, proxy: Dict):
+        """Holder count changed; peers only need re-scoring when that moved their group across the limit"""
+        if self._account_exit(proxy) and self.shared_exit_as_one:
+            self._rescore_peers(proxy)
+        else:
+            self.selector.update(proxy)
+
+    def set_shared_exit(self, enabled: bool):
+        """Count proxies behind one exit IP as one resource (see PROXY_SHARED_EXIT_AS_ONE); re-scores every proxy"""
+        self.shared_exit_as_one = bool(enabled)
+        self.selector.rebuild(self.proxies)
+
     def _is_quarantined(self, proxy: Dict) -> bool:
         try:
             return int(proxy.get('quarantine_until') or 0) > int(time.time())
         except:
             return False
+
+    def _quarantine_expiry(self, proxy: Dict) -> Optional[float]:
+        return proxy.get('quarantine_until') if self._is_quarantined(proxy) else None
+
+    def _selection_score(self, proxy: Dict) -> Optional[Tuple[float, float, int]]:
+        """
+        (latency ms, success rate) for the selector, or None when the proxy must not be handed out
+        (incl. fully leased, and retired source entries kept only for the accounts still using them);
+        the third value is how many usable proxies share its exit IP
+        """
+        if not self._is_usable(proxy):
+            return None
+        share = 1
+        group = self._exit_group(proxy) if self.shared_exit_as_one else None
+        if group is not None:
+            # One exit IP is one resource: its lease limit covers every proxy behind it, and its pick
+            # weight is split between those that are usable (running totals, see ExitGroup)
+            if self.leases.at_limit(group.holders):
+                return None
+            share = max(1, group.scored)
+        elif self.leases.is_full(proxy):
+            return None
+        stats = self.history.stats(proxy)
+        latency = stats['ewma'] or proxy.get('response_time') or 1000.0
+        # Laplace prior, like EndpointStats: a proxy with little history is neither trusted nor shunned
+        ups = (stats['uptime'] or 0.0) * stats['samples'] / 100
+        return float(latency), (ups + 1) / (stats['samples'] + 2), share
+
+    def _is_usable(self, proxy: Dict) -> bool:
+        return proxy.get('status') == 'alive' and not proxy.get('retired') and not self._is_quarantined(proxy)
+
+    def _stats_items(self):
+        return [(id(p), p) for p in self.proxies]
+
+    def _refresh(self, proxy: Dict):
+        """Re-classify a proxy after its status fields changed"""
+        self.stats.refresh(id(proxy), proxy)
+        if self.table is not None:
+            self.table.refresh(proxy)
+        if self._account_exit(proxy) and self.shared_exit_as_one:
+            # Its exit peers' share of the pick weight changed
+            self._rescore_peers(proxy)
+        else:
+            self.selector.update(proxy)
+        self.scheduler.track(proxy)
+
+    def _add_dedup_key(self, proxy: Dict):
+        key = proxy_ingest.dedup_key(proxy)
+        self._dedup_keys[key] = self._dedup_keys.get(key, 0) + 1
+
+    def _untrack(self, proxy: Dict):
+        self._by_id.pop(proxy.get('id'), None)
+        key = proxy_ingest.dedup_key(proxy)
+        count = self._dedup_keys.get(key, 0) - 1
+        if count > 0:
+            self._dedup_keys[key] = count
+        else:
+            self._dedup_keys.pop(key, None)
+        peers = self._leave_exit(proxy, proxy.get('exit_ip'))
+        self.stats.untrack(id(proxy))
+        self.selector.remove(proxy)
+        if self.shared_exit_as_one:
+            for peer in peers:
+                self.selector.update(peer)
+        self.leases.forget(proxy)
+        self.scheduler.untrack(proxy)
+        self.history.remove(proxy)
+
+    def start_recheck(self):
+        """Keep statuses fresh in the background by re-checking only proxies that are due"""
+        self.scheduler.start()
+
+    def stop_recheck(self, wait: bool = True):
+        self.scheduler.stop(wait)
+
+    def note_proxy_used(self, proxy: Dict):
+        """An account picked this proxy; it gets re-checked sooner for a while"""
+        now = time.time()
+        self.selector.mark_used(proxy, now)
+        # lru treats a shared exit as used too, so the next pick goes to a different exit IP
+        group = self._exit_group(proxy)
+        if group is not None:
+            group.used_at = now
+        self.scheduler.touch(proxy)
+
+    def get_proxy_stats(self) -> Dict:
+        snapshot = self.stats.snapshot()
+        statuses = snapshot.get('status', {})
+        return {
+            'total': snapshot['total'],
+            'alive': statuses.get('alive', 0),
+            'dead': statuses.get('dead', 0),
+            'unchecked': statuses.get('unchecked', 0),
+            'quarantined': snapshot.get('quarantined', {}).get(True, 0)
+        }
     
     def save_proxies(self):
-        with open(PROXIES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.proxies, f, indent=2, ensure_ascii=False)
+        if self._batch is not None:
+            self._batch['dirty'] = True
+            return
+        with self._save_lock:
+            # Temp file + rename: a shutdown mid-dump must not leave proxies.json truncated
+            f = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(PROXIES_FILE),
+                                            prefix='proxies.', suffix='.tmp', delete=False)
+            try:
+                with f:
+                    json.dump(list(self.proxies), f, indent=2, ensure_ascii=False, default=json_default)
+                os.replace(f.name, PROXIES_FILE)
+            except BaseException:
+                if os.path.exists(f.name):
+                    os.remove(f.name)
+                raise
+            self.history.save()
+            self.ip_lookup.save()
+
+    @contextmanager
+    def batch(self):
+        """Defer save_proxies() to a single write at exit; restore proxies on error"""
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = {
+            'proxies': list(self.proxies),
+            'index': dict(self._by_id),
+            'originals': {},
+            'dirty': False
+        }
+        try:
+            yield self
+        except BaseException:
+            batch, self._batch = self._batch, None
+            for proxy_id, original in batch['originals'].items():
+                proxy = batch['index'].get(proxy_id)
+                if proxy is not None:
+                    proxy.clear()
+                    proxy.update(original)
+            self.proxies[:] = batch['proxies']
+            self._index_ids()
+            self.stats.reset(self._stats_items())
+            if self.table is not None:
+                self.table.rebuild(self.proxies)
+            self.selector.rebuild(self.proxies)
+            self.scheduler.reset(self.proxies)
+            raise
+        else:
+            batch, self._batch = self._batch, None
+            if batch['dirty']:
+                self.save_proxies()
+
+    def _remember(self, proxy: Dict):
+        if self._batch is not None and proxy['id'] in self._batch['index']:
+            self._batch['originals'].setdefault(proxy['id'], proxy.copy())
     
     def add_proxy(self, proxy_string: str) -> bool:
         try:
@@ -43,252 +574,584 @@ class ProxyManager:
             if not proxy_data:
                 return False
             
-            for proxy in self.proxies:
-                if (
-                    proxy['protocol'] == proxy_data['protocol'] and
-                    proxy['host'] == proxy_data['host'] and
-                    proxy['port'] == proxy_data['port'] and
-                    proxy.get('username') == proxy_data.get('username') and
-                    proxy.get('password') == proxy_data.get('password')
-                ):
-                    return False
-            
-            proxy_data['status'] = 'unchecked'
-            proxy_data['last_check'] = None
-            proxy_data['response_time'] = None
+            if proxy_ingest.dedup_key(proxy_data) in self._dedup_keys:
+                return False
             
-            self.proxies.append(proxy_data)
+            self._append_proxy(proxy_data)
             self.save_proxies()
             return True
         except Exception as e:
             print(f"Error adding proxy: {e}")
             return False
+
+    def _append_proxy(self, proxy_data: Dict) -> Dict:
+        proxy_data = Proxy(proxy_data)
+        proxy_data['id'] = str(uuid.uuid4())
+        proxy_data['status'] = 'unchecked'
+        proxy_data['last_check'] = None
+        proxy_data['response_time'] = None
+        
+        self.proxies.append(proxy_data)
+        self._by_id[proxy_data['id']] = proxy_data
+        self._add_dedup_key(proxy_data)
+        self.stats.track(id(proxy_data), proxy_data)
+        if self.table is not None:
+            self.table.append(proxy_data)
+        self.selector.update(proxy_data)
+        self.scheduler.track(proxy_data)
+        return proxy_data
     
     def parse_proxy_string(self, proxy_string: str) -> Optional[Dict]:
         try:
-            if '://' in proxy_string:
-                protocol, rest = proxy_string.split('://', 1)
-            else:
-                protocol = 'http'
-                rest = proxy_string
-            
-            parts = rest.split(':')
-            
-            if len(parts) == 2:
-                host, port = parts
-                return {
-                    'protocol': protocol,
-                    'host': host,
-                    'port': int(port),
-                    'username': None,
-                    'password': None
-                }
-            elif len(parts) == 4:
-                host, port, username, password = parts
-                return {
-                    'protocol': protocol,
-                    'host': host,
-                    'port': int(port),
-                    'username': username,
-                    'password': password
-                }
-            else:
-                return None
-        except:
+            return proxy_ingest.parse_proxy_line(proxy_string)
+        except ValueError:
             return None
+
+    def ingest_proxies(self, parsed: Iterable[proxy_ingest.ParsedLine]) -> proxy_ingest.IngestReport:
+        """
+        Add proxies from parsed lines (see proxy_ingest), deduplicated against the dedup key index, with a
+        single save at the end; returns parsed / added / duplicate / invalid counts and per-line errors
+        """
+        report = proxy_ingest.IngestReport()
+        with self.batch():
+            for lineno, proxy_data, error in parsed:
+                if proxy_data is None:
+                    report.error(lineno, error)
+                    continue
+                report.parsed += 1
+                if proxy_ingest.dedup_key(proxy_data) in self._dedup_keys:
+                    report.duplicates += 1
+                    continue
+                self._append_proxy(proxy_data)
+                report.added += 1
+            if report.added:
+                self.save_proxies()
+        return report
+
+    def _parse_path(self, file_path: str, workers: Optional[int] = None) -> Iterable[proxy_ingest.ParsedLine]:
+        if workers is None:
+            large = os.path.getsize(file_path) >= PROXY_IMPORT_PARALLEL_BYTES
+            workers = PROXY_IMPORT_WORKERS if large else 1
+        return proxy_ingest.parse_file(file_path, workers, PROXY_IMPORT_CHUNK_LINES)
+
+    def import_proxies_file(self, file_path: str, workers: Optional[int] = None) -> proxy_ingest.IngestReport:
+        """Stream a proxy list file into the list; files over PROXY_IMPORT_PARALLEL_BYTES are parsed in a process pool"""
+        return self.ingest_proxies(self._parse_path(file_path, workers))
     
     def add_proxies_from_file(self, file_path: str) -> int:
-        count = 0
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                for line in lines:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        if self.add_proxy(line):
-                            count += 1
+            return self.import_proxies_file(file_path).added
         except Exception as e:
             print(f"Error reading proxy file: {e}")
-        return count
+            return 0
     
-    def remove_proxy(self, index: int) -> bool:
+    def add_source(self, name: str, path: str, keep_in_use: bool = True) -> SyncReport:
+        """Subscribe to a provider export file or drop directory and merge it right away"""
+        self.sources.add(name, path, keep_in_use)
+        return self.sync_source(name)
+
+    def _in_use_ids(self) -> Set[str]:
         try:
-            if 0 <= index < len(self.proxies):
-                self.proxies.pop(index)
+            ids = set(self.referenced_proxy_ids())
+        except Exception as e:
+            print(f"Error reading proxies in use: {e}")
+            ids = set()
+        ids.update(proxy['id'] for proxy in self.leases.snapshot().values())
+        return ids
+
+    def sync_source(self, name: str) -> SyncReport:
+        """
+        Diff-merge a source into the list by dedup_key: new entries are added (and queued for a check),
+        entries still listed keep their status and health history untouched, and entries gone from the
+        source are removed - or, with keep_in_use, retired while an account still points at them or holds
+        them (retired proxies are never picked for random modes and come back if the source lists them again)
+        """
+        source = self.sources.get(name)
+        if source is None:
+            raise ValueError(f"unknown proxy source '{name}'")
+        report = SyncReport()
+        marker = fingerprint(source['path'])
+        if marker is None:
+            # Missing file or directory: keep everything rather than retire a whole source on a bad mount
+            report.error(0, f"path not found: {source['path']}")
+            return report
+
+        wanted = {}
+        files = source_files(source['path'])
+        for file_path in files:
+            prefix = f"{os.path.basename(file_path)}: " if len(files) > 1 else ""
+            for lineno, proxy_data, error in self._parse_path(file_path):
+                if proxy_data is None:
+                    report.error(lineno, prefix + error)
+                    continue
+                report.parsed += 1
+                key = proxy_ingest.dedup_key(proxy_data)
+                if key in wanted:
+                    report.duplicates += 1
+                else:
+                    wanted[key] = proxy_data
+
+        if not report.parsed:
+            # An empty or unreadable export (failed provider job) is not a request to drop every proxy and its
+            # history; remove the source, optionally with its proxies, to really empty it
+            report.error(0, "no valid proxies in source; nothing was removed")
+            self.sources.mark_synced(name, marker, report)
+            return report
+
+        keep_ids = self._in_use_ids() if source.get('keep_in_use', True) else set()
+        now = int(time.time())
+        with self.batch():
+            owned = {}
+            removing = []
+            for proxy in self.proxies:
+                key = proxy_ingest.dedup_key(proxy)
+                if proxy.get('source') != name:
+                    owned.setdefault(key, proxy)
+                    continue
+                owned[key] = proxy
+                if key in wanted:
+                    if proxy.get('retired'):
+                        self._remember(proxy)
+                        proxy['retired'] = None
+                        self._refresh(proxy)
+                        report.restored += 1
+                    else:
+                        report.unchanged += 1
+                elif proxy['id'] in keep_ids:
+                    if not proxy.get('retired'):
+                        self._remember(proxy)
+                        proxy['retired'] = now
+                        self._refresh(proxy)
+                        report.retired += 1
+                else:
+                    removing.append(proxy['id'])
+
+            for key, proxy_data in wanted.items():
+                existing = owned.get(key)
+                if existing is None:
+                    proxy_data['source'] = name
+                    self._append_proxy(proxy_data)
+                    report.added += 1
+                elif not existing.get('source'):
+                    # Imported by hand earlier: the source takes it over with its history intact
+                    self._remember(existing)
+                    existing['source'] = name
+                    report.adopted += 1
+
+            report.removed = self.remove_proxies_by_id(removing)
+            if report.changed:
                 self.save_proxies()
-                return True
-            return False
-        except:
-            return False
+        self.sources.mark_synced(name, marker, report)
+        return report
+
+    def sync_changed_sources(self) -> Dict[str, SyncReport]:
+        """Merge every source whose files changed since its last sync"""
+        return {name: self.sync_source(name) for name in self.sources.poll()}
+
+    def remove_source(self, name: str, drop_proxies: bool = False) -> int:
+        """
+        Unsubscribe; its proxies stay as plain entries, or with drop_proxies are removed except those
+        still in use; returns how many proxies were removed
+        """
+        removed = 0
+        with self.batch():
+            members = [p for p in self.proxies if p.get('source') == name]
+            keep_ids = self._in_use_ids() if drop_proxies else None
+            for proxy in members:
+                if keep_ids is None or proxy['id'] in keep_ids:
+                    self._remember(proxy)
+                    proxy['source'] = None
+                    if proxy.get('retired'):
+                        proxy['retired'] = None
+                        self._refresh(proxy)
+            if keep_ids is not None:
+                removed = self.remove_proxies_by_id(p['id'] for p in members if p['id'] not in keep_ids)
+            if members:
+                self.save_proxies()
+        self.sources.remove(name)
+        return removed
+
+    def remove_proxy(self, index: int) -> bool:
+        proxy = self.get_proxy_by_index(index)
+        return proxy is not None and self.remove_proxies_by_id([proxy['id']]) == 1
     
     def remove_proxies(self, indices: List[int]) -> int:
-        count = 0
-        for index in sorted(indices, reverse=True):
-            if self.remove_proxy(index):
-                count += 1
-        return count
+        ids = [self.proxies[i]['id'] for i in set(indices) if 0 <= i < len(self.proxies)]
+        return self.remove_proxies_by_id(ids)
+
+    def remove_proxies_by_id(self, proxy_ids: Iterable[str]) -> int:
+        targets = {id(self._by_id[pid]) for pid in set(proxy_ids) if pid in self._by_id}
+        if not targets:
+            return 0
+        with self.batch():
+            mask = [id(p) not in targets for p in self.proxies]
+            for proxy, keep in zip(self.proxies, mask):
+                if not keep:
+                    self._untrack(proxy)
+            self.proxies[:] = [p for p, keep in zip(self.proxies, mask) if keep]
+            if self.table is not None:
+                self.table.keep(self.proxies, mask)
+            self.save_proxies()
+        return len(targets)
     
     def check_proxy(self, proxy: Dict, timeout: int = 10) -> Dict:
-        import time
-        try:
-            if self._is_quarantined(proxy):
-                return proxy
+        if self._is_quarantined(proxy):
+            return proxy
+        result = self.checker.check(proxy)
+        if result is None:
+            result = self._probe_with_requests(proxy, timeout)
+        success, elapsed, exit_ip = result
+        return self._apply_check_result(proxy, success, elapsed, exit_ip)
 
-            protocol = proxy['protocol'].lower()
-            
-            if proxy['username'] and proxy['password']:
-                proxy_url = f"{protocol}://{proxy['username']}:{proxy['password']}@{proxy['host']}:{proxy['port']}"
-            else:
-                proxy_url = f"{protocol}://{proxy['host']}:{proxy['port']}"
-            
-            if protocol in ['socks5', 'socks4', 'socks']:
-                if protocol == 'socks':
-                    protocol = 'socks5' 
-                proxies = {
-                    'http': proxy_url,
-                    'https': proxy_url
-                }
-            else:
-                proxies = {
-                    'http': proxy_url,
-                    'https': proxy_url
-                }
-            
-            test_urls = [
-                'http://httpbin.org/ip',
-                'http://api.ipify.org?format=json',
-                'http://ip-api.com/json'
-            ]
+    def _probe_with_requests(self, proxy: Dict, timeout: int = 10) -> Tuple[bool, float, Optional[str]]:
+        """Blocking probe through requests; returns (alive, seconds, exit IP) without touching the proxy"""
+        try:
+            proxy_url = proxy_ingest.proxy_url(proxy)
+            proxies = {
+                'http': proxy_url,
+                'https': proxy_url
+            }
             
             start_time = time.time()
-            success = False
             
-            for test_url in test_urls:
+            # Same endpoints (and adaptive order) as the async checker; latency is the winning request's own
+            for test_url in self.checker.ranked_urls():
+                request_start = time.time()
                 try:
                     response = requests.get(test_url, proxies=proxies, timeout=timeout)
                     if response.status_code == 200:
-                        success = True
-                        break
+                        return True, time.time() - request_start, extract_ip(response.content[:4096])
                 except:
                     continue
             
-            response_time = time.time() - start_time
-            
-            if success:
-                proxy['status'] = 'alive'
-                proxy['response_time'] = round(response_time * 1000, 2)
-                proxy['last_check'] = time.strftime('%Y-%m-%d %H:%M:%S')
-                proxy['fail_count'] = 0
-                proxy['quarantine_until'] = 0
-                return proxy
-            else:
-                proxy['status'] = 'dead'
-                proxy['response_time'] = None
-                proxy['last_check'] = time.strftime('%Y-%m-%d %H:%M:%S')
-                proxy['fail_count'] = int(proxy.get('fail_count') or 0) + 1
-                if int(proxy.get('fail_count') or 0) >= 3:
-                    proxy['quarantine_until'] = int(time.time()) + 86400
-                return proxy
+            return False, time.time() - start_time, None
         except Exception as e:
+            print(f"Proxy check error: {e}")
+            return False, 0, None
+
+    def _apply_check_result(self, proxy: Dict, success: bool, response_time: float,
+                            exit_ip: Optional[str] = None) -> Dict:
+        """Record a health-check outcome (response_time in seconds) the same way for every check engine"""
+        proxy['last_check'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        if success:
+            if exit_ip:
+                self._observe_exit_ip(proxy, exit_ip)
+            proxy['status'] = 'alive'
+            proxy['response_time'] = round(response_time * 1000, 2)
+            proxy['fail_count'] = 0
+            proxy['quarantine_until'] = 0
+        else:
             proxy['status'] = 'dead'
             proxy['response_time'] = None
-            proxy['last_check'] = time.strftime('%Y-%m-%d %H:%M:%S')
             proxy['fail_count'] = int(proxy.get('fail_count') or 0) + 1
             if int(proxy.get('fail_count') or 0) >= 3:
                 proxy['quarantine_until'] = int(time.time()) + 86400
-            print(f"Proxy check error: {e}")
-            return proxy
+        self.history.record(proxy, success, proxy['response_time'])
+        self._refresh(proxy)
+        return proxy
     
-    def check_all_proxies(self, callback=None, progress_callback=None, max_workers: int = 10):
+    def check_all_proxies(self, callback=None, progress_callback=None, max_workers: int = 10,
+                          mode: str = 'probe', api_key: str = None) -> Optional[Dict]:
+        """
+        Check every proxy; quarantined proxies are skipped
+        mode 'probe': SOCKS5/HTTP proxies on the asyncio engine, anything else (e.g. SOCKS4)
+            with check_proxy on max_workers threads
+        mode 'staged': TCP precheck -> probe -> advanced lookup (only when api_key is given);
+            returns per-stage metrics {stage: {started, passed, failed, elapsed, throughput, ...}}
+        Async checks run under an AIMD window (self.concurrency_limits) instead of a fixed worker count.
+        progress_callback(done, total, info): info holds the current 'window', 'in_flight' and the
+        achieved 'checks_per_sec'
+        """
+        # Saved once at the end; background re-check flushes would rewrite the file throughout the run
+        with self.scheduler.hold_flush():
+            if mode == 'staged':
+                return self._check_all_staged(callback, progress_callback, api_key)
+            return self._check_all_probe(callback, progress_callback, max_workers)
+
+    def _check_all_probe(self, callback=None, progress_callback=None, max_workers: int = 10) -> None:
         total = len(self.proxies)
         completed = 0
+        started = time.time()
         lock = threading.Lock()
+        controller = self._make_controller(PROXY_CHECK_CONCURRENCY)
 
-        def check_worker(idx_proxy):
-            idx, proxy = idx_proxy
-            updated_proxy = self.check_proxy(proxy)
+        def finish(idx, proxy):
+            nonlocal completed
             with lock:
-                self.proxies[idx] = updated_proxy
+                completed += 1
+                done = completed
             if callback:
-                callback(idx, updated_proxy)
-            return idx
+                callback(idx, proxy)
+            if progress_callback:
+                info = controller.snapshot() if controller is not None else {'window': PROXY_CHECK_CONCURRENCY}
+                progress_callback(done, total, self._progress_info(info, done, started))
+
+        def on_result(idx, proxy, success, elapsed, exit_ip):
+            finish(idx, self._apply_check_result(proxy, success, elapsed, exit_ip))
+
+        async_items = []
+        legacy_items = []
+        for idx, proxy in enumerate(self.proxies):
+            if self._is_quarantined(proxy):
+                finish(idx, proxy)
+            elif self.checker.supports(proxy):
+                async_items.append((idx, proxy))
+            else:
+                legacy_items.append((idx, proxy))
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(check_worker, (i, proxy)) for i, proxy in enumerate(self.proxies)]
-            for _ in as_completed(futures):
-                completed += 1
-                if progress_callback:
-                    progress_callback(completed, total)
+            futures = {executor.submit(self.check_proxy, proxy): idx for idx, proxy in legacy_items}
+            self.checker.run(async_items, on_result, controller)
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
 
         self.save_proxies()
-    
-    def get_random_alive_proxy(self) -> Optional[Dict]:
-        import random
-        alive_proxies = [p for p in self.proxies if p['status'] == 'alive' and not self._is_quarantined(p)]
-        if alive_proxies:
-            return random.choice(alive_proxies)
         return None
+
+    def _make_controller(self, cap: int) -> Optional[AIMDController]:
+        if not self.concurrency_limits:
+            return None
+        return from_limits(self.concurrency_limits, cap)
+
+    @staticmethod
+    def _progress_info(info: Dict, done: int, started: float) -> Dict:
+        info = dict(info)
+        elapsed = time.time() - started
+        info['checks_per_sec'] = round(done / elapsed, 1) if elapsed > 0 else 0.0
+        return info
+
+    def _check_all_staged(self, callback=None, progress_callback=None, api_key: str = None) -> Dict:
+        total = len(self.proxies)
+        completed = 0
+        started = time.time()
+        pipeline = None
+
+        def finish(idx, proxy, stage=None):
+            nonlocal completed
+            completed += 1
+            if callback:
+                callback(idx, proxy)
+            if progress_callback:
+                info = pipeline.status() if pipeline is not None else {}
+                progress_callback(completed, total, self._progress_info(info, completed, started))
+
+        def on_probe(idx, proxy, success, elapsed, exit_ip):
+            self._apply_check_result(proxy, success, elapsed, exit_ip)
+
+        items = []
+        for idx, proxy in enumerate(self.proxies):
+            if self._is_quarantined(proxy):
+                finish(idx, proxy)
+            else:
+                items.append((idx, proxy))
+
+        pipeline = ProxyCheckPipeline(
+            self.checker,
+            concurrency=PROXY_PIPELINE_CONCURRENCY,
+            precheck_timeout=PROXY_CHECK_TIMEOUTS['precheck'],
+            fallback_probe=self._probe_with_requests,
+            advanced=(lambda proxy: self._advanced_lookup(proxy, api_key) is not None) if api_key else None,
+            adaptive=self.concurrency_limits or None
+        )
+        metrics = pipeline.run(items, on_probe, finish)
+        self.save_proxies()
+        return metrics
+    
+    def get_random_alive_proxy(self, weighted: bool = False) -> Optional[Dict]:
+        """weighted: prefer fast, reliable proxies (success rate / EWMA latency)"""
+        return self.selector.pick(WEIGHTED if weighted else UNIFORM)
+
+    def get_proxy_for_mode(self, mode: str, account_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Pick a usable proxy for an account's proxy_mode (see PROXY_SELECTION_MODES) and mark it used
+        With account_id the proxy is leased to that account until release_proxy(account_id)
+        """
+        policy = PROXY_SELECTION_MODES.get(mode)
+        if policy is None:
+            return None
+        if account_id is not None:
+            proxy = self.leases.acquire(account_id, policy)
+        else:
+            proxy = self.selector.pick(policy)
+        if proxy is not None:
+            self.note_proxy_used(proxy)
+        return proxy
+
+    def release_proxy(self, account_id: str):
+        """The account's browser closed; its proxy can be handed out again"""
+        self.leases.release(account_id)
+
+    def set_lease_limit(self, max_share: int):
+        """Accounts that may share one proxy (0 = no limit); re-scores every proxy since fullness changes"""
+        self.leases.max_share = max(0, int(max_share))
+        self.selector.rebuild(self.proxies)
+
+    @staticmethod
+    def is_selection_mode(mode: Optional[str]) -> bool:
+        return mode in PROXY_SELECTION_MODES
+
+    def get_latency_percentiles(self, percentiles=(50, 90, 99)) -> Dict:
+        """Response time percentiles (ms) over usable proxies with a measured latency"""
+        if self.table is not None:
+            return self.table.latency_percentiles(percentiles)
+
+        latencies = sorted(
+            float(p['response_time']) for p in self.proxies
+            if p.get('status') == 'alive' and not self._is_quarantined(p) and p.get('response_time') is not None
+        )
+        if not latencies:
+            return {q: None for q in percentiles}
+        result = {}
+        for q in percentiles:
+            # Linear interpolation, same as numpy.percentile's default
+            pos = (len(latencies) - 1) * q / 100
+            low = int(pos)
+            high = min(low + 1, len(latencies) - 1)
+            result[q] = round(latencies[low] + (latencies[high] - latencies[low]) * (pos - low), 2)
+        return result
+
+    def get_sorted_proxies(self, key: str = 'response_time', descending: bool = False,
+                           alive_only: bool = False) -> List[Dict]:
+        """
+        Proxies ordered by response_time, fraud_score, fail_count or quarantine_until, or by a history
+        stat (uptime, p50, p95, ewma, samples); missing values last
+        """
+        if key in HISTORY_KEYS:
+            candidates = self.proxies
+            if alive_only:
+                candidates = [p for p in candidates if p.get('status') == 'alive' and not self._is_quarantined(p)]
+            stats = self.history.bulk_stats(candidates)
+            known = [(s[key], p) for s, p in zip(stats, candidates) if s[key] is not None]
+            missing = [p for s, p in zip(stats, candidates) if s[key] is None]
+            known.sort(key=lambda item: item[0], reverse=descending)
+            return [p for _, p in known] + missing
+
+        if self.table is not None:
+            return [self.proxies[i] for i in self.table.sorted_indices(key, descending, alive_only)]
+
+        if key not in proxy_table.SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {key}")
+
+        def value(proxy):
+            if key == 'fraud_score':
+                return (proxy.get('advanced_check') or {}).get('fraud_score')
+            return proxy.get(key)
+
+        candidates = self.proxies
+        if alive_only:
+            candidates = [p for p in candidates if p.get('status') == 'alive' and not self._is_quarantined(p)]
+        known = [p for p in candidates if value(p) is not None]
+        missing = [p for p in candidates if value(p) is None]
+        return sorted(known, key=lambda p: float(value(p)), reverse=descending) + missing
+
+    def get_history_stats(self, proxies: Optional[List[Dict]] = None) -> List[Dict]:
+        """{uptime %, p50, p95, ewma (ms), samples} per proxy, in list order"""
+        return self.history.bulk_stats(self.proxies if proxies is None else proxies)
+
+    def select_proxies(self, min_uptime: float = 0.0, max_p95: Optional[float] = None,
+                       min_samples: int = 1, alive_only: bool = True) -> List[Dict]:
+        """Proxies whose recent history meets the thresholds (uptime in %, p95 in ms)"""
+        candidates = self.proxies
+        if alive_only:
+            candidates = [p for p in candidates if p.get('status') == 'alive']
+        selected = []
+        for stats, proxy in zip(self.history.bulk_stats(candidates), candidates):
+            if stats['samples'] < min_samples or (stats['uptime'] or 0.0) < min_uptime:
+                continue
+            if max_p95 is not None and (stats['p95'] is None or stats['p95'] > max_p95):
+                continue
+            selected.append(proxy)
+        return selected
     
     def get_all_proxies(self) -> List[Dict]:
         return self.proxies
     
+    def get_proxy(self, proxy_id: Optional[str]) -> Optional[Dict]:
+        return self._by_id.get(proxy_id) if proxy_id else None
+
+    def resolve_proxy_id(self, ref) -> Optional[str]:
+        """Stable id for an account's proxy_id, which may still be a legacy list index; None if unknown"""
+        if ref is None:
+            return None
+        ref = str(ref)
+        if ref in self._by_id:
+            return ref
+        if ref.isdigit():
+            proxy = self.get_proxy_by_index(int(ref))
+            return proxy['id'] if proxy is not None else None
+        return None
+
     def get_proxy_by_index(self, index: int) -> Optional[Dict]:
         if 0 <= index < len(self.proxies):
             return self.proxies[index]
         return None
     
     def clear_dead_proxies(self) -> int:
-        original_count = len(self.proxies)
-        self.proxies = [p for p in self.proxies if p['status'] != 'dead']
-        self.save_proxies()
-        return original_count - len(self.proxies)
+        if self.table is not None:
+            dead = [self.proxies[i]['id'] for i in self.table.indices('dead')]
+        else:
+            dead = [p['id'] for p in self.proxies if p['status'] == 'dead']
+        return self.remove_proxies_by_id(dead)
     
     def check_proxy_advanced(self, proxy: Dict, api_key: str, timeout: int = 10) -> Tuple[Dict, Optional[Dict]]:
+        updated_proxy = self.check_proxy(proxy, timeout)
+        if updated_proxy['status'] != 'alive':
+            return updated_proxy, None
+        return updated_proxy, self._advanced_lookup(updated_proxy, api_key, timeout)
+
+    def _advanced_lookup(self, proxy: Dict, api_key: str, timeout: int = 10) -> Optional[Dict]:
+        """
+        Resolve the exit IP and store its IP2Location verdict in advanced_check; returns the raw API data
+        The exit IP the health check just saw is reused (rotating proxies always ask exit_ip_url again)
+        """
         try:
-            updated_proxy = self.check_proxy(proxy, timeout)
-            
-            if updated_proxy['status'] != 'alive':
-                return updated_proxy, None
-            
-            protocol = proxy['protocol'].lower()
-            if proxy['username'] and proxy['password']:
-                proxy_url = f"{protocol}://{proxy['username']}:{proxy['password']}@{proxy['host']}:{proxy['port']}"
-            else:
-                proxy_url = f"{protocol}://{proxy['host']}:{proxy['port']}"
-            
-            proxies = {
-                'http': proxy_url,
-                'https': proxy_url
-            }
-            
-            ip_response = requests.get('http://api.ipify.org?format=json', proxies=proxies, timeout=timeout)
-            if ip_response.status_code != 200:
-                return updated_proxy, None
-            
-            proxy_ip = ip_response.json().get('ip', proxy['host'])
+            proxy_ip = proxy.get('exit_ip')
+            seen_at = float(proxy.get('exit_ip_seen_at') or 0)
+            if not proxy_ip or self.is_rotating(proxy) or time.time() - seen_at > PROXY_EXIT_IP_REUSE:
+                proxy_ip = self._fetch_exit_ip(proxy, timeout)
+                if proxy_ip is None:
+                    return None
+                self._observe_exit_ip(proxy, proxy_ip)
+            self.geolocate_proxies([proxy])
             
-            api_url = f"https://api.ip2location.io/?key={api_key}&ip={proxy_ip}"
-            api_response = requests.get(api_url, timeout=timeout)
-            
-            if api_response.status_code != 200:
-                return updated_proxy, None
-            
-            api_data = api_response.json()
+            # Proxies sharing an exit IP (or checked within the TTL) reuse one IP2Location answer
+            api_data = self.ip_lookup.lookup(proxy_ip, api_key)
+            if api_data is None:
+                return None
             
-            updated_proxy['advanced_check'] = {
+            # The online answer enriches the offline geo; fields it lacks fall back to the local tables
+            geo = proxy.get('geo') or {}
+            proxy['advanced_check'] = {
                 'fraud_score': api_data.get('fraud_score', 0),
                 'is_proxy': api_data.get('is_proxy', False),
-                'country': api_data.get('country_name', 'Unknown'),
-                'isp': api_data.get('isp', 'Unknown'),
-                'proxy_type': api_data.get('proxy', {}).get('proxy_type', '-'),
+                'country': api_data.get('country_name') or geo.get('country_name') or geo.get('country_code') or 'Unknown',
+                'isp': api_data.get('isp') or geo.get('isp') or 'Unknown',
+                'proxy_type': (api_data.get('proxy') or {}).get('proxy_type', '-'),
                 'last_advanced_check': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+            self._refresh(proxy)
             
-            return updated_proxy, api_data
+            return api_data
             
         except Exception as e:
             print(f"Advanced proxy check error: {e}")
-            return proxy, None
+            return None
+
+    def _fetch_exit_ip(self, proxy: Dict, timeout: int = 10) -> Optional[str]:
+        proxy_url = proxy_ingest.proxy_url(proxy)
+        proxies = {
+            'http': proxy_url,
+            'https': proxy_url
+        }
+        
+        ip_response = requests.get(self.exit_ip_url, proxies=proxies, timeout=timeout)
+        if ip_response.status_code != 200:
+            return None
+        return extract_ip(ip_response.content[:4096])
+
+    def get_advanced_analysis(self, proxy: Dict) -> Optional[Dict]:
+        """analyze_ip2location_result for the proxy's exit IP, computed once per cached answer"""
+        return self.ip_lookup.analysis(proxy.get('exit_ip'))
     
     def analyze_ip2location_result(self, data: Dict) -> Dict:
         fraud_score = data.get('fraud_score', 0)
@@ -0,0 +1,248 @@
+import asyncio
+import errno
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.async_proxy_checker import AsyncProxyChecker
+from src.core.concurrency_controller import AIMDController, from_limits
+
+STAGES = ('tcp', 'probe', 'advanced')
+
+# errno values that mean "we ran out of sockets", not "the proxy is dead"
+_RESOURCE_ERRORS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS}
+
+
+class StageMetrics:
+    """Counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.passed = 0
+        self.failed = 0
+        self.first_start = None
+        self.last_finish = None
+
+    def start(self):
+        self.started += 1
+        if self.first_start is None:
+            self.first_start = time.time()
+
+    def finish(self, passed: bool):
+        if passed:
+            self.passed += 1
+        else:
+            self.failed += 1
+        self.last_finish = time.time()
+
+    @property
+    def finished(self) -> int:
+        return self.passed + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        if self.first_start is None or self.last_finish is None:
+            return 0.0
+        return self.last_finish - self.first_start
+
+    def throughput(self) -> float:
+        """Finished items per second over the stage's active window"""
+        return self.finished / self.elapsed if self.elapsed > 0 else float(self.finished)
+
+    def to_dict(self) -> Dict:
+        return {
+            'started': self.started,
+            'passed': self.passed,
+            'failed': self.failed,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput(), 1)
+        }
+
+
+class ProxyCheckPipeline:
+    """
+    Staged proxy check on one event loop:
+      tcp      - plain TCP connect to the proxy with a short timeout
+      probe    - full tunnel handshake + HTTP probe (AsyncProxyChecker), survivors of tcp only
+      advanced - optional blocking geo/fraud lookup in a thread, alive proxies only
+    Each stage has its own worker count; bounded queues between stages give back-pressure.
+    With adaptive limits, the tcp and probe stages start small and an AIMDController per stage grows or
+    shrinks how many of their workers may be in flight; the worker counts become hard caps
+    """
+
+    def __init__(
+        self,
+        checker: AsyncProxyChecker,
+        concurrency: Optional[Dict[str, int]] = None,
+        precheck_timeout: float = 1.5,
+        fallback_probe: Optional[Callable[[Dict], Tuple[bool, float, Optional[str]]]] = None,
+        advanced: Optional[Callable[[Dict], bool]] = None,
+        adaptive: Optional[Dict] = None
+    ):
+        """
+        fallback_probe(proxy) -> (alive, seconds, exit_ip): blocking probe for protocols the checker does not speak
+        advanced(proxy) -> bool: blocking stage-3 check, skipped when None
+        adaptive: {'initial', 'min', 'max', 'increase', 'timeout_threshold'} enables AIMD limits
+        """
+        self.checker = checker
+        self.concurrency = {'tcp': 1000, 'probe': 500, 'advanced': 10}
+        self.concurrency.update(concurrency or {})
+        self.precheck_timeout = precheck_timeout
+        self.fallback_probe = fallback_probe
+        self.advanced = advanced
+        self.adaptive = adaptive
+        self.metrics = {stage: StageMetrics(stage) for stage in STAGES}
+        self.controllers: Dict[str, AIMDController] = {}
+
+    def _make_controllers(self) -> Dict[str, AIMDController]:
+        if not self.adaptive:
+            return {}
+        return {stage: from_limits(self.adaptive, self.concurrency[stage]) for stage in ('tcp', 'probe')}
+
+    def status(self) -> Dict:
+        """Live state for progress reporting: probe window (and tcp window) while adaptive"""
+        probe = self.controllers.get('probe')
+        if probe is None:
+            return {'window': self.concurrency['probe']}
+        info = probe.snapshot()
+        info['tcp_window'] = self.controllers['tcp'].window
+        return info
+
+    async def _tcp_connect(self, proxy: Dict) -> Tuple[bool, bool]:
+        """(connected, timed_out)"""
+        while True:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(proxy['host'], int(proxy['port'])),
+                    self.precheck_timeout
+                )
+            except OSError as e:
+                if e.errno in _RESOURCE_ERRORS:
+                    await asyncio.sleep(0.05)
+                    continue
+                return False, False
+            except asyncio.TimeoutError:
+                return False, True
+            except (ValueError, KeyError):
+                return False, False
+            writer.close()
+            return True, False
+
+    async def _probe(self, proxy: Dict) -> Tuple[bool, float, Optional[str]]:
+        if self.checker.supports(proxy):
+            return await self.checker.probe(proxy)
+        if self.fallback_probe is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.fallback_probe, proxy)
+        return False, 0.0, None
+
+    async def run_async(
+        self,
+        items: List[Tuple[int, Dict]],
+        on_probe: Callable[[int, Dict, bool, float, Optional[str]], None],
+        on_done: Callable[[int, Dict, str], None]
+    ) -> Dict[str, Dict]:
+        """
+        on_probe(index, proxy, alive, seconds, exit_ip) records the health result (tcp failures included)
+        on_done(index, proxy, last_stage) fires once per proxy when it leaves the pipeline
+        """
+        self.metrics = {stage: StageMetrics(stage) for stage in STAGES}
+        self.controllers = self._make_controllers()
+        tcp_limit = self.controllers.get('tcp')
+        probe_limit = self.controllers.get('probe')
+        loop = asyncio.get_running_loop()
+        pending = iter(items)
+        probe_queue = asyncio.Queue(maxsize=self.concurrency['probe'] * 2)
+        advanced_queue = asyncio.Queue(maxsize=self.concurrency['advanced'] * 2)
+
+        async def tcp_worker():
+            metrics = self.metrics['tcp']
+            for index, proxy in pending:
+                if tcp_limit is not None:
+                    await tcp_limit.acquire()
+                metrics.start()
+                start = time.time()
+                ok, timed_out = await self._tcp_connect(proxy)
+                metrics.finish(ok)
+                if tcp_limit is not None:
+                    tcp_limit.release(timed_out)
+                if ok:
+                    await probe_queue.put((index, proxy))
+                else:
+                    on_probe(index, proxy, False, time.time() - start, None)
+                    on_done(index, proxy, 'tcp')
+
+        async def probe_worker():
+            metrics = self.metrics['probe']
+            while True:
+                item = await probe_queue.get()
+                if item is None:
+                    return
+                index, proxy = item
+                if probe_limit is not None:
+                    await probe_limit.acquire()
+                metrics.start()
+                try:
+                    alive, elapsed, exit_ip = await self._probe(proxy)
+                except Exception as e:
+                    print(f"Proxy check error: {e}")
+                    alive, elapsed, exit_ip = False, 0.0, None
+                metrics.finish(alive)
+                if probe_limit is not None:
+                    probe_limit.release(self.checker.timed_out(alive, elapsed))
+                on_probe(index, proxy, alive, elapsed, exit_ip)
+                if alive and self.advanced is not None:
+                    await advanced_queue.put((index, proxy))
+                else:
+                    on_done(index, proxy, 'probe')
+
+        async def advanced_worker():
+            metrics = self.metrics['advanced']
+            while True:
+                item = await advanced_queue.get()
+                if item is None:
+                    return
+                index, proxy = item
+                metrics.start()
+                try:
+                    ok = await loop.run_in_executor(None, self.advanced, proxy)
+                except Exception as e:
+                    print(f"Advanced proxy check error: {e}")
+                    ok = False
+                metrics.finish(bool(ok))
+                on_done(index, proxy, 'advanced')
+
+        tcp_count = max(1, min(self.concurrency['tcp'], len(items)))
+        probe_count = max(1, min(self.concurrency['probe'], len(items)))
+        advanced_count = max(1, self.concurrency['advanced']) if self.advanced is not None else 0
+
+        for controller in self.controllers.values():
+            controller.start()
+        probe_tasks = [asyncio.create_task(probe_worker()) for _ in range(probe_count)]
+        advanced_tasks = [asyncio.create_task(advanced_worker()) for _ in range(advanced_count)]
+
+        try:
+            await asyncio.gather(*(tcp_worker() for _ in range(tcp_count)))
+            for _ in probe_tasks:
+                await probe_queue.put(None)
+            await asyncio.gather(*probe_tasks)
+            for _ in advanced_tasks:
+                await advanced_queue.put(None)
+            await asyncio.gather(*advanced_tasks)
+        finally:
+            for controller in self.controllers.values():
+                await controller.stop()
+
+        return self.report()
+
+    def run(self, items, on_probe, on_done) -> Dict[str, Dict]:
+        """Blocking entry point: run the pipeline on a fresh event loop in the calling thread"""
+        return asyncio.run(self.run_async(items, on_probe, on_done))
+
+    def report(self) -> Dict[str, Dict]:
+        report = {stage: metrics.to_dict() for stage, metrics in self.metrics.items()}
+        for stage, controller in self.controllers.items():
+            report[stage]['window'] = controller.window
+            report[stage]['peak_in_flight'] = controller.peak_in_flight
+            report[stage]['backoffs'] = controller.backoffs
+        return report
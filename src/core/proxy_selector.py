@@ -0,0 +1,256 @@
+import heapq
+import itertools
+import random
+import threading
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+UNIFORM = 'uniform'
+WEIGHTED = 'weighted'
+LRU = 'lru'
+LOWEST_LATENCY = 'lowest_latency'
+POLICIES = (UNIFORM, WEIGHTED, LRU, LOWEST_LATENCY)
+
+
+class FenwickTree:
+    """Prefix sums over non-negative weights with O(log n) update and weighted sampling"""
+
+    def __init__(self, size: int = 0):
+        self._tree = [0.0] * (size + 1)
+        self._weights = [0.0] * size
+        self.total = 0.0
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def grow(self, size: int):
+        if size > len(self._weights):
+            self._weights.extend([0.0] * (size - len(self._weights)))
+            self._rebuild()
+
+    def _rebuild(self):
+        # Rebuilding from the raw weights also clears accumulated float error
+        n = len(self._weights)
+        tree = [0.0] * (n + 1)
+        for i, w in enumerate(self._weights, 1):
+            tree[i] += w
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self.total = sum(self._weights)
+        self._updates = 0
+
+    def weight(self, index: int) -> float:
+        return self._weights[index]
+
+    def set(self, index: int, weight: float):
+        delta = weight - self._weights[index]
+        if not delta:
+            return
+        self._weights[index] = weight
+        self.total += delta
+        i = index + 1
+        n = len(self._weights)
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+        self._updates += 1
+        if self._updates > 4 * n + 64:
+            self._rebuild()
+
+    def find(self, target: float) -> int:
+        """Smallest index whose prefix sum exceeds target (0 <= target < total)"""
+        n = len(self._weights)
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+    def sample(self, rng: random.Random) -> Optional[int]:
+        if self.total <= 0:
+            return None
+        for _ in range(3):
+            index = self.find(rng.random() * self.total)
+            if self._weights[index] > 0:
+                return index
+        # Float drift pointed at an empty slot; resync and try once more
+        self._rebuild()
+        if self.total <= 0:
+            return None
+        return self.find(rng.random() * self.total)
+
+
+class ProxySelector:
+    """
+    Picks a usable proxy without rebuilding a candidate list per call
+      uniform        - Fenwick tree over 0/1 weights (1/share for proxies sharing one exit)
+      weighted       - Fenwick tree over success_rate / latency / share, so fast and reliable proxies win
+                       more often and a group of proxies behind one exit IP weighs as much as one proxy
+      lru            - min-heap on last pick time; used_floor(proxy) lets a pick of one proxy count for
+                       others (an exit group) without touching them: stale entries are re-pushed when they
+                       surface at the top of the heap
+      lowest_latency - min-heap on latency
+    update(proxy) re-scores one proxy in O(log n); heaps use lazy invalidation
+    """
+
+    def __init__(
+        self,
+        score: Callable[[Dict], Optional[tuple]],
+        seed: Optional[int] = None,
+        used_floor: Optional[Callable[[Dict], float]] = None
+    ):
+        """
+        score(proxy) -> (latency_ms, success_rate[, share]) for a usable proxy, or None when it must not be
+        picked; share (default 1) is how many usable proxies split the proxy's weight
+        used_floor(proxy) -> time lru treats the proxy as used at the latest, even if it was not picked itself
+        """
+        self.score = score
+        self.used_floor = used_floor
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._seq = itertools.count()
+        self.rebuild(())
+
+    def rebuild(self, proxies: Iterable[Dict]):
+        with self._lock:
+            self._slots: Dict[Hashable, int] = {}
+            self._proxies: List[Optional[Dict]] = []
+            self._free: List[int] = []
+            self._uniform = FenwickTree()
+            self._weighted = FenwickTree()
+            self._usable_n = 0
+            self._latency: Dict[Hashable, float] = {}
+            self._latency_heap = []
+            # Keep pick times across rebuilds so lru does not restart from scratch
+            previous = getattr(self, '_last_used', {})
+            self._last_used: Dict[Hashable, float] = {}
+            self._lru_heap = []
+            for proxy in proxies:
+                self._update(proxy, previous.get(id(proxy), 0.0))
+
+    def _slot(self, proxy: Dict) -> int:
+        key = id(proxy)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._proxies[slot] = proxy
+            else:
+                slot = len(self._proxies)
+                self._proxies.append(proxy)
+                if slot >= len(self._uniform):
+                    size = max(16, 2 * len(self._uniform))
+                    self._uniform.grow(size)
+                    self._weighted.grow(size)
+            self._slots[key] = slot
+        return slot
+
+    def _update(self, proxy: Dict, last_used: float = 0.0):
+        key = id(proxy)
+        scored = self.score(proxy)
+        if scored is None:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._usable_n -= self._uniform.weight(slot) > 0
+                self._uniform.set(slot, 0.0)
+                self._weighted.set(slot, 0.0)
+            self._latency.pop(key, None)
+            return
+
+        latency, success = scored[0], scored[1]
+        share = max(scored[2], 1) if len(scored) > 2 else 1
+        slot = self._slot(proxy)
+        recovered = self._uniform.weight(slot) == 0
+        self._usable_n += recovered
+        self._uniform.set(slot, 1.0 / share)
+        self._weighted.set(slot, max(success, 0.0) / max(latency, 10.0) / share)
+        if self._latency.get(key) != latency:
+            self._latency[key] = latency
+            heapq.heappush(self._latency_heap, (latency, next(self._seq), key))
+        if key not in self._last_used:
+            self._last_used[key] = last_used
+            heapq.heappush(self._lru_heap, (last_used, next(self._seq), key))
+        elif recovered:
+            # Its lru entry was dropped while it was unusable
+            heapq.heappush(self._lru_heap, (self._last_used[key], next(self._seq), key))
+
+    def update(self, proxy: Dict):
+        with self._lock:
+            self._update(proxy)
+
+    def remove(self, proxy: Dict):
+        with self._lock:
+            key = id(proxy)
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._usable_n -= self._uniform.weight(slot) > 0
+                self._uniform.set(slot, 0.0)
+                self._weighted.set(slot, 0.0)
+                self._proxies[slot] = None
+                self._free.append(slot)
+            self._latency.pop(key, None)
+            self._last_used.pop(key, None)
+
+    def mark_used(self, proxy: Dict, when: float):
+        with self._lock:
+            key = id(proxy)
+            if key in self._slots:
+                self._last_used[key] = when
+                heapq.heappush(self._lru_heap, (when, next(self._seq), key))
+
+    def _usable(self, key: Hashable) -> bool:
+        slot = self._slots.get(key)
+        return slot is not None and self._uniform.weight(slot) > 0
+
+    def _pick_heap(self, heap: list, current: Dict[Hashable, float]) -> Optional[Dict]:
+        # Discard stale or unusable entries at the top, then peek; update() re-pushes a proxy that recovers
+        while heap:
+            value, _, key = heap[0]
+            if current.get(key) == value and self._usable(key):
+                return self._proxies[self._slots[key]]
+            heapq.heappop(heap)
+        return None
+
+    def pick(self, policy: str = UNIFORM) -> Optional[Dict]:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown proxy selection policy: {policy}")
+        with self._lock:
+            if policy in (UNIFORM, WEIGHTED):
+                tree = self._uniform if policy == UNIFORM else self._weighted
+                slot = tree.sample(self._rng)
+                return self._proxies[slot] if slot is not None else None
+
+            if policy == LRU:
+                return self._pick_lru()
+            return self._pick_heap(self._latency_heap, self._latency)
+
+    def _pick_lru(self) -> Optional[Dict]:
+        heap = self._lru_heap
+        while True:
+            proxy = self._pick_heap(heap, self._last_used)
+            if proxy is None or self.used_floor is None:
+                return proxy
+            key = id(proxy)
+            floor = self.used_floor(proxy)
+            if floor <= self._last_used[key]:
+                return proxy
+            # Used through another proxy since its entry was pushed; move it back by that time
+            self._last_used[key] = floor
+            heapq.heapreplace(heap, (floor, next(self._seq), key))
+
+    def contains(self, proxy: Dict) -> bool:
+        return id(proxy) in self._slots
+
+    def is_usable(self, proxy: Dict) -> bool:
+        """Whether pick() may currently return proxy"""
+        return self._usable(id(proxy))
+
+    def usable_count(self) -> int:
+        with self._lock:
+            return self._usable_n
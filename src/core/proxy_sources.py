@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.core.proxy_ingest import IngestReport
+
+
+def source_files(path: str) -> List[str]:
+    """Files making up a source: the file itself, or the visible files of a drop directory in name order"""
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        return []
+    # Hidden and .tmp/.part files are skipped so a provider can write a new export and rename it into place
+    return [
+        os.path.join(path, name) for name in sorted(os.listdir(path))
+        if not name.startswith('.') and not name.endswith(('.tmp', '.part'))
+        and os.path.isfile(os.path.join(path, name))
+    ]
+
+
+def fingerprint(path: str) -> Optional[str]:
+    """Cheap change marker from file names, sizes and mtimes; None when the source path is missing"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    for file_path in source_files(path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            continue
+        digest.update(f"{os.path.basename(file_path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SyncReport(IngestReport):
+    """IngestReport of one diff-merge plus what happened to the proxies the source already owned"""
+
+    def __init__(self):
+        super().__init__()
+        self.adopted = 0
+        self.unchanged = 0
+        self.restored = 0
+        self.retired = 0
+        self.removed = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.adopted or self.restored or self.retired or self.removed)
+
+    def to_dict(self) -> Dict:
+        data = super().to_dict()
+        data.update(
+            adopted=self.adopted,
+            unchanged=self.unchanged,
+            restored=self.restored,
+            retired=self.retired,
+            removed=self.removed
+        )
+        return data
+
+
+class ProxySources:
+    """
+    Named proxy list subscriptions: a provider export file or a drop directory, merged into the proxy
+    list whenever it changes (see ProxyManager.sync_source)
+    poll() compares each source's fingerprint with the one of its last sync and reports a source as
+    changed only once the fingerprint has held still for one poll, so half-written exports are not merged.
+    The optional watcher thread calls on_change(name) for every changed source every `interval` seconds
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: float = 60.0,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Dict] = {}
+        self._seen: Dict[str, Optional[str]] = {}
+        self._thread = None
+        self._stop = threading.Event()
+        if path:
+            self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                sources = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading proxy sources: {e}")
+            return
+        with self._lock:
+            self._sources = {s['name']: s for s in sources if isinstance(s, dict) and s.get('name') and s.get('path')}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(list(self._sources.values()), indent=2, ensure_ascii=False)
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Error saving proxy sources: {e}")
+
+    def add(self, name: str, path: str, keep_in_use: bool = True) -> Dict:
+        """Register a source; raises ValueError for a blank or taken name or a missing path"""
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("source name is required")
+        if not os.path.exists(path):
+            raise ValueError(f"path not found: {path}")
+        with self._lock:
+            if name in self._sources:
+                raise ValueError(f"source '{name}' already exists")
+            source = {
+                'name': name,
+                'path': os.path.abspath(path),
+                'keep_in_use': bool(keep_in_use),
+                'fingerprint': None,
+                'synced_at': None,
+                'last_report': None
+            }
+            self._sources[name] = source
+        self.save()
+        return dict(source)
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            removed = self._sources.pop(name, None) is not None
+            self._seen.pop(name, None)
+        if removed:
+            self.save()
+        return removed
+
+    def update(self, name: str, **fields) -> bool:
+        with self._lock:
+            source = self._sources.get(name)
+            if source is None:
+                return False
+            source.update(fields)
+        self.save()
+        return True
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            source = self._sources.get(name)
+            return dict(source) if source is not None else None
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return [dict(s) for s in self._sources.values()]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._sources)
+
+    def mark_synced(self, name: str, marker: Optional[str], report: SyncReport):
+        counts = report.to_dict()
+        counts.pop('errors')
+        self.update(name, fingerprint=marker, synced_at=time.strftime('%Y-%m-%d %H:%M:%S'), last_report=counts)
+
+    def poll(self) -> List[str]:
+        """Names of sources whose files changed since their last sync and were stable since the previous poll"""
+        changed = []
+        for source in self.all():
+            name = source['name']
+            current = fingerprint(source['path'])
+            with self._lock:
+                previous, self._seen[name] = self._seen.get(name), current
+            if current is not None and current == previous and current != source.get('fingerprint'):
+                changed.append(name)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name in self.poll():
+                if self.on_change is None:
+                    continue
+                try:
+                    self.on_change(name)
+                except Exception as e:
+                    print(f"Proxy source change error ({name}): {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='proxy-sources-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        if self._thread is None:
+            return
+        self._stop.set()
+        if wait:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
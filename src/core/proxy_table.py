@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STATUS_CODES = {'unchecked': 0, 'alive': 1, 'dead': 2}
+SORT_KEYS = ('response_time', 'fraud_score', 'fail_count', 'quarantine_until')
+
+
+def available() -> bool:
+    return np is not None
+
+
+class ProxyTable:
+    """
+    Columnar NumPy mirror of ProxyManager.proxies (row i == proxies[i])
+    The proxy list stays the source of truth and the only thing written to proxies.json;
+    the table only caches the numeric fields needed for filtering, sorting and stats
+    """
+
+    def __init__(self, proxies: Iterable[Dict] = ()):
+        if np is None:
+            raise RuntimeError("numpy is required for ProxyTable")
+        self._lock = threading.RLock()
+        self.rebuild(proxies)
+
+    def _allocate(self, capacity: int):
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.response_time = np.full(capacity, np.nan, dtype=np.float64)
+        self.fail_count = np.zeros(capacity, dtype=np.int32)
+        self.quarantine_until = np.zeros(capacity, dtype=np.int64)
+        self.fraud_score = np.full(capacity, np.nan, dtype=np.float32)
+
+    def _columns(self):
+        return (self.status, self.response_time, self.fail_count, self.quarantine_until, self.fraud_score)
+
+    def rebuild(self, proxies: Iterable[Dict]):
+        with self._lock:
+            proxies = list(proxies)
+            self._allocate(max(16, len(proxies)))
+            self._rows: Dict[int, int] = {}
+            self._n = 0
+            for proxy in proxies:
+                self._append(proxy)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _grow(self):
+        capacity = len(self.status) * 2
+        old = self._columns()
+        self._allocate(capacity)
+        for new, column in zip(self._columns(), old):
+            new[:len(column)] = column
+
+    @staticmethod
+    def _number(value, default):
+        try:
+            return default if value is None else float(value)
+        except (TypeError, ValueError):
+            return default
+
+    def _write(self, row: int, proxy: Dict):
+        self.status[row] = STATUS_CODES.get(proxy.get('status'), 0)
+        self.response_time[row] = self._number(proxy.get('response_time'), np.nan)
+        self.fail_count[row] = int(self._number(proxy.get('fail_count'), 0))
+        self.quarantine_until[row] = int(self._number(proxy.get('quarantine_until'), 0))
+        advanced = proxy.get('advanced_check') or {}
+        self.fraud_score[row] = self._number(advanced.get('fraud_score'), np.nan)
+
+    def _append(self, proxy: Dict):
+        if self._n == len(self.status):
+            self._grow()
+        self._write(self._n, proxy)
+        self._rows[id(proxy)] = self._n
+        self._n += 1
+
+    def append(self, proxy: Dict):
+        with self._lock:
+            self._append(proxy)
+
+    def refresh(self, proxy: Dict):
+        """Re-read the numeric fields of a proxy that is already in the table"""
+        with self._lock:
+            row = self._rows.get(id(proxy))
+            if row is not None:
+                self._write(row, proxy)
+
+    def keep(self, proxies: Sequence[Dict], mask):
+        """Apply a list compaction: proxies is the list after removal, mask the rows that were kept"""
+        with self._lock:
+            mask = np.asarray(mask, dtype=bool)
+            kept = int(mask.sum())
+            for column in self._columns():
+                column[:kept] = column[:self._n][mask]
+            self._n = kept
+            self._rows = {id(p): i for i, p in enumerate(proxies)}
+
+    def alive_mask(self, now: Optional[float] = None):
+        now = int(time.time()) if now is None else int(now)
+        n = self._n
+        return (self.status[:n] == STATUS_CODES['alive']) & (self.quarantine_until[:n] <= now)
+
+    def indices(self, status: str) -> List[int]:
+        with self._lock:
+            return np.flatnonzero(self.status[:self._n] == STATUS_CODES[status]).tolist()
+
+    def latency_percentiles(self, percentiles: Sequence[float] = (50, 90, 99)) -> Dict[float, Optional[float]]:
+        """Response time percentiles (ms) over alive proxies with a measured latency"""
+        with self._lock:
+            latency = self.response_time[:self._n][self.alive_mask()]
+            latency = latency[~np.isnan(latency)]
+            if not len(latency):
+                return {p: None for p in percentiles}
+            values = np.percentile(latency, percentiles)
+            return {p: round(float(v), 2) for p, v in zip(percentiles, values)}
+
+    def sorted_indices(self, key: str = 'response_time', descending: bool = False,
+                       alive_only: bool = False) -> List[int]:
+        """Rows ordered by key; missing values (no latency / no fraud score) always sort last"""
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {key}")
+        with self._lock:
+            values = getattr(self, key)[:self._n].astype(np.float64)
+            rows = np.arange(self._n)
+            if alive_only:
+                mask = self.alive_mask()
+                values, rows = values[mask], rows[mask]
+            if descending:
+                values = -values
+            order = np.argsort(values, kind='stable')
+            return rows[order].tolist()
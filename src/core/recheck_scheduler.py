@@ -0,0 +1,330 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+CHECK = 'check'
+EXPIRE = 'expire'
+
+DEFAULT_POLICY = {
+    'alive': 900,           # seconds between re-checks of an alive proxy
+    'dead': 600,            # base interval for dead/unchecked proxies, doubled per failure
+    'max_backoff': 4,       # cap on the doubling (dead * 2 ** 4)
+    'in_use': 120,          # proxy currently used by an open browser
+    'recent': 300,          # proxy handed to an account within 'recent_window'
+    'recent_window': 3600,
+    'min_gap': 30           # never re-check the same proxy sooner than this
+}
+
+
+def _timestamp(value) -> Optional[float]:
+    """'%Y-%m-%d %H:%M:%S' (as written by ProxyManager) -> epoch seconds"""
+    if not value:
+        return None
+    try:
+        return time.mktime(time.strptime(value, '%Y-%m-%d %H:%M:%S'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RecheckScheduler:
+    """
+    Background re-check of proxies that are due, instead of periodic full sweeps
+    Two min-heaps of (time, seq, key) drive one timer thread:
+      check  - re-probe the proxy; due time comes from last_check age, fail_count, recent use and
+               whether the proxy is leased (see next_due)
+      expire - quarantine ends; on_expire(proxy) runs at quarantine_until and its check is scheduled again
+    Entries are never removed from a heap; a popped entry is ignored when it no longer matches the
+    proxy's current due time (same lazy invalidation as StatsAggregator's expiry heap).
+    Checks start at most `rate` per second on `workers` threads; while all workers are busy or the rate
+    limit holds, due checks simply stay in the heap, so the timer thread never blocks and expiries fire on time
+    """
+
+    def __init__(
+        self,
+        check: Callable[[Dict], object],
+        on_expire: Optional[Callable[[Dict], None]] = None,
+        on_flush: Optional[Callable[[], None]] = None,
+        is_leased: Optional[Callable[[Dict], bool]] = None,
+        policy: Optional[Dict] = None,
+        rate: float = 5.0,
+        workers: int = 4,
+        flush_interval: float = 10.0
+    ):
+        """
+        check(proxy): blocking re-check that updates the proxy in place
+        on_flush(): persist results; called at most every flush_interval seconds after checks ran
+        is_leased(proxy): whether the proxy is in use right now
+        """
+        self.check = check
+        self.on_expire = on_expire
+        self.on_flush = on_flush
+        self.is_leased = is_leased or (lambda proxy: False)
+        self.policy = dict(DEFAULT_POLICY)
+        self.policy.update(policy or {})
+        self.rate = rate
+        self.workers = workers
+        self.flush_interval = flush_interval
+
+        self._cond = threading.Condition()
+        self._heaps = {CHECK: [], EXPIRE: []}
+        self._seq = itertools.count()
+        self._records: Dict[Hashable, Dict] = {}
+        self._due: Dict[Hashable, float] = {}
+        self._expiries: Dict[Hashable, float] = {}
+        self._used: Dict[Hashable, float] = {}
+        self._in_flight = set()
+        self._thread = None
+        self._executor = None
+        self._stop = False
+        self._next_start = 0.0
+        self._dirty = False
+        self._last_flush = time.time()
+        self._flush_holds = 0
+        self.checks_run = 0
+
+    def next_due(self, proxy: Dict, now: Optional[float] = None) -> Optional[float]:
+        """When proxy should next be re-checked; None while it is quarantined (the expire event takes over)"""
+        now = time.time() if now is None else now
+        quarantine_until = float(proxy.get('quarantine_until') or 0)
+        if quarantine_until > now:
+            return None
+        last_check = _timestamp(proxy.get('last_check'))
+        if last_check is None:
+            return now
+
+        policy = self.policy
+        used = self._used.get(id(proxy))
+        if self.is_leased(proxy):
+            interval = policy['in_use']
+        elif used is not None and now - used < policy['recent_window']:
+            interval = policy['recent']
+        elif proxy.get('status') == 'alive':
+            interval = policy['alive']
+        else:
+            failures = min(int(proxy.get('fail_count') or 0), policy['max_backoff'])
+            interval = policy['dead'] * (2 ** failures)
+        return last_check + interval
+
+    def _push(self, due: float, kind: str, key: Hashable):
+        heapq.heappush(self._heaps[kind], (due, next(self._seq), key))
+
+    def _schedule(self, proxy: Dict, floor: Optional[float] = None):
+        key = id(proxy)
+        self._records[key] = proxy
+        now = time.time()
+
+        quarantine_until = float(proxy.get('quarantine_until') or 0)
+        if quarantine_until > now:
+            if self._expiries.get(key) != quarantine_until:
+                self._expiries[key] = quarantine_until
+                self._push(quarantine_until, EXPIRE, key)
+        else:
+            self._expiries.pop(key, None)
+
+        due = self.next_due(proxy, now)
+        if due is not None and floor is not None:
+            due = max(due, floor)
+        if due is None:
+            self._due.pop(key, None)
+        elif self._due.get(key) != due:
+            self._due[key] = due
+            self._push(due, CHECK, key)
+
+    def track(self, proxy: Dict):
+        """Start tracking proxy, or recompute its due time after its fields changed"""
+        with self._cond:
+            self._schedule(proxy)
+            self._cond.notify()
+
+    def untrack(self, proxy: Dict):
+        with self._cond:
+            key = id(proxy)
+            self._records.pop(key, None)
+            self._due.pop(key, None)
+            self._expiries.pop(key, None)
+            self._used.pop(key, None)
+
+    def reset(self, proxies: Iterable[Dict]):
+        with self._cond:
+            self._heaps = {CHECK: [], EXPIRE: []}
+            self._records = {}
+            self._due = {}
+            self._expiries = {}
+            for proxy in proxies:
+                self._schedule(proxy)
+            self._used = {key: ts for key, ts in self._used.items() if key in self._records}
+            self._cond.notify()
+
+    def touch(self, proxy: Dict):
+        """An account just picked this proxy; keep it fresher for a while"""
+        with self._cond:
+            self._used[id(proxy)] = time.time()
+            if id(proxy) in self._records:
+                self._schedule(proxy)
+                self._cond.notify()
+
+    def pending(self, horizon: float = 0.0) -> int:
+        """Proxies due within horizon seconds from now"""
+        limit = time.time() + horizon
+        with self._cond:
+            return sum(1 for due in self._due.values() if due <= limit)
+
+    def _pop_expired(self, now: float) -> Optional[Hashable]:
+        heap = self._heaps[EXPIRE]
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            if self._expiries.get(key) == expires_at:
+                del self._expiries[key]
+                return key
+        return None
+
+    def run_expired(self, now: Optional[float] = None) -> int:
+        """Fire quarantine expiries that are due; the loop does this itself, callers may too when it is stopped"""
+        now = time.time() if now is None else now
+        fired = 0
+        while True:
+            with self._cond:
+                key = self._pop_expired(now)
+            if key is None:
+                return fired
+            self._expire(key)
+            fired += 1
+
+    def _expire(self, key: Hashable):
+        proxy = self._records.get(key)
+        if proxy is None:
+            return
+        if self.on_expire is not None:
+            try:
+                self.on_expire(proxy)
+            except Exception as e:
+                print(f"Quarantine expiry error: {e}")
+        with self._cond:
+            if key in self._records:
+                self._schedule(proxy)
+
+    def _pop_due(self):
+        """Wait for the next due event; return (kind, key), (None, None) after a timed wait, or None on stop"""
+        with self._cond:
+            if self._stop:
+                return None
+            now = time.time()
+            key = self._pop_expired(now)
+            if key is not None:
+                return EXPIRE, key
+            heap = self._heaps[CHECK]
+            # A finished check notifies the condition, so a full pool just waits for that
+            can_start = len(self._in_flight) < max(1, self.workers)
+            if can_start and now >= self._next_start:
+                while heap and heap[0][0] <= now:
+                    due, _, key = heapq.heappop(heap)
+                    if self._due.get(key) == due and key not in self._in_flight:
+                        del self._due[key]
+                        self._next_start = now + (1.0 / self.rate if self.rate > 0 else 0.0)
+                        return CHECK, key
+            tops = []
+            if self._heaps[EXPIRE]:
+                tops.append(self._heaps[EXPIRE][0][0])
+            if heap and can_start:
+                tops.append(max(heap[0][0], self._next_start))
+            timeout = min(tops) - now if tops else self.flush_interval
+            self._cond.wait(max(0.0, min(timeout, self.flush_interval)))
+            return None, None
+
+    def _run(self):
+        while True:
+            event = self._pop_due()
+            if event is None:
+                break
+            kind, key = event
+            if kind == EXPIRE:
+                self._expire(key)
+            elif kind == CHECK:
+                self._start_check(key)
+            self._maybe_flush()
+        self._maybe_flush(force=True)
+
+    def _start_check(self, key: Hashable):
+        with self._cond:
+            proxy = self._records.get(key)
+            if proxy is None or self._stop:
+                return
+            self._in_flight.add(key)
+        try:
+            self._executor.submit(self._check, key, proxy)
+        except RuntimeError:
+            # Executor already shut down by stop()
+            with self._cond:
+                self._in_flight.discard(key)
+
+    def _check(self, key: Hashable, proxy: Dict):
+        try:
+            self.check(proxy)
+        except Exception as e:
+            print(f"Scheduled proxy check error: {e}")
+        finally:
+            with self._cond:
+                self._in_flight.discard(key)
+                self._dirty = True
+                self.checks_run += 1
+                if key in self._records:
+                    # check() may not touch last_check (e.g. error); do not spin on the same proxy
+                    self._schedule(proxy, floor=time.time() + self.policy['min_gap'])
+                self._cond.notify()
+
+    @contextmanager
+    def hold_flush(self):
+        """Defer on_flush while a bulk job saves the same proxies itself; results stay dirty until after"""
+        with self._cond:
+            self._flush_holds += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._flush_holds -= 1
+
+    def _maybe_flush(self, force: bool = False):
+        if self.on_flush is None or not self._dirty:
+            return
+        if self._flush_holds and not force:
+            return
+        if not force and time.time() - self._last_flush < self.flush_interval:
+            return
+        self._dirty = False
+        self._last_flush = time.time()
+        self._flush_holds = 0
+        try:
+            self.on_flush()
+        except Exception as e:
+            print(f"Error saving re-check results: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix='proxy-recheck')
+        self._thread = threading.Thread(target=self._run, name='proxy-recheck-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if wait:
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=wait)
+        self._thread = None
+        self._executor = None
+        if wait:
+            # Checks that finished after the loop's own final flush
+            self._maybe_flush(force=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
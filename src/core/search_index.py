@@ -0,0 +1,232 @@
+import bisect
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over account email, name and notes
+    Results are ranked prefix matches first (email, then name, then notes), then substring matches
+    """
+
+    FIELDS = ('email', 'name', 'notes')
+
+    def __init__(self, source: Optional[Callable[[], Iterable[Dict]]] = None):
+        """source: if given, the index is built from it on first search instead of up front"""
+        self._source = source
+        self._built = source is None
+        self._postings: Dict[str, Set[str]] = {}
+        self._texts: Dict[str, Tuple[str, ...]] = {}
+        self._order: Dict[str, int] = {}
+        self._sorted: List[List[Tuple[str, str]]] = [[] for _ in self.FIELDS]
+        self._seq = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _texts_for(self, account: Dict) -> Tuple[str, ...]:
+        return tuple((account.get(field) or '').lower() for field in self.FIELDS)
+
+    def _doc_grams(self, texts: Tuple[str, ...]) -> Set[str]:
+        grams = set()
+        for text in texts:
+            if text:
+                grams |= self._grams(text)
+        return grams
+
+    def rebuild(self, accounts: Iterable[Dict]):
+        with self._lock:
+            self._built = True
+            self._postings = {}
+            self._texts = {}
+            self._order = {}
+            self._sorted = [[] for _ in self.FIELDS]
+            self._seq = 0
+            for account in accounts:
+                self._insert(account)
+            for entries in self._sorted:
+                entries.sort()
+
+    def _insert(self, account: Dict):
+        account_id = account['id']
+        texts = self._texts_for(account)
+        self._texts[account_id] = texts
+        self._order[account_id] = self._seq
+        self._seq += 1
+        for entries, text in zip(self._sorted, texts):
+            if text:
+                entries.append((text, account_id))
+        for gram in self._doc_grams(texts):
+            self._postings.setdefault(gram, set()).add(account_id)
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt from source on the next search"""
+        with self._lock:
+            if self._source is not None:
+                self._built = False
+                self._postings = {}
+                self._texts = {}
+                self._order = {}
+                self._sorted = [[] for _ in self.FIELDS]
+
+    def _ensure_built(self):
+        if not self._built:
+            self.rebuild(self._source())
+
+    def add(self, account: Dict):
+        account_id = account.get('id')
+        if not account_id or not self._built:
+            return
+        with self._lock:
+            if account_id in self._texts:
+                self.update(account)
+                return
+            texts = self._texts_for(account)
+            self._texts[account_id] = texts
+            self._order[account_id] = self._seq
+            self._seq += 1
+            for entries, text in zip(self._sorted, texts):
+                if text:
+                    bisect.insort(entries, (text, account_id))
+            for gram in self._doc_grams(texts):
+                self._postings.setdefault(gram, set()).add(account_id)
+
+    def update(self, account: Dict):
+        account_id = account.get('id')
+        if not self._built:
+            return
+        with self._lock:
+            old_texts = self._texts.get(account_id)
+            if old_texts is None:
+                self.add(account)
+                return
+            texts = self._texts_for(account)
+            if texts == old_texts:
+                return
+            for entries, old, new in zip(self._sorted, old_texts, texts):
+                if old != new:
+                    if old:
+                        self._remove_sorted(entries, old, account_id)
+                    if new:
+                        bisect.insort(entries, (new, account_id))
+            old_grams = self._doc_grams(old_texts)
+            new_grams = self._doc_grams(texts)
+            for gram in old_grams - new_grams:
+                self._discard(gram, account_id)
+            for gram in new_grams - old_grams:
+                self._postings.setdefault(gram, set()).add(account_id)
+            self._texts[account_id] = texts
+
+    def remove(self, account_id: str):
+        if not self._built:
+            return
+        with self._lock:
+            texts = self._texts.pop(account_id, None)
+            self._order.pop(account_id, None)
+            if texts is None:
+                return
+            for entries, text in zip(self._sorted, texts):
+                if text:
+                    self._remove_sorted(entries, text, account_id)
+            for gram in self._doc_grams(texts):
+                self._discard(gram, account_id)
+
+    @staticmethod
+    def _remove_sorted(entries: List[Tuple[str, str]], text: str, account_id: str):
+        pos = bisect.bisect_left(entries, (text, account_id))
+        if pos < len(entries) and entries[pos] == (text, account_id):
+            del entries[pos]
+
+    def _discard(self, gram: str, account_id: str):
+        ids = self._postings.get(gram)
+        if ids is not None:
+            ids.discard(account_id)
+            if not ids:
+                del self._postings[gram]
+
+    def _postings_for(self, query: str) -> List[Set[str]]:
+        """Posting sets for every trigram of query, smallest first; empty if any is missing"""
+        postings = []
+        for gram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            ids = self._postings.get(gram)
+            if not ids:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+        return postings
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Return account ids matching query as a prefix or substring, best match first"""
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            self._ensure_built()
+            # Prefix matches come straight out of the sorted field lists
+            upper = query + '\uffff'
+            for entries in self._sorted:
+                start = bisect.bisect_left(entries, (query,))
+                end = bisect.bisect_left(entries, (upper,), start)
+                for pos in range(start, end):
+                    account_id = entries[pos][1]
+                    if account_id not in seen:
+                        seen.add(account_id)
+                        results.append(account_id)
+                        if limit is not None and len(results) >= limit:
+                            return results
+
+            remaining = None if limit is None else limit - len(results)
+            if len(query) >= 3:
+                postings = self._postings_for(query)
+                if not postings:
+                    return results
+                estimate = len(postings[0])
+            else:
+                # Short substrings that are not prefixes have no gram to look up
+                postings = None
+                estimate = len(self._texts)
+
+            if remaining is not None and estimate * 8 > len(self._texts):
+                # Broad query: walk accounts in insertion order and stop once
+                # the best bucket alone can fill the page
+                buckets = [[] for _ in self.FIELDS]
+                for account_id, texts in self._texts.items():
+                    if account_id in seen:
+                        continue
+                    for rank, text in enumerate(texts):
+                        if query in text:
+                            buckets[rank].append(account_id)
+                            break
+                    if len(buckets[0]) >= remaining:
+                        break
+                for bucket in buckets:
+                    results.extend(bucket)
+                return results[:limit]
+
+            if postings:
+                candidates = postings[0].intersection(*postings[1:])
+            else:
+                candidates = set(self._texts)
+            candidates -= seen
+
+            texts_by_id = self._texts
+            order = self._order
+            ranked = []
+            for account_id in candidates:
+                for rank, text in enumerate(texts_by_id[account_id]):
+                    if query in text:
+                        ranked.append((rank, order[account_id], account_id))
+                        break
+
+        if remaining is not None and len(ranked) > remaining:
+            ranked = heapq.nsmallest(remaining, ranked)
+        else:
+            ranked.sort()
+        results.extend(account_id for _, _, account_id in ranked)
+        return results
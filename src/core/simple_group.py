@@ -1,6 +1,8 @@
 """Simple Group Manager for organizing accounts visually"""
+import copy
 import json
 import os
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -10,6 +12,7 @@ class SimpleGroupManager:
         self.data_dir = data_dir
         self.groups_file = os.path.join(data_dir, 'simple_groups.json')
         self.groups: Dict[str, Dict] = self.load_groups()
+        self._batch = None
     
     def load_groups(self) -> Dict[str, Dict]:
         if os.path.exists(self.groups_file):
@@ -21,8 +24,30 @@ class SimpleGroupManager:
         return {}
     
     def save_groups(self):
+        if self._batch is not None:
+            self._batch['dirty'] = True
+            return
         with open(self.groups_file, 'w', encoding='utf-8') as f:
             json.dump(self.groups, f, indent=2, ensure_ascii=False)
+
+    @contextmanager
+    def batch(self):
+        """Defer save_groups() to a single write at exit; restore groups on error"""
+        if self._batch is not None:
+            yield self
+            return
+
+        self._batch = {'groups': copy.deepcopy(self.groups), 'dirty': False}
+        try:
+            yield self
+        except BaseException:
+            batch, self._batch = self._batch, None
+            self.groups = batch['groups']
+            raise
+        else:
+            batch, self._batch = self._batch, None
+            if batch['dirty']:
+                self.save_groups()
     
     def create_group(self, name: str) -> str:
         group_id = f"group_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -49,6 +74,22 @@ class SimpleGroupManager:
             self.groups[group_id]['accounts'].append(account_id)
             self.save_groups()
     
+    def add_accounts_to_group(self, group_id: str, account_ids: List[str]) -> int:
+        if group_id not in self.groups:
+            return 0
+        members = self.groups[group_id]['accounts']
+        existing = set(members)
+        added = 0
+        with self.batch():
+            for account_id in account_ids:
+                if account_id not in existing:
+                    existing.add(account_id)
+                    members.append(account_id)
+                    added += 1
+            if added:
+                self.save_groups()
+        return added
+    
     def remove_account_from_group(self, group_id: str, account_id: str):
         if group_id in self.groups and account_id in self.groups[group_id]['accounts']:
             self.groups[group_id]['accounts'].remove(account_id)
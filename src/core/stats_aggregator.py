@@ -0,0 +1,123 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class StatsAggregator:
+    """
+    Live counters over a set of records, updated in O(1) per mutation
+    classify(record) -> {dimension: value}; expiry(record) -> timestamp after which
+    the record must be re-classified (e.g. quarantine end), or None
+    """
+
+    def __init__(
+        self,
+        classify: Callable[[Dict], Dict[str, Hashable]],
+        expiry: Optional[Callable[[Dict], Optional[float]]] = None,
+        source: Optional[Callable[[], Iterable[Tuple[Hashable, Dict]]]] = None,
+        self_check: bool = False
+    ):
+        self.classify = classify
+        self.expiry = expiry
+        self.source = source
+        self.self_check = self_check
+
+        self._lock = threading.RLock()
+        self._counts: Dict[str, Dict[Hashable, int]] = {}
+        self._buckets: Dict[Hashable, Dict[str, Hashable]] = {}
+        self._records: Dict[Hashable, Dict] = {}
+        self._expiries: Dict[Hashable, float] = {}
+        self._heap = []
+
+    def reset(self, items: Iterable[Tuple[Hashable, Dict]]):
+        with self._lock:
+            self._counts = {}
+            self._buckets = {}
+            self._records = {}
+            self._expiries = {}
+            self._heap = []
+            for key, record in items:
+                self.track(key, record)
+
+    def _adjust(self, buckets: Dict[str, Hashable], delta: int):
+        for dimension, value in buckets.items():
+            counts = self._counts.setdefault(dimension, {})
+            counts[value] = counts.get(value, 0) + delta
+            if not counts[value]:
+                del counts[value]
+                # recount() never creates an empty dimension, so the live counters must not keep one either
+                if not counts:
+                    del self._counts[dimension]
+
+    def track(self, key: Hashable, record: Dict):
+        """Start tracking record, or re-classify it if already tracked"""
+        with self._lock:
+            buckets = self.classify(record)
+            old = self._buckets.get(key)
+            self._records[key] = record
+            if old != buckets:
+                if old is not None:
+                    self._adjust(old, -1)
+                self._adjust(buckets, 1)
+                self._buckets[key] = buckets
+
+            if self.expiry is not None:
+                expires_at = self.expiry(record)
+                if expires_at:
+                    if self._expiries.get(key) != expires_at:
+                        self._expiries[key] = expires_at
+                        heapq.heappush(self._heap, (expires_at, id(record), key))
+                else:
+                    self._expiries.pop(key, None)
+
+    def refresh(self, key: Hashable, record: Dict):
+        """Re-classify record only if it is tracked"""
+        with self._lock:
+            if key in self._buckets:
+                self.track(key, record)
+
+    def untrack(self, key: Hashable):
+        with self._lock:
+            old = self._buckets.pop(key, None)
+            self._records.pop(key, None)
+            self._expiries.pop(key, None)
+            if old is not None:
+                self._adjust(old, -1)
+
+    def _expire(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._heap)
+            if self._expiries.get(key) == expires_at:
+                del self._expiries[key]
+                self.track(key, self._records[key])
+
+    def snapshot(self) -> Dict:
+        """Current counts: {'total': n, dimension: {value: count}}"""
+        with self._lock:
+            self._expire()
+            result = {dimension: dict(counts) for dimension, counts in self._counts.items()}
+            result['total'] = len(self._buckets)
+        if self.self_check and self.source is not None:
+            self.verify(self.source(), result)
+        return result
+
+    def recount(self, items: Iterable[Tuple[Hashable, Dict]]) -> Dict:
+        counts = {}
+        total = 0
+        for _, record in items:
+            total += 1
+            for dimension, value in self.classify(record).items():
+                bucket = counts.setdefault(dimension, {})
+                bucket[value] = bucket.get(value, 0) + 1
+        counts['total'] = total
+        return counts
+
+    def verify(self, items: Iterable[Tuple[Hashable, Dict]], snapshot: Dict = None) -> bool:
+        """Compare live counters with a full recount; raise AssertionError on mismatch"""
+        expected = self.recount(items)
+        actual = snapshot if snapshot is not None else self.snapshot()
+        if expected != actual:
+            raise AssertionError(f"Stats counters out of sync: expected {expected}, got {actual}")
+        return True
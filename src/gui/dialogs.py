@@ -1,18 +1,31 @@
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 from typing import Callable, Optional
 from src.config import COLORS
 from src.core import ProxyManager
 
+def proxy_choices(proxies) -> dict:
+    """Dropdown label -> proxy id; the row number in the label is only for display"""
+    return {f"{i}: {p['host']}:{p['port']}": p['id'] for i, p in enumerate(proxies)}
+
+
+# proxy_mode choices offered next to "Random" and "Specific" (see PROXY_SELECTION_MODES)
+SELECTION_MODE_LABELS = (
+    ('uniform', "Uniform random proxy"),
+    ('lru', "Least recently used proxy"),
+    ('lowest_latency', "Lowest latency proxy"),
+)
+
 
 class AddAccountDialog(ctk.CTkToplevel):
     """Dialog for adding new account"""
     
-    def __init__(self, parent, proxy_manager: ProxyManager, callback: Callable):
+    def __init__(self, parent, proxy_manager: ProxyManager, callback: Callable, open_account: Callable[[str], None]):
         super().__init__(parent)
         
         self.proxy_manager = proxy_manager
         self.callback = callback
+        self.open_account = open_account
         
         self.title("Add New Account")
         self.geometry("500x600")
@@ -144,7 +157,7 @@ class AddAccountDialog(ctk.CTkToplevel):
         
         ctk.CTkRadioButton(
             self.proxy_options_frame,
-            text="Random Proxy",
+            text="Random Proxy (favours fast, reliable proxies)",
             variable=self.proxy_mode_var,
             value="random",
             command=self.toggle_proxy_mode,
@@ -152,6 +165,17 @@ class AddAccountDialog(ctk.CTkToplevel):
             state="disabled"
         ).pack(anchor="w", pady=5)
         
+        for mode, label in SELECTION_MODE_LABELS:
+            ctk.CTkRadioButton(
+                self.proxy_options_frame,
+                text=label,
+                variable=self.proxy_mode_var,
+                value=mode,
+                command=self.toggle_proxy_mode,
+                font=ctk.CTkFont(size=12),
+                state="disabled"
+            ).pack(anchor="w", pady=5)
+        
         ctk.CTkRadioButton(
             self.proxy_options_frame,
             text="Specific Proxy",
@@ -171,8 +195,8 @@ class AddAccountDialog(ctk.CTkToplevel):
             font=ctk.CTkFont(size=12)
         ).pack(anchor="w", pady=2)
         
-        proxies = self.proxy_manager.get_all_proxies()
-        proxy_options = [f"{i}: {p['host']}:{p['port']}" for i, p in enumerate(proxies)]
+        self.proxy_choices = proxy_choices(self.proxy_manager.get_all_proxies())
+        proxy_options = list(self.proxy_choices)
         
         if not proxy_options:
             proxy_options = ["No proxies available"]
@@ -251,8 +275,7 @@ class AddAccountDialog(ctk.CTkToplevel):
     
     def create_account(self):
         """Create account and open browser"""
-        from src.core import AccountManager, BrowserManager
-        import threading
+        from src.core import AccountManager
         
         account_type = self.account_type_var.get()
         account_email = self.email_entry.get().strip()
@@ -269,7 +292,7 @@ class AddAccountDialog(ctk.CTkToplevel):
         if use_proxy and proxy_mode == "specific":
             proxy_str = self.proxy_dropdown.get()
             if proxy_str and proxy_str != "No proxies available":
-                proxy_id = proxy_str.split(":")[0]
+                proxy_id = self.proxy_choices.get(proxy_str)
         
         notes = self.notes_entry.get("1.0", "end-1c")
         
@@ -292,62 +315,8 @@ class AddAccountDialog(ctk.CTkToplevel):
         
         self.destroy()
         
-        def open_browser_thread():
-            try:
-                browser_manager = BrowserManager()
-                
-                proxy = None
-                if use_proxy:
-                    if proxy_mode == 'random':
-                        proxy = self.proxy_manager.get_random_alive_proxy()
-                    elif proxy_mode == 'specific' and proxy_id:
-                        proxy = self.proxy_manager.get_proxy_by_index(int(proxy_id))
-                
-                driver = browser_manager.create_browser(
-                    account['id'],
-                    account['profile_path'],
-                    proxy,
-                    account.get('browser', 'chrome')
-                )
-                
-                browser_manager.open_login_page(driver, account_type)
-                
-                import time
-                logged_in = False
-                max_wait = 300 
-                wait_time = 0
-                
-                while wait_time < max_wait and not logged_in:
-                    time.sleep(5)
-                    wait_time += 5
-                    
-                    logged_in = browser_manager.check_login_status(account['id'], account_type)
-                
-                if logged_in:
-                    email = browser_manager.extract_email(driver, account_type)
-                    if email:
-                        account['email'] = email
-                    
-                    account['status'] = 'logged_in'
-                    
-                    self.callback(account, update=True)
-                    
-                    messagebox.showinfo(
-                        "Success",
-                        f"Account logged in successfully!\nEmail: {email or 'Unknown'}\n\n"
-                        "You can close the browser now."
-                    )
-                else:
-                    self.callback(account, update=True)
-                    messagebox.showinfo(
-                        "Account Saved",
-                        "Account profile created.\nYou can login later by opening the account."
-                    )
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to create browser:\n{str(e)}")
-        
-        threading.Thread(target=open_browser_thread, daemon=True).start()
+        # Same path as opening an existing account: the proxy is leased to it and released when the browser closes
+        self.open_account(account['id'])
 
 
 class EditAccountProxyDialog(ctk.CTkToplevel):
@@ -360,7 +329,7 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         self.result = None
         
         self.title("Edit Proxy Settings")
-        self.geometry("420x420")
+        self.geometry("420x540")
         self.resizable(False, False)
         
         self.transient(parent)
@@ -368,7 +337,7 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         
         self.update_idletasks()
         x = (self.winfo_screenwidth() // 2) - (420 // 2)
-        y = (self.winfo_screenheight() // 2) - (420 // 2)
+        y = (self.winfo_screenheight() // 2) - (540 // 2)
         self.geometry(f'+{x}+{y}')
         
         self.create_widgets()
@@ -404,7 +373,7 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         self.mode_buttons = []
         random_button = ctk.CTkRadioButton(
             mode_frame,
-            text="Random proxy",
+            text="Random proxy (favours fast, reliable proxies)",
             variable=self.proxy_mode_var,
             value="random",
             command=self.update_widget_states
@@ -412,6 +381,17 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         random_button.pack(anchor="w", pady=5)
         self.mode_buttons.append(random_button)
         
+        for mode, label in SELECTION_MODE_LABELS:
+            mode_button = ctk.CTkRadioButton(
+                mode_frame,
+                text=label,
+                variable=self.proxy_mode_var,
+                value=mode,
+                command=self.update_widget_states
+            )
+            mode_button.pack(anchor="w", pady=5)
+            self.mode_buttons.append(mode_button)
+        
         specific_button = ctk.CTkRadioButton(
             mode_frame,
             text="Specific proxy",
@@ -422,10 +402,10 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         specific_button.pack(anchor="w", pady=5)
         self.mode_buttons.append(specific_button)
         
-        proxies = self.proxy_manager.get_all_proxies()
-        self.has_proxy_options = len(proxies) > 0
+        self.proxy_choices = proxy_choices(self.proxy_manager.get_all_proxies())
+        self.has_proxy_options = len(self.proxy_choices) > 0
         if self.has_proxy_options:
-            self.proxy_values = [f"{i}: {p['host']}:{p['port']}" for i, p in enumerate(proxies)]
+            self.proxy_values = list(self.proxy_choices)
         else:
             self.proxy_values = ["No proxies available"]
         
@@ -439,12 +419,8 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
         default_option = None
         proxy_id = self.account.get('proxy_id')
         if proxy_id is not None and self.has_proxy_options:
-            try:
-                idx = int(proxy_id)
-                if 0 <= idx < len(self.proxy_values):
-                    default_option = self.proxy_values[idx]
-            except (ValueError, TypeError):
-                default_option = None
+            labels = {pid: label for label, pid in self.proxy_choices.items()}
+            default_option = labels.get(self.proxy_manager.resolve_proxy_id(proxy_id))
         
         if default_option:
             self.proxy_dropdown.set(default_option)
@@ -491,7 +467,7 @@ class EditAccountProxyDialog(ctk.CTkToplevel):
                 if not self.has_proxy_options or selection == "No proxies available":
                     messagebox.showwarning("Warning", "No proxies available to select!")
                     return
-                proxy_id = selection.split(":")[0]
+                proxy_id = self.proxy_choices.get(selection)
         else:
             proxy_mode = None
         
@@ -610,6 +586,195 @@ class AddProxyDialog(ctk.CTkToplevel):
             messagebox.showerror("Error", "Failed to add proxy!\nCheck the format or proxy may already exist.")
 
 
+class ProxySourcesDialog(ctk.CTkToplevel):
+    """Dialog for managing proxy source subscriptions (provider export files / drop folders)"""
+    
+    def __init__(self, parent, proxy_manager: ProxyManager, sync: Callable, remove: Callable):
+        super().__init__(parent)
+        
+        self.proxy_manager = proxy_manager
+        self.sync = sync
+        self.remove = remove
+        
+        self.title("Proxy Sources")
+        self.geometry("640x560")
+        self.resizable(False, False)
+        
+        self.transient(parent)
+        self.grab_set()
+        
+        self.update_idletasks()
+        x = (self.winfo_screenwidth() // 2) - (640 // 2)
+        y = (self.winfo_screenheight() // 2) - (560 // 2)
+        self.geometry(f'+{x}+{y}')
+        
+        self.create_widgets()
+    
+    def create_widgets(self):
+        """Create dialog widgets"""
+        title = ctk.CTkLabel(
+            self,
+            text="Proxy Sources",
+            font=ctk.CTkFont(size=20, weight="bold")
+        )
+        title.pack(pady=(20, 5))
+        
+        ctk.CTkLabel(
+            self,
+            text="Sources are re-merged when their files change; unchanged proxies keep their check history",
+            font=ctk.CTkFont(size=12),
+            text_color="gray"
+        ).pack(pady=(0, 10))
+        
+        list_frame = ctk.CTkScrollableFrame(self, height=220)
+        list_frame.pack(fill="x", padx=20, pady=5)
+        
+        sources = self.proxy_manager.sources.all()
+        if not sources:
+            ctk.CTkLabel(list_frame, text="No sources yet", text_color="gray").pack(pady=20)
+        for source in sources:
+            self.create_source_row(list_frame, source)
+        
+        form_frame = ctk.CTkFrame(self)
+        form_frame.pack(fill="x", padx=20, pady=10)
+        
+        ctk.CTkLabel(
+            form_frame,
+            text="Name:",
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).grid(row=0, column=0, sticky="w", padx=10, pady=(10, 5))
+        
+        self.name_entry = ctk.CTkEntry(form_frame, placeholder_text="provider-a", width=440)
+        self.name_entry.grid(row=0, column=1, columnspan=2, sticky="w", padx=5, pady=(10, 5))
+        
+        ctk.CTkLabel(
+            form_frame,
+            text="Path:",
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).grid(row=1, column=0, sticky="w", padx=10, pady=5)
+        
+        self.path_entry = ctk.CTkEntry(form_frame, placeholder_text="File or folder", width=300)
+        self.path_entry.grid(row=1, column=1, sticky="w", padx=5, pady=5)
+        
+        browse_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
+        browse_frame.grid(row=1, column=2, sticky="w", padx=5, pady=5)
+        ctk.CTkButton(browse_frame, text="File", command=self.browse_file, width=65).pack(side="left", padx=2)
+        ctk.CTkButton(browse_frame, text="Folder", command=self.browse_folder, width=65).pack(side="left", padx=2)
+        
+        self.keep_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(
+            form_frame,
+            text="Keep removed proxies while an account still uses them",
+            variable=self.keep_var
+        ).grid(row=2, column=0, columnspan=3, sticky="w", padx=10, pady=(5, 10))
+        
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.pack(fill="x", padx=20, pady=10)
+        
+        ctk.CTkButton(
+            button_frame,
+            text="Add Source",
+            command=self.add_source,
+            fg_color=COLORS['success'],
+            hover_color="#25a56f",
+            width=150,
+            height=40,
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).pack(side="left", expand=True, padx=5)
+        
+        ctk.CTkButton(
+            button_frame,
+            text="Close",
+            command=self.destroy,
+            fg_color="gray",
+            width=150,
+            height=40,
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).pack(side="left", expand=True, padx=5)
+    
+    def create_source_row(self, parent, source: dict):
+        row = ctk.CTkFrame(parent, fg_color=COLORS['light'])
+        row.pack(fill="x", pady=2)
+        
+        report = source.get('last_report') or {}
+        summary = (
+            f"{report.get('parsed', 0)} listed, last sync {source['synced_at']}"
+            if source.get('synced_at') else "not synced yet"
+        )
+        info = ctk.CTkFrame(row, fg_color="transparent")
+        info.pack(side="left", fill="x", expand=True, padx=8, pady=4)
+        ctk.CTkLabel(info, text=source['name'], font=ctk.CTkFont(size=13, weight="bold"), anchor="w").pack(fill="x")
+        ctk.CTkLabel(
+            info,
+            text=f"{source['path']}\n{summary}",
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+            anchor="w",
+            justify="left"
+        ).pack(fill="x")
+        
+        ctk.CTkButton(
+            row,
+            text="Remove",
+            command=lambda: self.remove_source(source['name']),
+            fg_color=COLORS['danger'],
+            hover_color="#c0392b",
+            width=70
+        ).pack(side="right", padx=4)
+        
+        ctk.CTkButton(
+            row,
+            text="Sync",
+            command=lambda: self.sync(source['name']),
+            fg_color=COLORS['primary'],
+            width=60
+        ).pack(side="right", padx=4)
+    
+    def browse_file(self):
+        path = filedialog.askopenfilename(
+            parent=self,
+            title="Select Proxy File",
+            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if path:
+            self.path_entry.delete(0, "end")
+            self.path_entry.insert(0, path)
+    
+    def browse_folder(self):
+        path = filedialog.askdirectory(parent=self, title="Select Drop Folder")
+        if path:
+            self.path_entry.delete(0, "end")
+            self.path_entry.insert(0, path)
+    
+    def add_source(self):
+        """Register the source and queue its first merge"""
+        name = self.name_entry.get().strip()
+        path = self.path_entry.get().strip()
+        
+        if not name or not path:
+            messagebox.showwarning("Warning", "Please enter a name and a file or folder!", parent=self)
+            return
+        
+        if self.proxy_manager.sources.get(name) is not None:
+            messagebox.showerror("Error", f"Source '{name}' already exists!", parent=self)
+            return
+        
+        self.sync(name, path, self.keep_var.get())
+        self.destroy()
+    
+    def remove_source(self, name: str):
+        """Unsubscribe, optionally deleting the source's proxies"""
+        answer = messagebox.askyesnocancel(
+            "Remove Source",
+            f"Also delete the proxies from '{name}'?\nProxies still used by an account are kept.",
+            parent=self
+        )
+        if answer is None:
+            return
+        self.remove(name, answer)
+        self.destroy()
+
+
 class EditAccountDialog(ctk.CTkToplevel):
     """Dialog for editing account information"""
     
@@ -779,7 +944,7 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         self.callback = callback
         
         self.title("Edit Account")
-        self.geometry("500x550")
+        self.geometry("500x650")
         self.resizable(False, False)
         
         self.transient(parent)
@@ -787,7 +952,7 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         
         self.update_idletasks()
         x = (self.winfo_screenwidth() // 2) - (500 // 2)
-        y = (self.winfo_screenheight() // 2) - (550 // 2)
+        y = (self.winfo_screenheight() // 2) - (650 // 2)
         self.geometry(f'+{x}+{y}')
         
         self.create_widgets()
@@ -888,7 +1053,7 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         self.mode_buttons = []
         random_button = ctk.CTkRadioButton(
             mode_frame,
-            text="Random proxy (choose random alive proxy when opening)",
+            text="Random proxy (chosen when opening, favours fast, reliable ones)",
             variable=self.proxy_mode_var,
             value="random",
             command=self.update_proxy_states,
@@ -897,6 +1062,18 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         random_button.pack(anchor="w", pady=5)
         self.mode_buttons.append(random_button)
         
+        for mode, label in SELECTION_MODE_LABELS:
+            mode_button = ctk.CTkRadioButton(
+                mode_frame,
+                text=f"{label} (chosen when opening)",
+                variable=self.proxy_mode_var,
+                value=mode,
+                command=self.update_proxy_states,
+                font=ctk.CTkFont(size=12)
+            )
+            mode_button.pack(anchor="w", pady=5)
+            self.mode_buttons.append(mode_button)
+        
         specific_button = ctk.CTkRadioButton(
             mode_frame,
             text="Specific proxy (always use this proxy):",
@@ -908,10 +1085,10 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         specific_button.pack(anchor="w", pady=5)
         self.mode_buttons.append(specific_button)
         
-        proxies = self.proxy_manager.get_all_proxies()
-        self.has_proxy_options = len(proxies) > 0
+        self.proxy_choices = proxy_choices(self.proxy_manager.get_all_proxies())
+        self.has_proxy_options = len(self.proxy_choices) > 0
         if self.has_proxy_options:
-            self.proxy_values = [f"{i}: {p['host']}:{p['port']}" for i, p in enumerate(proxies)]
+            self.proxy_values = list(self.proxy_choices)
         else:
             self.proxy_values = ["No proxies available"]
         
@@ -925,12 +1102,8 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
         default_option = None
         proxy_id = self.account.get('proxy_id')
         if proxy_id is not None and self.has_proxy_options:
-            try:
-                idx = int(proxy_id)
-                if 0 <= idx < len(self.proxy_values):
-                    default_option = self.proxy_values[idx]
-            except (ValueError, TypeError):
-                default_option = None
+            labels = {pid: label for label, pid in self.proxy_choices.items()}
+            default_option = labels.get(self.proxy_manager.resolve_proxy_id(proxy_id))
         
         if default_option:
             self.proxy_dropdown.set(default_option)
@@ -967,7 +1140,7 @@ class EditAccountTabbedDialog(ctk.CTkToplevel):
             if not self.has_proxy_options or selection == "No proxies available":
                 messagebox.showwarning("Warning", "No proxies available to select!")
                 return
-            proxy_id = selection.split(":")[0]
+            proxy_id = self.proxy_choices.get(selection)
         
         updates = {
             'name': name,
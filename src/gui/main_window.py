@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import threading
+import time
 import logging
 import os
 import queue
@@ -9,19 +10,36 @@ from datetime import datetime
 from src.core import AccountManager, ProxyManager, BrowserManager
 from src.core.config_manager import ConfigManager
 from src.core.simple_group import SimpleGroupManager
-from src.config import WINDOW_SIZE, THEME, COLORS, DATA_DIR
+from src.config import WINDOW_SIZE, THEME, COLORS, DATA_DIR, EXIT_IP_URL, IP2LOCATION_API_URL, PROXY_LEASE_MAX_SHARE, \
+    PROXY_SHARED_EXIT_AS_ONE, PROXY_SOURCE_POLL_INTERVAL
 
 
 class AccountManagerGUI:
+    SEARCH_RESULT_LIMIT = 200
+
     def __init__(self):
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
         
         self.account_manager = AccountManager()
         self.proxy_manager = ProxyManager()
-        self.browser_manager = BrowserManager()
+        self.browser_manager = BrowserManager(self.account_manager.profile_cache)
         self.config_manager = ConfigManager()
         self.simple_group = SimpleGroupManager(DATA_DIR)
+        self.account_manager.key_cache.enabled = bool(self.config_manager.get('cache_export_key', False))
+        self.proxy_manager.checker.set_endpoints(self.config_manager.get_proxy_check_endpoints())
+        self.proxy_manager.concurrency_limits = self.config_manager.get_proxy_check_concurrency_limits()
+        self.proxy_manager.ip_lookup.base_url = self.config_manager.get('ip2location_api_url', IP2LOCATION_API_URL)
+        self.proxy_manager.exit_ip_url = self.config_manager.get('exit_ip_url', EXIT_IP_URL)
+        self.proxy_manager.set_lease_limit(self.config_manager.get('proxy_lease_max_share', PROXY_LEASE_MAX_SHARE))
+        self.proxy_manager.set_shared_exit(self.config_manager.get('proxy_shared_exit_as_one', PROXY_SHARED_EXIT_AS_ONE))
+        self.browser_manager.on_browser_closed = self._on_browser_closed
+        self.account_manager.migrate_proxy_ids(self.proxy_manager.resolve_proxy_id)
+        self.proxy_manager.referenced_proxy_ids = self._referenced_proxy_ids
+        self.proxy_manager.sources.interval = self.config_manager.get(
+            'proxy_source_poll_interval', PROXY_SOURCE_POLL_INTERVAL
+        )
+        self.proxy_manager.sources.on_change = self._on_proxy_source_changed
         
         self.root = ctk.CTk()
         self.root.title("Account Manager Tool")
@@ -42,12 +60,22 @@ class AccountManagerGUI:
         self.loading_tasks = {}
         self._active_dialog = None
         self._checking_advanced_proxy = False
+        self._search_after_id = None
+        self._search_seq = 0
+        self._proxy_refresh_pending = False
+        self._last_check_progress = 0.0
+        self._source_syncs_pending = set()
 
         self._job_queue = queue.Queue()
         self._job_current = None
         self._job_status_var = ctk.StringVar(value="")
         self._job_worker = threading.Thread(target=self._job_worker_loop, daemon=True)
         self._job_worker.start()
+
+        self._profile_ops_status = ""
+        self.account_manager.profile_worker.add_listener(
+            lambda event: self.root.after(0, lambda: self._on_profile_event(event))
+        )
         
         self.setup_error_logger()
         
@@ -59,6 +87,11 @@ class AccountManagerGUI:
 
         self._start_browser_watchdog()
 
+        self.proxy_manager.scheduler.on_flush = self._save_rechecked_proxies
+        if self.config_manager.get('proxy_recheck', True):
+            self.proxy_manager.start_recheck()
+        self.proxy_manager.sources.start()
+
     def _start_browser_watchdog(self):
         def tick():
             def worker():
@@ -86,11 +119,28 @@ class AccountManagerGUI:
     def _set_job_badge(self):
         pending = self._job_queue.qsize()
         if self._job_current:
-            self._job_status_var.set(f"Jobs: {pending} | Running: {self._job_current}")
+            text = f"Jobs: {pending} | Running: {self._job_current}"
         elif pending > 0:
-            self._job_status_var.set(f"Jobs: {pending} | Waiting")
+            text = f"Jobs: {pending} | Waiting"
+        else:
+            text = ""
+        if self._profile_ops_status:
+            text = f"{text} | {self._profile_ops_status}" if text else self._profile_ops_status
+        self._job_status_var.set(text)
+
+    def _on_profile_event(self, event: dict):
+        pending = event.get('pending', 0)
+        if event['state'] == 'failed':
+            msg = f"Could not {event['kind']} profile folder: {event.get('error', '')}"
+            self.show_toast(msg[:120], "error")
+
+        if event['state'] == 'progress' and event.get('total') and pending:
+            self._profile_ops_status = f"Profiles: {pending} pending ({event['done']}/{event['total']})"
+        elif pending:
+            self._profile_ops_status = f"Profiles: {pending} pending"
         else:
-            self._job_status_var.set("")
+            self._profile_ops_status = ""
+        self._set_job_badge()
 
     def _enqueue_job(self, name: str, func):
         self._job_queue.put((name, func))
@@ -371,6 +421,22 @@ class AccountManagerGUI:
             width=120
         ).pack(side="left", padx=5)
         
+        ctk.CTkButton(
+            toolbar_frame,
+            text="Sources",
+            command=self.proxy_sources_dialog,
+            fg_color=COLORS['primary'],
+            width=100
+        ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            toolbar_frame,
+            text="GeoIP DB",
+            command=self.import_geoip_database,
+            fg_color=COLORS['primary'],
+            width=100
+        ).pack(side="left", padx=5)
+        
         ctk.CTkButton(
             toolbar_frame,
             text="Check All",
@@ -413,6 +479,15 @@ class AccountManagerGUI:
         )
         self.proxy_stats_label.pack(side="right", padx=10)
         
+        self.group_by_exit_var = ctk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            toolbar_frame,
+            text="Group by exit IP",
+            variable=self.group_by_exit_var,
+            command=self.refresh_proxies,
+            font=ctk.CTkFont(size=12)
+        ).pack(side="right", padx=10)
+        
         self.proxies_frame = ctk.CTkScrollableFrame(self.tab_proxies, corner_radius=12, fg_color=COLORS['dark'])
         self.proxies_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
@@ -428,6 +503,12 @@ class AccountManagerGUI:
             ("Username", 120),
             ("Status", 80),
             ("Response (ms)", 100),
+            ("Uptime", 70),
+            ("p50/p95 (ms)", 110),
+            ("EWMA (ms)", 80),
+            ("Leases", 60),
+            ("Exit IP", 130),
+            ("Geo", 110),
             ("Last Check", 130),
             ("Fraud Score", 100),
             ("Actions", 60)
@@ -814,8 +895,7 @@ class AccountManagerGUI:
                 messagebox.showwarning("No Selection", "Please select at least one account")
                 return
             
-            for acc_id in selected_ids:
-                self.simple_group.add_account_to_group(group_id, acc_id)
+            self.simple_group.add_accounts_to_group(group_id, selected_ids)
             
             self.refresh_accounts()
             self.show_toast(f"Added {len(selected_ids)} account(s) to '{group['name']}'", "success")
@@ -1132,8 +1212,12 @@ Accounts will not be deleted."):
         proxies = self.proxy_manager.get_all_proxies()
         
         if proxies:
-            for i, proxy in enumerate(proxies):
-                self.create_proxy_row(i, proxy)
+            history = self.proxy_manager.get_history_stats(proxies)
+            if self.group_by_exit_var.get():
+                self._create_exit_grouped_rows(proxies, history)
+            else:
+                for i, proxy in enumerate(proxies):
+                    self.create_proxy_row(i, proxy, history[i])
         else:
             empty = ctk.CTkLabel(
                 self.proxies_frame,
@@ -1144,7 +1228,37 @@ Accounts will not be deleted."):
         
         self.update_proxy_stats()
     
-    def create_proxy_row(self, index: int, proxy: dict):
+    def _create_exit_grouped_rows(self, proxies: list, history: list):
+        # Exits shared by several proxies first, largest group on top; everything else after
+        position = {id(proxy): i for i, proxy in enumerate(proxies)}
+        shown = set()
+        for exit_ip, members in self.proxy_manager.get_exit_groups():
+            ctk.CTkLabel(
+                self.proxies_frame,
+                text=f"Exit {exit_ip} - {len(members)} proxies",
+                anchor="w",
+                text_color=COLORS['warning'],
+                font=ctk.CTkFont(size=12, weight="bold")
+            ).pack(fill="x", padx=8, pady=(6, 1))
+            for proxy in members:
+                i = position.get(id(proxy))
+                if i is not None:
+                    shown.add(i)
+                    self.create_proxy_row(i, proxy, history[i])
+        
+        rest = [i for i in range(len(proxies)) if i not in shown]
+        if rest and shown:
+            ctk.CTkLabel(
+                self.proxies_frame,
+                text="Unique or unknown exit",
+                anchor="w",
+                text_color="gray",
+                font=ctk.CTkFont(size=12, weight="bold")
+            ).pack(fill="x", padx=8, pady=(6, 1))
+        for i in rest:
+            self.create_proxy_row(i, proxies[i], history[i])
+    
+    def create_proxy_row(self, index: int, proxy: dict, history: Optional[dict] = None):
 
         row_frame = ctk.CTkFrame(self.proxies_frame, fg_color=COLORS['light'], height=35)
         row_frame.pack(fill="x", pady=1)
@@ -1156,7 +1270,7 @@ Accounts will not be deleted."):
             text="",
             variable=var,
             width=50,
-            command=lambda: self.toggle_proxy_selection(index, var.get())
+            command=lambda: self.toggle_proxy_selection(proxy['id'], var.get())
         )
         checkbox.pack(side="left", padx=2)
         
@@ -1175,9 +1289,9 @@ Accounts will not be deleted."):
         }
         status_label = ctk.CTkLabel(
             row_frame,
-            text=status.title(),
+            text="Retired" if proxy.get('retired') else status.title(),
             width=80,
-            text_color=status_colors.get(status, COLORS['text']),
+            text_color="gray" if proxy.get('retired') else status_colors.get(status, COLORS['text']),
             anchor="w",
             font=ctk.CTkFont(size=12)
         )
@@ -1187,13 +1301,66 @@ Accounts will not be deleted."):
         response_text = f"{response}" if response else "-"
         ctk.CTkLabel(row_frame, text=response_text, width=100, anchor="w", font=ctk.CTkFont(size=12)).pack(side="left", padx=2)
         
+        history = history or {}
+        uptime = history.get('uptime')
+        uptime_text = f"{uptime:.0f}%" if uptime is not None else "-"
+        if uptime is None:
+            uptime_color = COLORS['text']
+        elif uptime >= 90:
+            uptime_color = COLORS['success']
+        elif uptime >= 60:
+            uptime_color = COLORS['warning']
+        else:
+            uptime_color = COLORS['danger']
+        ctk.CTkLabel(row_frame, text=uptime_text, width=70, anchor="w", text_color=uptime_color, font=ctk.CTkFont(size=12)).pack(side="left", padx=2)
+        
+        p50, p95 = history.get('p50'), history.get('p95')
+        percentile_text = f"{p50:.0f} / {p95:.0f}" if p50 is not None else "-"
+        ctk.CTkLabel(row_frame, text=percentile_text, width=110, anchor="w", font=ctk.CTkFont(size=12)).pack(side="left", padx=2)
+        
+        ewma = history.get('ewma')
+        ewma_text = f"{ewma:.0f}" if ewma is not None else "-"
+        ctk.CTkLabel(row_frame, text=ewma_text, width=80, anchor="w", font=ctk.CTkFont(size=12)).pack(side="left", padx=2)
+        
+        leases = self.proxy_manager.leases
+        holders = leases.holders(proxy)
+        if not holders:
+            lease_text = "-"
+        else:
+            lease_text = f"{holders}/{leases.max_share}" if leases.max_share else str(holders)
+        lease_color = COLORS['warning'] if holders and leases.is_full(proxy) else COLORS['text']
+        ctk.CTkLabel(row_frame, text=lease_text, width=60, anchor="w", text_color=lease_color, font=ctk.CTkFont(size=12)).pack(side="left", padx=2)
+        
+        exit_ip = proxy.get('exit_ip')
+        exit_color = COLORS['text']
+        if not exit_ip:
+            exit_text = "-"
+        elif self.proxy_manager.is_rotating(proxy):
+            exit_text = f"{exit_ip} (rotating)"
+            exit_color = "lightblue"
+        else:
+            peers = self.proxy_manager.exit_group_size(proxy)
+            exit_text = f"{exit_ip} (x{peers})" if peers > 1 else exit_ip
+            if peers > 1:
+                exit_color = COLORS['warning']
+        ctk.CTkLabel(row_frame, text=exit_text, width=130, anchor="w", text_color=exit_color, font=ctk.CTkFont(size=11)).pack(side="left", padx=2)
+        
+        geo = proxy.get('geo') or {}
+        geo_parts = [geo.get('country_code') or geo.get('country_name'), f"AS{geo['asn']}" if geo.get('asn') else None]
+        geo_text = " ".join(part for part in geo_parts if part) or "-"
+        geo_label = ctk.CTkLabel(row_frame, text=geo_text, width=110, anchor="w", font=ctk.CTkFont(size=11))
+        geo_label.pack(side="left", padx=2)
+        if geo.get('isp') or geo.get('country_name'):
+            self._bind_tooltip(geo_label, " - ".join(v for v in (geo.get('country_name'), geo.get('isp')) if v))
+        
         last_check = proxy.get('last_check', '-')[:16] if proxy.get('last_check') else '-'
         ctk.CTkLabel(row_frame, text=last_check, width=130, anchor="w", font=ctk.CTkFont(size=11)).pack(side="left", padx=2)
         
         fraud_score = "-"
         fraud_color = COLORS['text']
-        if proxy.get('advanced_check'):
-            score = proxy['advanced_check'].get('fraud_score', 0)
+        advanced = proxy.get('advanced_check')
+        if advanced:
+            score = advanced.get('fraud_score', 0)
             fraud_score = str(score)
             if score <= 20:
                 fraud_color = COLORS['success']
@@ -1218,7 +1385,7 @@ Accounts will not be deleted."):
         ctk.CTkButton(
             row_frame,
             text="Check",
-            command=lambda: self.check_single_proxy(index),
+            command=lambda: self.check_single_proxy(proxy['id']),
             width=60,
             height=24,
             fg_color=COLORS['warning'],
@@ -1228,7 +1395,7 @@ Accounts will not be deleted."):
         ctk.CTkButton(
             row_frame,
             text="Advanced",
-            command=lambda: self.check_single_proxy_advanced(index),
+            command=lambda: self.check_single_proxy_advanced(proxy['id']),
             width=75,
             height=24,
             fg_color="#9b59b6",
@@ -1243,12 +1410,12 @@ Accounts will not be deleted."):
         elif not selected and account_id in self.selected_accounts:
             self.selected_accounts.remove(account_id)
     
-    def toggle_proxy_selection(self, index: int, selected: bool):
+    def toggle_proxy_selection(self, proxy_id: str, selected: bool):
 
-        if selected and index not in self.selected_proxies:
-            self.selected_proxies.append(index)
-        elif not selected and index in self.selected_proxies:
-            self.selected_proxies.remove(index)
+        if selected and proxy_id not in self.selected_proxies:
+            self.selected_proxies.append(proxy_id)
+        elif not selected and proxy_id in self.selected_proxies:
+            self.selected_proxies.remove(proxy_id)
     
     def _create_tooltip_text(self, account: dict) -> str:
 
@@ -1397,31 +1564,71 @@ Accounts will not be deleted."):
     
     def update_proxy_stats(self):
 
-        proxies = self.proxy_manager.get_all_proxies()
-        total = len(proxies)
-        alive = len([p for p in proxies if p.get('status') == 'alive'])
-        dead = len([p for p in proxies if p.get('status') == 'dead'])
+        stats = self.proxy_manager.get_proxy_stats()
         
-        stats_text = f"Total: {total} | Alive: {alive} | Dead: {dead}"
+        stats_text = (
+            f"Total: {stats['total']} | Alive: {stats['alive']} | "
+            f"Dead: {stats['dead']} | Quarantined: {stats['quarantined']}"
+        )
         self.proxy_status_var.set(stats_text)
 
     def _finish_proxy_check(self):
         self._checking_proxies = False
         self.refresh_proxies()
         self.update_proxy_stats()
+
+    def _schedule_proxy_refresh(self, delay: int = 500):
+        """Coalesce per-proxy refresh requests from checker threads into one refresh per delay ms"""
+        if self._proxy_refresh_pending:
+            return
+        self._proxy_refresh_pending = True
+        self.root.after(delay, self._run_proxy_refresh)
+
+    def _run_proxy_refresh(self):
+        self._proxy_refresh_pending = False
+        self.refresh_proxies()
+
+    def _on_browser_closed(self, account_id: str):
+        # Called from whichever thread closed the browser
+        if self.proxy_manager.leases.lease_of(account_id) is not None:
+            self.proxy_manager.release_proxy(account_id)
+            self._schedule_proxy_refresh()
+
+    def _save_rechecked_proxies(self):
+        # Called from the re-check scheduler thread after a round of background checks
+        self.proxy_manager.save_proxies()
+        self._schedule_proxy_refresh()
     
     def search_accounts(self):
 
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(200, self._run_search)
+    
+    def _run_search(self):
+        self._search_after_id = None
         query = self.search_entry.get()
+        self._search_seq += 1
+        seq = self._search_seq
+
         if not query:
             self.refresh_accounts()
             return
-        
+
+        def search_thread():
+            results = self.account_manager.search_accounts(query, limit=self.SEARCH_RESULT_LIMIT)
+            self.root.after(0, lambda: self._show_search_results(seq, results))
+
+        threading.Thread(target=search_thread, daemon=True).start()
+    
+    def _show_search_results(self, seq: int, results: list):
+        if seq != self._search_seq:
+            return
+
         for widget in self.accounts_frame.winfo_children():
-            if not isinstance(widget, ctk.CTkFrame) or widget.winfo_children()[0].cget("text") not in ["☑️"]:
+            if widget != self.accounts_header_frame:
                 widget.destroy()
         
-        results = self.account_manager.search_accounts(query)
         for account in results:
             self.create_account_row(account)
     
@@ -1430,7 +1637,7 @@ Accounts will not be deleted."):
             return
 
         from src.gui.dialogs import AddAccountDialog
-        dialog = AddAccountDialog(self.root, self.proxy_manager, self.on_account_added)
+        dialog = AddAccountDialog(self.root, self.proxy_manager, self.on_account_added, self.open_account)
         self._register_dialog(dialog)
     
     def edit_account_dialog(self, account_id: str):
@@ -1508,16 +1715,102 @@ Accounts will not be deleted."):
             filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
         )
         
-        if file_path:
-            count = self.proxy_manager.add_proxies_from_file(file_path)
-            self.show_toast(f"Imported {count} proxies successfully", "success")
-            self.refresh_proxies()
+        if not file_path:
+            return
+        
+        def import_thread():
+            report = self.proxy_manager.import_proxies_file(file_path)
+            message = (
+                f"Imported {report.added} proxies "
+                f"({report.duplicates} duplicates, {report.invalid} invalid lines)"
+            )
+            for lineno, error in report.errors[:20]:
+                self.error_logger.error(f"Proxy import line {lineno}: {error}")
+            self.root.after(0, lambda: self.show_toast(message, "warning" if report.invalid else "success"))
+            self.root.after(0, self.refresh_proxies)
+        
+        self._enqueue_job("Import proxies", import_thread)
+
+    def import_geoip_database(self):
+
+        file_path = filedialog.askopenfilename(
+            title="Select GeoIP / ASN range CSV (IP2Location LITE, DB-IP lite)",
+            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        
+        if not file_path:
+            return
+        
+        def import_thread():
+            result = self.proxy_manager.import_geoip_csv(file_path)
+            ranges = sum(result['ranges'].values())
+            message = f"GeoIP table built: {ranges} ranges, {result['located']} proxies located"
+            self.root.after(0, lambda: self.show_toast(message, "success" if ranges else "warning"))
+            self.root.after(0, self.refresh_proxies)
+        
+        self._enqueue_job("Build GeoIP table", import_thread)
+
+    def proxy_sources_dialog(self):
+        if not self._can_open_dialog():
+            return
+
+        from src.gui.dialogs import ProxySourcesDialog
+        dialog = ProxySourcesDialog(self.root, self.proxy_manager, self.sync_proxy_source, self.remove_proxy_source)
+        self._register_dialog(dialog)
+
+    def _referenced_proxy_ids(self) -> set:
+        # Accounts pinned to a proxy keep a retired source entry alive
+        return {
+            account['proxy_id'] for account in self.account_manager.get_all_accounts()
+            if account.get('proxy_id') and account.get('proxy_mode') == 'specific'
+        }
+
+    def _on_proxy_source_changed(self, name: str):
+        # Called from the source watcher thread
+        if name not in self._source_syncs_pending:
+            self._source_syncs_pending.add(name)
+            self.sync_proxy_source(name)
+
+    def sync_proxy_source(self, name: str, path: Optional[str] = None, keep_in_use: bool = True):
+        """Queue a diff-merge of a source; with path the source is registered first"""
+        def sync_thread():
+            try:
+                if path is not None:
+                    report = self.proxy_manager.add_source(name, path, keep_in_use)
+                else:
+                    report = self.proxy_manager.sync_source(name)
+            finally:
+                self._source_syncs_pending.discard(name)
+            message = (
+                f"Source '{name}': +{report.added} added, {report.removed} removed, "
+                f"{report.retired} retired, {report.unchanged} unchanged"
+            )
+            for lineno, error in report.errors[:20]:
+                self.error_logger.error(f"Proxy source '{name}' line {lineno}: {error}")
+            self.root.after(0, lambda: self.show_toast(message, "warning" if report.invalid else "success"))
+            if report.changed:
+                self.root.after(0, self.refresh_proxies)
+
+        self._enqueue_job(f"Sync source: {name}", sync_thread)
+
+    def remove_proxy_source(self, name: str, drop_proxies: bool = False):
+        def remove_thread():
+            removed = self.proxy_manager.remove_source(name, drop_proxies)
+            self.root.after(0, lambda: self.show_toast(f"Source '{name}' removed ({removed} proxies deleted)", "success"))
+            self.root.after(0, self.refresh_proxies)
+
+        self._enqueue_job(f"Remove source: {name}", remove_thread)
+
+    def _job_progress(self, label: str, done: int, total: int):
+        percent = int(done * 100 / total) if total else 100
+        self._job_current = f"{label} {percent}%"
+        self.root.after(0, self._set_job_badge)
 
     def export_accounts_encrypted(self):
         file_path = filedialog.asksaveasfilename(
             title="Export Accounts",
-            defaultextension=".json",
-            filetypes=[("Encrypted JSON", "*.json"), ("All Files", "*.*")]
+            defaultextension=".amx",
+            filetypes=[("Encrypted Export", "*.amx"), ("All Files", "*.*")]
         )
 
         if not file_path:
@@ -1531,16 +1824,20 @@ Accounts will not be deleted."):
             self.show_toast("Password is required", "warning")
             return
 
-        try:
-            self.account_manager.export_accounts_encrypted(file_path, password)
-            self.show_toast("Accounts exported successfully", "success")
-        except Exception as e:
-            self.show_toast(str(e)[:120], "error")
+        def export_thread():
+            count = self.account_manager.export_accounts_encrypted(
+                file_path,
+                password,
+                progress_callback=lambda done, total: self._job_progress("Exporting", done, total)
+            )
+            self.root.after(0, lambda: self.show_toast(f"Exported {count} account(s)", "success"))
+
+        self._enqueue_job("Export accounts", export_thread)
 
     def import_accounts_encrypted(self):
         file_path = filedialog.askopenfilename(
             title="Import Accounts",
-            filetypes=[("Encrypted JSON", "*.json"), ("All Files", "*.*")]
+            filetypes=[("Encrypted Export", "*.amx *.json"), ("All Files", "*.*")]
         )
 
         if not file_path:
@@ -1554,13 +1851,16 @@ Accounts will not be deleted."):
             self.show_toast("Password is required", "warning")
             return
 
-        try:
-            count = self.account_manager.import_accounts_encrypted(file_path, password)
-            self.show_toast(f"Imported {count} account(s)", "success")
-            self.refresh_accounts()
-            self.update_stats()
-        except Exception as e:
-            self.show_toast(str(e)[:120], "error")
+        def import_thread():
+            count = self.account_manager.import_accounts_encrypted(
+                file_path,
+                password,
+                progress_callback=lambda done, total: self._job_progress("Importing", done, total)
+            )
+            self.root.after(0, lambda: self.show_toast(f"Imported {count} account(s)", "success"))
+            self.root.after(0, self.refresh_accounts)
+
+        self._enqueue_job("Import accounts", import_thread)
     
     def check_all_proxies(self):
 
@@ -1577,31 +1877,56 @@ Accounts will not be deleted."):
         self._checking_proxies = True
         self.proxy_status_var.set(f"Checking proxies... 0/{total}")
 
-        def progress_update(done, total_count):
-            self.proxy_status_var.set(f"Checking proxies... {done}/{total_count}")
+        def progress_update(done, total_count, info=None):
+            self.proxy_status_var.set(f"Checking proxies... {done}/{total_count}{self._check_rate_text(info)}")
 
         def check_thread():
-            self.proxy_manager.check_all_proxies(
-                callback=lambda idx, proxy: self.root.after(0, self.refresh_proxies),
-                progress_callback=lambda done, total_count: self.root.after(0, progress_update, done, total_count)
+            metrics = self.proxy_manager.check_all_proxies(
+                callback=lambda idx, proxy: self._schedule_proxy_refresh(),
+                progress_callback=lambda done, total_count, info: self._throttled_progress(progress_update, done, total_count, info),
+                mode='staged'
             )
             self.root.after(0, self._finish_proxy_check)
+            self.root.after(0, lambda: self._show_pipeline_metrics(metrics))
 
         self._enqueue_job("Check proxies", check_thread)
+
+    def _throttled_progress(self, update, done, total, info):
+        # Called once per finished check from the checker thread; hand the GUI a few updates per second
+        now = time.time()
+        if done < total and now - self._last_check_progress < 0.1:
+            return
+        self._last_check_progress = now
+        self.root.after(0, update, done, total, info)
+
+    @staticmethod
+    def _check_rate_text(info: Optional[dict]) -> str:
+        if not info:
+            return ""
+        return f"  |  window {info.get('window', '-')}  |  {info.get('checks_per_sec', 0):.0f} checks/s"
+
+    def _show_pipeline_metrics(self, metrics: dict):
+        if not metrics:
+            return
+        parts = []
+        for stage, data in metrics.items():
+            if data['started']:
+                parts.append(f"{stage}: {data['passed']}/{data['started']} ok, {data['throughput']:.0f}/s")
+        if parts:
+            self.show_toast(" | ".join(parts), "info", 6000)
     
-    def check_single_proxy(self, index: int):
+    def check_single_proxy(self, proxy_id: str):
 
-        proxy = self.proxy_manager.get_proxy_by_index(index)
+        proxy = self.proxy_manager.get_proxy(proxy_id)
         if proxy:
             def check_thread():
-                updated = self.proxy_manager.check_proxy(proxy)
-                self.proxy_manager.proxies[index] = updated
+                self.proxy_manager.check_proxy(proxy)
                 self.proxy_manager.save_proxies()
                 self.root.after(0, self.refresh_proxies)
             
             threading.Thread(target=check_thread, daemon=True).start()
     
-    def check_single_proxy_advanced(self, index: int):
+    def check_single_proxy_advanced(self, proxy_id: str):
         if self._checking_advanced_proxy:
             self.show_toast("Advanced check is already running, please wait", "info")
             return
@@ -1612,19 +1937,18 @@ Accounts will not be deleted."):
             if not api_key:
                 return
         
-        proxy = self.proxy_manager.get_proxy_by_index(index)
+        proxy = self.proxy_manager.get_proxy(proxy_id)
         if proxy:
             self._checking_advanced_proxy = True
             
             def check_thread():
                 try:
                     updated, api_data = self.proxy_manager.check_proxy_advanced(proxy, api_key)
-                    self.proxy_manager.proxies[index] = updated
                     self.proxy_manager.save_proxies()
                     self.root.after(0, self.refresh_proxies)
                     
                     if api_data:
-                        analysis = self.proxy_manager.analyze_ip2location_result(api_data)
+                        analysis = self.proxy_manager.get_advanced_analysis(updated)
                         self.root.after(0, lambda: self._show_advanced_check_result(proxy, analysis))
                     else:
                         self._checking_advanced_proxy = False
@@ -1653,17 +1977,18 @@ Accounts will not be deleted."):
         self._checking_proxies = True
         self.proxy_status_var.set(f"Advanced checking... 0/{total}")
 
-        def progress_update(done, total_count):
-            self.proxy_status_var.set(f"Advanced checking... {done}/{total_count}")
+        def progress_update(done, total_count, info=None):
+            self.proxy_status_var.set(f"Advanced checking... {done}/{total_count}{self._check_rate_text(info)}")
 
         def check_thread():
-            for idx, proxy in enumerate(proxies):
-                updated, api_data = self.proxy_manager.check_proxy_advanced(proxy, api_key)
-                self.proxy_manager.proxies[idx] = updated
-                self.root.after(0, progress_update, idx + 1, total)
-            
-            self.proxy_manager.save_proxies()
+            metrics = self.proxy_manager.check_all_proxies(
+                callback=lambda idx, proxy: self._schedule_proxy_refresh(),
+                progress_callback=lambda done, total_count, info: self._throttled_progress(progress_update, done, total_count, info),
+                mode='staged',
+                api_key=api_key
+            )
             self.root.after(0, self._finish_proxy_check)
+            self.root.after(0, lambda: self._show_pipeline_metrics(metrics))
 
         self._enqueue_job("Advanced proxy check", check_thread)
     
@@ -1957,7 +2282,7 @@ Security Issues:
             return
         
         if messagebox.askyesno("Confirm", f"Delete {len(self.selected_proxies)} proxies?"):
-            count = self.proxy_manager.remove_proxies(self.selected_proxies)
+            count = self.proxy_manager.remove_proxies_by_id(self.selected_proxies)
             self.show_toast(f"Deleted {count} proxies", "success")
             self.selected_proxies = []
             self.refresh_proxies()
@@ -2054,18 +2379,21 @@ Security Issues:
                 proxy = None
                 if account['use_proxy']:
                     logger.info("Proxy enabled for this account")
-                    if account['proxy_mode'] == 'random':
-                        proxy = self.proxy_manager.get_random_alive_proxy()
+                    if self.proxy_manager.is_selection_mode(account['proxy_mode']):
+                        proxy = self.proxy_manager.get_proxy_for_mode(account['proxy_mode'], account_id)
                         if not proxy:
                             
-                            logger.warning("No alive proxies available")
-                            self.root.after(0, lambda: messagebox.showwarning("Warning", "No alive proxies available!"))
+                            logger.warning("No free alive proxies available")
+                            self.root.after(0, lambda: messagebox.showwarning("Warning", "No free alive proxies available!"))
                             return
-                        logger.info(f"Using random proxy: {proxy['host']}:{proxy['port']}")
+                        logger.info(f"Using {account['proxy_mode']} proxy: {proxy['host']}:{proxy['port']}")
                     elif account['proxy_mode'] == 'specific' and account['proxy_id']:
-                        proxy = self.proxy_manager.get_proxy_by_index(int(account['proxy_id']))
+                        proxy = self.proxy_manager.get_proxy(account['proxy_id'])
                         if proxy:
                             logger.info(f"Using specific proxy: {proxy['host']}:{proxy['port']}")
+                            self.proxy_manager.leases.hold(account_id, proxy)
+                            self.proxy_manager.note_proxy_used(proxy)
+                    self._schedule_proxy_refresh()
                 else:
                     logger.info("No proxy configured")
                 
@@ -2283,6 +2611,12 @@ Security Issues:
 
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
             self.browser_manager.close_all_browsers()
+            # Join the scheduler so its last flush is written before exit; that flush must not touch the UI
+            self.proxy_manager.scheduler.on_flush = self.proxy_manager.save_proxies
+            self.proxy_manager.stop_recheck(wait=True)
+            self.proxy_manager.sources.stop(wait=False)
+            self.proxy_manager.ip_lookup.shutdown()
+            self.account_manager.close()
             self.root.destroy()
 
 
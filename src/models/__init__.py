@@ -1 +1,5 @@
 """Data models"""
+
+from .records import Record, Account, Proxy, json_default
+
+__all__ = ['Record', 'Account', 'Proxy', 'json_default']
@@ -0,0 +1,227 @@
+import json
+import sys
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+def _encode_text(value: str) -> bytes:
+    return value.encode('utf-8')
+
+
+def _decode_text(raw: bytes) -> str:
+    return raw.decode('utf-8')
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8')
+
+
+def _decode_json(raw: bytes) -> Any:
+    value = json.loads(raw)
+    # A fresh copy per read: a read-only view makes in-place edits fail loudly instead of being lost
+    return MappingProxyType(value) if type(value) is dict else value
+
+
+class Record:
+    """
+    Slotted record with a dict-compatible interface (record['key'], get, items, update, ...)
+    FIELDS are stored in slots; unknown keys go to a small overflow dict
+    INTERNED fields hold enum-like strings and are interned on write
+    LAZY fields are kept encoded as bytes and decoded on every read; decoded dicts are read-only views, so
+    change them by assigning a new value (record['advanced_check'] = {...})
+    """
+
+    __slots__ = ('_extra',)
+
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED = frozenset()
+    LAZY: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+
+    _field_set = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+
+    def __init__(self, data: Optional[Dict] = None, **kwargs):
+        self._extra = None
+        if data:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Wrap a plain dict; records of this class are returned unchanged"""
+        if isinstance(data, cls):
+            return data
+        return cls(data)
+
+    def __getitem__(self, key: str):
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            if type(value) is bytes and key in self.LAZY:
+                return self.LAZY[key][1](value)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in self._field_set:
+            if type(value) is str and key in self.INTERNED:
+                value = sys.intern(value)
+            elif value and key in self.LAZY:
+                value = self.LAZY[key][0](value)
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self._field_set:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            object.__delattr__(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._field_set:
+            return getattr(self, key, _MISSING) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def keys(self) -> List[str]:
+        keys = [f for f in self.FIELDS if getattr(self, f, _MISSING) is not _MISSING]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def values(self) -> List:
+        return [self[k] for k in self.keys()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(k, self[k]) for k in self.keys()]
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key: str, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: str, default=_MISSING):
+        try:
+            value = self[key]
+        except KeyError:
+            if default is _MISSING:
+                raise
+            return default
+        del self[key]
+        return value
+
+    def update(self, other=(), **kwargs):
+        if isinstance(other, Record):
+            if type(other) is type(self):
+                # Same layout: copy stored values as-is, lazy fields stay encoded
+                for field in self.FIELDS:
+                    value = getattr(other, field, _MISSING)
+                    if value is not _MISSING:
+                        object.__setattr__(self, field, value)
+                if other._extra:
+                    for key, value in other._extra.items():
+                        self[key] = value
+            else:
+                for key in other.keys():
+                    self[key] = other[key]
+        elif hasattr(other, 'keys'):
+            for key in other.keys():
+                self[key] = other[key]
+        else:
+            for key, value in other:
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def clear(self):
+        for field in self.FIELDS:
+            if getattr(self, field, _MISSING) is not _MISSING:
+                object.__delattr__(self, field)
+        self._extra = None
+
+    def copy(self):
+        clone = type(self).__new__(type(self))
+        clone._extra = None
+        clone.update(self)
+        return clone
+
+    def to_dict(self) -> Dict:
+        data = {}
+        for key in self.keys():
+            value = self[key]
+            data[key] = dict(value) if type(value) is MappingProxyType else value
+        return data
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Record) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Account(Record):
+    FIELDS = (
+        'id', 'type', 'email', 'name', 'status', 'created_at', 'last_opened',
+        'profile_path', 'browser', 'use_proxy', 'proxy_mode', 'proxy_id', 'notes'
+    )
+    __slots__ = FIELDS
+    INTERNED = frozenset(('type', 'status', 'browser', 'proxy_mode'))
+    LAZY = {'notes': (_encode_text, _decode_text)}
+
+
+class Proxy(Record):
+    FIELDS = (
+        'id', 'protocol', 'host', 'port', 'username', 'password', 'status', 'last_check',
+        'response_time', 'fail_count', 'quarantine_until', 'advanced_check', 'exit_ip',
+        'exit_ip_seen_at', 'exit_ip_changed_at', 'exit_ip_churn', 'geo', 'source', 'retired'
+    )
+    __slots__ = FIELDS
+    INTERNED = frozenset(('protocol', 'status'))
+    LAZY = {'advanced_check': (_encode_json, _decode_json), 'geo': (_encode_json, _decode_json)}
+
+
+def json_default(obj):
+    """json.dump(default=...) hook so records serialise like the dicts they replace"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")